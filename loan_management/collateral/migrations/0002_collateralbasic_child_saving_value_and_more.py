@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collateral', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='collateralbasic',
+            name='child_saving_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='collateralbasic',
+            name='monthly_saving_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='collateralbasic',
+            name='share_amount_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='collateralbasic',
+            name='total_saving_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='collateralincomeexpense',
+            name='amount_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collateral', '0002_collateralbasic_child_saving_value_and_more'),
+        ('members', '0006_member_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='collateralincomeexpense',
+            index=models.Index(fields=['member', 'type'], name='collateral_ie_member_type_idx'),
+        ),
+    ]
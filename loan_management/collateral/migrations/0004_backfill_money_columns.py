@@ -0,0 +1,29 @@
+from django.db import migrations
+from utils.money import backfill_money_columns
+
+# Money columns as they were when the shadows were added
+MONEY_FIELDS = {
+    'collateral.CollateralBasic': {
+        'monthly_saving': 'monthly_saving_value',
+        'child_saving': 'child_saving_value',
+        'total_saving': 'total_saving_value',
+        'share_amount': 'share_amount_value',
+    },
+    'collateral.CollateralIncomeExpense': {'amount': 'amount_value'},
+}
+
+
+def fill_shadow_columns(apps, schema_editor):
+    for label, money_fields in MONEY_FIELDS.items():
+        backfill_money_columns(apps.get_model(label), money_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collateral', '0003_collateralincomeexpense_collateral_ie_member_type_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_shadow_columns, migrations.RunPython.noop),
+    ]
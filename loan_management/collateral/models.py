@@ -1,13 +1,25 @@
 from django.db import models
 from members.models import Member
+from utils.money import MoneyShadowMixin, amount_field
 
-class CollateralBasic(models.Model):
+class CollateralBasic(MoneyShadowMixin, models.Model):
     """ Basic collateral information for Kharkhacho loan type"""
     member = models.ForeignKey(Member, on_delete=models.CASCADE, to_field='member_number', db_column='member_number')
     monthly_saving = models.CharField(max_length=50)
     child_saving = models.CharField(max_length=50)
     total_saving = models.CharField(max_length=50)
     share_amount = models.CharField(max_length=50)
+    monthly_saving_value = amount_field()
+    child_saving_value = amount_field()
+    total_saving_value = amount_field()
+    share_amount_value = amount_field()
+
+    money_fields = {
+        'monthly_saving': 'monthly_saving_value',
+        'child_saving': 'child_saving_value',
+        'total_saving': 'total_saving_value',
+        'share_amount': 'share_amount_value',
+    }
 
     class Meta:
         db_table = 'collateral_basic'
@@ -45,15 +57,21 @@ class CollateralFamilyDetail(models.Model):
     class Meta:
         db_table = 'collateral_family_details'
 
-class CollateralIncomeExpense(models.Model):
+class CollateralIncomeExpense(MoneyShadowMixin, models.Model):
     """Income and expense tracking"""
     member = models.ForeignKey(Member, on_delete=models.CASCADE, to_field='member_number', db_column='member_number')
     field = models.CharField(max_length=200)
     amount = models.CharField(max_length=50)
     type = models.CharField(max_length=20) # 'income' or 'expense'
+    amount_value = amount_field()
+
+    money_fields = {'amount': 'amount_value'}
 
     class Meta:
         db_table = 'collateral_income_expense'
+        indexes = [
+            models.Index(fields=['member', 'type'], name='collateral_ie_member_type_idx'),
+        ]
 
 class CollateralAffiliation(models.Model):
     """ Organizational Affiliations"""
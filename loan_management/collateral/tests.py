@@ -1,3 +1,85 @@
+from datetime import date
+from unittest import mock
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save
 from django.test import TestCase
+from django.urls import reverse
+from members.models import Member
+from .models import CollateralBasic, CollateralProperty, CollateralIncomeExpense
 
-# Create your tests here.
+
+def _formset(prefix, rows, initial=0):
+    data = {
+        f'{prefix}-TOTAL_FORMS': str(len(rows)),
+        f'{prefix}-INITIAL_FORMS': str(initial),
+        f'{prefix}-MIN_NUM_FORMS': '0',
+        f'{prefix}-MAX_NUM_FORMS': '1000',
+    }
+    for i, row in enumerate(rows):
+        data.update({f'{prefix}-{i}-{key}': value for key, value in row.items()})
+    return data
+
+
+class CollateralWizardTests(TestCase):
+
+    def setUp(self):
+        self.member = Member.objects.create(date=date(2024, 1, 1), member_number='3001', member_name='Gita')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+    def _post(self, step, data):
+        return self.client.post(reverse(f'collateral:{step}_form', args=[self.member.member_number]), data)
+
+    def test_steps_are_kept_in_the_draft_until_the_last_one(self):
+        self._post('basic', {'monthly_saving': '500', 'child_saving': '0', 'total_saving': '500', 'share_amount': '100'})
+        self._post('property', _formset('form', [{
+            'owner_name': 'Gita', 'father_or_spouse_name': 'Hari', 'grandfather_or_father_inlaw_name': 'Ram',
+            'district': 'Kaski', 'municipality_vdc': 'Pokhara', 'sheet_no': '1', 'ward_no': '2',
+            'plot_no': '10', 'area': '0-4-0', 'land_type': 'Bari',
+        }]))
+        self._post('family', _formset('form', []))
+        self._post('income_expense', {
+            **_formset('income', [{'field': 'Salary', 'amount': '20,000'}]),
+            **_formset('expense', [{'field': 'Rent', 'amount': '5000'}]),
+        })
+        # Abandoning here would leave nothing behind
+        self.assertFalse(CollateralBasic.objects.filter(member=self.member).exists())
+        self.assertFalse(CollateralProperty.objects.filter(member=self.member).exists())
+
+        response = self._post('affiliation', _formset('form', []))
+        self.assertRedirects(response, reverse('members:member_detail', args=[self.member.member_number]),
+                             fetch_redirect_response=False)
+
+        self.assertEqual(CollateralBasic.objects.get(member=self.member).share_amount_value, Decimal('100'))
+        self.assertEqual(CollateralProperty.objects.filter(member=self.member).count(), 1)
+        income = CollateralIncomeExpense.objects.get(member=self.member, type='income')
+        self.assertEqual(income.amount_value, Decimal('20000'))
+        self.assertTrue(CollateralIncomeExpense.objects.filter(member=self.member, type='expense').exists())
+
+    def test_rows_are_saved_and_deleted_one_by_one(self):
+        income = CollateralIncomeExpense.objects.create(member=self.member, type='income', field='Salary', amount='1000')
+        saved, deleted = mock.Mock(), mock.Mock()
+        post_save.connect(saved, sender=CollateralIncomeExpense)
+        post_delete.connect(deleted, sender=CollateralIncomeExpense)
+        self.addCleanup(post_save.disconnect, saved, sender=CollateralIncomeExpense)
+        self.addCleanup(post_delete.disconnect, deleted, sender=CollateralIncomeExpense)
+
+        self._post('income_expense', {
+            **_formset('income', [{'id': str(income.pk), 'field': 'Salary', 'amount': '25,000', 'DELETE': ''}], initial=1),
+            **_formset('expense', [{'field': 'Rent', 'amount': '5000'}]),
+        })
+        self._post('affiliation', _formset('form', []))
+
+        income.refresh_from_db()
+        # save() ran, so the shadow column follows the typed amount
+        self.assertEqual(income.amount_value, Decimal('25000'))
+        self.assertEqual(saved.call_count, 2)
+        deleted.assert_not_called()
+
+        self._post('income_expense', {
+            **_formset('income', [{'id': str(income.pk), 'field': 'Salary', 'amount': '25,000', 'DELETE': 'on'}], initial=1),
+            **_formset('expense', []),
+        })
+        self._post('affiliation', _formset('form', []))
+        self.assertFalse(CollateralIncomeExpense.objects.filter(pk=income.pk).exists())
+        deleted.assert_called_once()
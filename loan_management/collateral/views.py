@@ -1,6 +1,8 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
+from django.http import Http404
 from django.forms import formset_factory, modelformset_factory
 from .forms import (
     CollateralBasicForm,
@@ -17,227 +19,217 @@ from .models import (
     CollateralAffiliation,
 )
 from members.models import Member
+from members.dossier import load_member_dossier
+from utils.wizard_draft import WizardDraft
 
 
-@login_required
-def basic_form(request, member_number):
-    """Collateral Basic information form"""
+PropertyFormSet = modelformset_factory(
+    CollateralProperty,
+    form=CollateralPropertyForm,
+    extra=1,
+    can_delete=True
+)
+
+FamilyFormSet = modelformset_factory(
+    CollateralFamilyDetail,
+    form=CollateralFamilyDetailForm,
+    extra=1,
+    can_delete=True
+)
+
+IncomeFormSet = modelformset_factory(
+    CollateralIncomeExpense,
+    form=CollateralIncomeExpenseForm,
+    extra=1,
+    can_delete=True
+)
+
+AffiliationFormSet = modelformset_factory(
+    CollateralAffiliation,
+    form=CollateralAffiliationForm,
+    extra=1,
+    can_delete=True
+)
+
+# Steps of the collateral wizard, in order
+COLLATERAL_WIZARD_STEPS = ['basic', 'property', 'family', 'income_expense', 'affiliation']
+
+
+def _step_forms(member, step, data=None):
+    """Form / formsets of a step, bound to ``data`` when given, keyed by their template names"""
+    if step == 'basic':
+        instance = CollateralBasic.objects.filter(member=member).first()
+        return {'form': CollateralBasicForm(data, instance=instance)}
+    if step == 'property':
+        return {'formset': PropertyFormSet(data, queryset=CollateralProperty.objects.filter(member=member))}
+    if step == 'family':
+        return {'formset': FamilyFormSet(data, queryset=CollateralFamilyDetail.objects.filter(member=member))}
+    if step == 'income_expense':
+        return {
+            'income_formset': IncomeFormSet(
+                data,
+                queryset=CollateralIncomeExpense.objects.filter(member=member, type='income'),
+                prefix='income'
+            ),
+            'expense_formset': IncomeFormSet(
+                data,
+                queryset=CollateralIncomeExpense.objects.filter(member=member, type='expense'),
+                prefix='expense'
+            ),
+        }
+    return {'formset': AffiliationFormSet(data, queryset=CollateralAffiliation.objects.filter(member=member))}
+
+
+def _save_formset(formset, member, **values):
+    """
+    Apply a valid formset row by row through save() and delete(), as the
+    loan wizard does, so model save logic (money shadow columns) and the
+    post_save / post_delete receivers run for every row.
+    """
+    for instance in formset.save(commit=False):
+        instance.member = member
+        for name, value in values.items():
+            setattr(instance, name, value)
+        instance.save()
+    for obj in formset.deleted_objects:
+        obj.delete()
+
+
+def _commit_collateral_draft(member, draft):
+    """
+    Write every step of a collateral draft in one transaction.
+
+    Stored steps are bound again to the member's current rows and
+    validated first. Returns the first step that no longer validates,
+    or None once written.
+    """
+    bound = {}
+    for step in COLLATERAL_WIZARD_STEPS:
+        data = draft.data(step)
+        if data is None:
+            continue
+        forms = _step_forms(member, step, data)
+        if not all(form.is_valid() for form in forms.values()):
+            return step
+        bound[step] = forms
+
+    with transaction.atomic():
+        for step, forms in bound.items():
+            if step == 'basic':
+                basic = forms['form'].save(commit=False)
+                basic.member = member
+                basic.save()
+            elif step == 'income_expense':
+                _save_formset(forms['income_formset'], member, type='income')
+                _save_formset(forms['expense_formset'], member, type='expense')
+            else:
+                _save_formset(forms['formset'], member)
+    draft.discard()
+    return None
+
+
+def _collateral_step(request, member_number, step, template, step_name, success_message):
+    """
+    One step of the collateral wizard.
+
+    A valid submit is kept in the session draft and moves on to the next
+    step; the last step writes the whole draft at once.
+    """
     member = get_object_or_404(Member, member_number=member_number)
-    instance = CollateralBasic.objects.filter(member=member).first()
+    draft = WizardDraft(request, 'collateral', member_number)
+    index = COLLATERAL_WIZARD_STEPS.index(step)
 
     if request.method == 'POST':
-        form = CollateralBasicForm(request.POST, instance=instance)
-        if form.is_valid():
-            collateral = form.save(commit=False)
-            collateral.member = member
-            collateral.save()
-            messages.success(request, 'आधारभूत धितो जानकारी सेभ भयो।')
-            return redirect('collateral:property_form', member_number=member_number)
+        forms = _step_forms(member, step, request.POST)
+        if all(form.is_valid() for form in forms.values()):
+            draft.save_step(step, request.POST)
+            messages.success(request, success_message)
+            if index + 1 < len(COLLATERAL_WIZARD_STEPS):
+                return redirect(f'collateral:{COLLATERAL_WIZARD_STEPS[index + 1]}_form', member_number=member_number)
+
+            invalid_step = _commit_collateral_draft(member, draft)
+            if invalid_step:
+                messages.error(request, 'कृपया फाराम सही तरिकाले भर्नुहोस्।')
+                return redirect(f'collateral:{invalid_step}_form', member_number=member_number)
+            # Redirect to loan detail or member detail after all collateral done
+            return redirect('members:member_detail', member_number=member_number)
         else:
             messages.error(request, 'कृपया फाराम सही तरिकाले भर्नुहोस्।')
     else:
-        form = CollateralBasicForm(instance=instance)
+        forms = _step_forms(member, step, draft.data(step))
 
-    return render(request, 'collateral/basic_form.html', {
-        'form': form,
+    return render(request, template, {
+        **forms,
         'member': member,
-        'step': 1,
-        'total_steps': 5,
-        'step_name': 'आधारभूत जानकारी',
+        'step': index + 1,
+        'total_steps': len(COLLATERAL_WIZARD_STEPS),
+        'step_name': step_name,
     })
 
 
 @login_required
-def property_form(request, member_number):
-    """Collateral Property details (Dhito Bibaran)"""
-    member = get_object_or_404(Member, member_number=member_number)
-    properties = CollateralProperty.objects.filter(member=member)
-
-    PropertyFormSet = modelformset_factory(
-        CollateralProperty,
-        form=CollateralPropertyForm,
-        extra=1,
-        can_delete=True
+def basic_form(request, member_number):
+    """Collateral Basic information form"""
+    return _collateral_step(
+        request, member_number, 'basic', 'collateral/basic_form.html',
+        'आधारभूत जानकारी', 'आधारभूत धितो जानकारी सेभ भयो।',
     )
 
-    if request.method == 'POST':
-        formset = PropertyFormSet(request.POST, queryset=properties)
-        if formset.is_valid():
-            instances = formset.save(commit=False)
-            for instance in instances:
-                instance.member = member
-                instance.save()
-            for obj in formset.deleted_objects:
-                obj.delete()
-            messages.success(request, 'जग्गा धितो जानकारी सेभ भयो।')
-            return redirect('collateral:family_form', member_number=member_number)
-        else:
-            messages.error(request, 'कृपया फाराम सही तरिकाले भर्नुहोस्।')
-    else:
-        formset = PropertyFormSet(queryset=properties)
 
-    return render(request, 'collateral/property_form.html', {
-        'formset': formset,
-        'member': member,
-        'step': 2,
-        'total_steps': 5,
-        'step_name': 'जग्गा धितो विवरण',
-    })
+@login_required
+def property_form(request, member_number):
+    """Collateral Property details (Dhito Bibaran)"""
+    return _collateral_step(
+        request, member_number, 'property', 'collateral/property_form.html',
+        'जग्गा धितो विवरण', 'जग्गा धितो जानकारी सेभ भयो।',
+    )
 
 
 @login_required
 def family_form(request, member_number):
     """Family details for collateral"""
-    member = get_object_or_404(Member, member_number=member_number)
-    family_members = CollateralFamilyDetail.objects.filter(member=member)
-
-    FamilyFormSet = modelformset_factory(
-        CollateralFamilyDetail,
-        form=CollateralFamilyDetailForm,
-        extra=1,
-        can_delete=True
+    return _collateral_step(
+        request, member_number, 'family', 'collateral/family_form.html',
+        'परिवार विवरण', 'परिवार विवरण सेभ भयो।',
     )
 
-    if request.method == 'POST':
-        formset = FamilyFormSet(request.POST, queryset=family_members)
-        if formset.is_valid():
-            instances = formset.save(commit=False)
-            for instance in instances:
-                instance.member = member
-                instance.save()
-            for obj in formset.deleted_objects:
-                obj.delete()
-            messages.success(request, 'परिवार विवरण सेभ भयो।')
-            return redirect('collateral:income_expense_form', member_number=member_number)
-        else:
-            messages.error(request, 'कृपया फाराम सही तरिकाले भर्नुहोस्।')
-    else:
-        formset = FamilyFormSet(queryset=family_members)
-
-    return render(request, 'collateral/family_form.html', {
-        'formset': formset,
-        'member': member,
-        'step': 3,
-        'total_steps': 5,
-        'step_name': 'परिवार विवरण',
-    })
-
 
 @login_required
 def income_expense_form(request, member_number):
     """Income and Expense tracking"""
-    member = get_object_or_404(Member, member_number=member_number)
-    income_items = CollateralIncomeExpense.objects.filter(member=member, type='income')
-    expense_items = CollateralIncomeExpense.objects.filter(member=member, type='expense')
-
-    IncomeFormSet = modelformset_factory(
-        CollateralIncomeExpense,
-        form=CollateralIncomeExpenseForm,
-        extra=1,
-        can_delete=True
+    return _collateral_step(
+        request, member_number, 'income_expense', 'collateral/income_expense_form.html',
+        'आय/व्यय विवरण', 'आय/व्यय विवरण सेभ भयो।',
     )
 
-    if request.method == 'POST':
-        income_formset = IncomeFormSet(
-            request.POST,
-            queryset=income_items,
-            prefix='income'
-        )
-        expense_formset = IncomeFormSet(
-            request.POST,
-            queryset=expense_items,
-            prefix='expense'
-        )
-
-        if income_formset.is_valid() and expense_formset.is_valid():
-            for formset, ie_type in [(income_formset, 'income'), (expense_formset, 'expense')]:
-                instances = formset.save(commit=False)
-                for instance in instances:
-                    instance.member = member
-                    instance.type = ie_type
-                    instance.save()
-                for obj in formset.deleted_objects:
-                    obj.delete()
-            messages.success(request, 'आय/व्यय विवरण सेभ भयो।')
-            return redirect('collateral:affiliation_form', member_number=member_number)
-        else:
-            messages.error(request, 'कृपया फाराम सही तरिकाले भर्नुहोस्।')
-    else:
-        income_formset = IncomeFormSet(queryset=income_items, prefix='income')
-        expense_formset = IncomeFormSet(queryset=expense_items, prefix='expense')
-
-    return render(request, 'collateral/income_expense_form.html', {
-        'income_formset': income_formset,
-        'expense_formset': expense_formset,
-        'member': member,
-        'step': 4,
-        'total_steps': 5,
-        'step_name': 'आय/व्यय विवरण',
-    })
-
 
 @login_required
 def affiliation_form(request, member_number):
-    """Organizational Affiliations"""
-    member = get_object_or_404(Member, member_number=member_number)
-    affiliations = CollateralAffiliation.objects.filter(member=member)
-
-    AffiliationFormSet = modelformset_factory(
-        CollateralAffiliation,
-        form=CollateralAffiliationForm,
-        extra=1,
-        can_delete=True
+    """Organizational Affiliations; submitting it writes the whole draft"""
+    return _collateral_step(
+        request, member_number, 'affiliation', 'collateral/affiliation_form.html',
+        'संस्था सम्बन्ध', 'संस्था सम्बन्ध विवरण सेभ भयो।',
     )
 
-    if request.method == 'POST':
-        formset = AffiliationFormSet(request.POST, queryset=affiliations)
-        if formset.is_valid():
-            instances = formset.save(commit=False)
-            for instance in instances:
-                instance.member = member
-                instance.save()
-            for obj in formset.deleted_objects:
-                obj.delete()
-            messages.success(request, 'संस्था सम्बन्ध विवरण सेभ भयो।')
-            # Redirect to loan detail or member detail after all collateral done
-            return redirect('members:member_detail', member_number=member_number)
-        else:
-            messages.error(request, 'कृपया फाराम सही तरिकाले भर्नुहोस्।')
-    else:
-        formset = AffiliationFormSet(queryset=affiliations)
-
-    return render(request, 'collateral/affiliation_form.html', {
-        'formset': formset,
-        'member': member,
-        'step': 5,
-        'total_steps': 5,
-        'step_name': 'संस्था सम्बन्ध',
-    })
-
 
 @login_required
 def collateral_overview(request, member_number):
     """Overview of all collateral info for a member"""
-    member = get_object_or_404(Member, member_number=member_number)
-    basic = CollateralBasic.objects.filter(member=member).first()
-    properties = CollateralProperty.objects.filter(member=member)
-    family = CollateralFamilyDetail.objects.filter(member=member)
-    income = CollateralIncomeExpense.objects.filter(member=member, type='income')
-    expense = CollateralIncomeExpense.objects.filter(member=member, type='expense')
-    affiliations = CollateralAffiliation.objects.filter(member=member)
-
-    total_income = sum(float(i.amount or 0) for i in income)
-    total_expense = sum(float(e.amount or 0) for e in expense)
+    try:
+        dossier = load_member_dossier(member_number)
+    except Member.DoesNotExist:
+        raise Http404("Member not found")
+    member = dossier.member
 
     return render(request, 'collateral/overview.html', {
         'member': member,
-        'basic': basic,
-        'properties': properties,
-        'family': family,
-        'income': income,
-        'expense': expense,
-        'affiliations': affiliations,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'net_income': total_income - total_expense,
-    })
\ No newline at end of file
+        'basic': dossier.collateral_basic,
+        'properties': dossier.properties,
+        'family': dossier.family,
+        'income': dossier.income,
+        'expense': dossier.expense,
+        'affiliations': dossier.affiliations,
+        'total_income': dossier.total_income,
+        'total_expense': dossier.total_expense,
+        'net_income': dossier.net_income,
+    })
@@ -0,0 +1,89 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from collateral.models import CollateralIncomeExpense
+from loans.models import LoanInfo, LoanInstallment, LoanStatusEvent
+from members.dossier import DOSSIER_RELATIONS
+from members.models import Member
+from reports.models import ReportTracking
+
+ACTIVE_STATUSES = ['pending', 'approved', 'disbursed']
+
+
+def hot_queries(member_number, loan_id):
+    """(label, queryset) of the queries behind the busiest pages"""
+    today = timezone.localdate()
+    queries = [
+        ('dashboard: loans of a status, newest first',
+         LoanInfo.objects.select_related('member').filter(status='pending').order_by('-id')[:10]),
+        ('loan list: newest first',
+         LoanInfo.objects.select_related('member', 'loanbalance').order_by('-created_at')[:50]),
+        ('loan list: status filter',
+         LoanInfo.objects.select_related('member', 'loanbalance').filter(status='approved').order_by('-created_at')[:50]),
+        ('member list: members with an active loan',
+         Member.objects.filter(Exists(LoanInfo.objects.filter(
+             member=OuterRef('member_number'), status__in=ACTIVE_STATUSES,
+         ))).order_by('-date', '-member_number')[:25]),
+        ('report: latest loan of a member',
+         LoanInfo.objects.filter(member_id=member_number).order_by('-id')[:1]),
+        ('collateral: income rows of a member',
+         CollateralIncomeExpense.objects.filter(member_id=member_number, type='income')),
+        ('report history: newest first',
+         ReportTracking.objects.select_related('member').order_by('-generated_date')[:50]),
+        ('report history: one member',
+         ReportTracking.objects.filter(member_id=member_number).order_by('-generated_date')),
+        ('ledger: installments of a loan',
+         LoanInstallment.objects.filter(loan_id=loan_id)),
+        ('ledger: amount fallen due (arrears roll)',
+         LoanInstallment.objects.filter(loan_id=loan_id, due_date__lte=today).order_by().values('amount_due')),
+        ('status log: approvals in the last 30 days',
+         LoanStatusEvent.objects.filter(to_status='approved', changed_at__gte=timezone.now() - timedelta(days=30))),
+    ]
+    for relation in DOSSIER_RELATIONS:
+        model = Member._meta.get_field(relation[:-len('_set')]).related_model
+        queries.append((f'dossier: {relation}', model.objects.filter(member_id=member_number).order_by('id')))
+    return queries
+
+
+def is_full_scan(plan_line):
+    """A plan step reading a whole table, or sorting rows an index could have ordered"""
+    line = plan_line.strip()
+    if connection.vendor == 'sqlite':
+        detail = line.split('SCAN ', 1)[-1] if 'SCAN ' in line else ''
+        return (detail and 'USING' not in detail and 'CONSTANT ROW' not in detail) or 'TEMP B-TREE' in line
+    return 'Seq Scan' in line or line.startswith('Sort')
+
+
+class Command(BaseCommand):
+    help = "Print the query plan (EXPLAIN) of the hot page queries and flag full table scans"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help="Exit with an error when any query scans a whole table (for CI)")
+        parser.add_argument('--sql', action='store_true', help="Also print each query's SQL")
+
+    def handle(self, *args, **options):
+        member_number = Member.objects.values_list('member_number', flat=True).first() or '0'
+        loan_id = LoanInfo.objects.values_list('id', flat=True).first() or 0
+
+        flagged = []
+        for label, queryset in hot_queries(member_number, loan_id):
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            if options['sql']:
+                self.stdout.write(f"  {queryset.query}")
+            for line in queryset.explain().splitlines():
+                if is_full_scan(line):
+                    flagged.append(label)
+                    self.stdout.write(self.style.WARNING(f"  {line}"))
+                else:
+                    self.stdout.write(f"  {line}")
+
+        if flagged:
+            message = f"{len(set(flagged))} query(s) scan a whole table or sort without an index"
+            if options['fail_on_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("Every hot query uses an index"))
@@ -0,0 +1,21 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from loans.models import LoanInfo, LoanBalance
+from loans.signals import loans_bulk_changed
+from members.models import Member
+from members.signals import members_bulk_changed
+from .stats import invalidate_portfolio_stats
+
+
+@receiver(post_save, sender=LoanInfo)
+@receiver(post_delete, sender=LoanInfo)
+@receiver(post_save, sender=LoanBalance)
+@receiver(post_delete, sender=LoanBalance)
+@receiver(post_save, sender=Member)
+@receiver(post_delete, sender=Member)
+@receiver(loans_bulk_changed)
+@receiver(members_bulk_changed)
+def drop_portfolio_stats(sender, **kwargs):
+    """Recount after the change commits, so a reader cannot re-cache the old numbers"""
+    transaction.on_commit(invalidate_portfolio_stats)
@@ -0,0 +1,64 @@
+"""
+Portfolio counters shown on the dashboard and the member list.
+
+Loan counts per status come from one grouped COUNT, member counts from one
+aggregate and the outstanding principal from one SUM. The result is kept in
+the cache and dropped by dashboard.signals whenever a loan, member or loan
+balance changes (including bulk writes, which announce themselves), so page
+loads read the counters instead of counting the big tables.
+The cache must be shared between worker processes (settings.CACHES uses
+the file based backend), or a drop in one process leaves the others
+showing old totals. ``DASHBOARD_STATS_CACHE_SECONDS`` bounds how stale
+they get after changes that no signal announces.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from loans.models import LoanInfo, LoanBalance
+from members.models import Member
+
+STATS_CACHE_KEY = 'dashboard:portfolio_stats'
+
+# Loans a member is still engaged in
+ACTIVE_STATUSES = ('pending', 'approved', 'disbursed')
+
+
+def compute_portfolio_stats(today=None):
+    today = today or timezone.localdate()
+    month_start = today.replace(day=1)
+
+    loans_by_status = dict(
+        LoanInfo.objects.order_by().values_list('status').annotate(total=Count('id'))
+    )
+    members = Member.objects.aggregate(
+        total=Count('id'),
+        new_this_month=Count('id', filter=Q(date__gte=month_start)),
+    )
+    outstanding = LoanBalance.objects.aggregate(total=Sum('principal_outstanding'))['total']
+
+    return {
+        'month_start': month_start,
+        'loans_by_status': loans_by_status,
+        'total_loans': sum(loans_by_status.values()),
+        'pending_loans': loans_by_status.get('pending', 0),
+        'approved_loans': loans_by_status.get('approved', 0),
+        'active_loans': sum(loans_by_status.get(status, 0) for status in ACTIVE_STATUSES),
+        'total_members': members['total'],
+        'new_this_month': members['new_this_month'],
+        'portfolio_outstanding': outstanding or 0,
+    }
+
+
+def get_portfolio_stats():
+    """Cached counters, recomputed when dropped, expired or a new month began"""
+    today = timezone.localdate()
+    stats = cache.get(STATS_CACHE_KEY)
+    if stats is None or stats['month_start'] != today.replace(day=1):
+        stats = compute_portfolio_stats(today)
+        cache.set(STATS_CACHE_KEY, stats, getattr(settings, 'DASHBOARD_STATS_CACHE_SECONDS', 300))
+    return stats
+
+
+def invalidate_portfolio_stats():
+    cache.delete(STATS_CACHE_KEY)
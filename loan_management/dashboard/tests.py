@@ -1,3 +1,55 @@
+from datetime import date
+from io import StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+from loans.approval import approve_loans
+from loans.models import LoanInfo
+from members.models import Member
+from .stats import get_portfolio_stats
 
-# Create your tests here.
+
+class ExplainQueriesTests(TestCase):
+
+    def test_hot_queries_use_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', '--fail-on-scan', stdout=out)
+        self.assertIn('Every hot query uses an index', out.getvalue())
+
+
+class PortfolioStatsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.member = Member.objects.create(date=date(2024, 1, 1), member_number='7001', member_name='Ram')
+        self.loan_ids = [self._make_loan().id for _ in range(12)]
+
+    def _make_loan(self):
+        return LoanInfo.objects.create(
+            member=self.member, loan_type='Business', interest_rate=12, loan_duration='वार्षिक',
+            repayment_duration='मासिक', loan_amount='10000', loan_amount_in_words='',
+            loan_completion_year='', loan_completion_month='', loan_completion_day='',
+        )
+
+    def test_counters_follow_saves_and_bulk_updates(self):
+        self.assertEqual(get_portfolio_stats()['pending_loans'], 12)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            approve_loans(self.loan_ids[:5], '2082-01-01', 'A', 'B', 'C', 'D')
+        stats = get_portfolio_stats()
+        self.assertEqual((stats['pending_loans'], stats['approved_loans']), (7, 5))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._make_loan()
+        self.assertEqual(get_portfolio_stats()['total_loans'], 13)
+
+    def test_dashboard_reads_cached_counters(self):
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+        get_portfolio_stats()
+        # session + user + one page of loans
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('dashboard:home'), {'status': 'pending', 'page': 2})
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertEqual(len(response.context['page_obj']), 2)
@@ -1,18 +1,25 @@
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
+from django.db.models import Q
 from loans.models import LoanInfo
-from members.models import Member
+from .stats import get_portfolio_stats
+
+
+class CountedPaginator(Paginator):
+    """Paginator that takes the row count from the cached counters instead of a COUNT query"""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
 
 @login_required
 def home(request):
     """Main Dashboard"""
 
-    #Get statistics
-    total_members = Member.objects.count()
-    total_loans = LoanInfo.objects.count()
-    pending_loans = LoanInfo.objects.filter(status='pending').count()
-    approved_loans = LoanInfo.objects.filter(status='approved').count()
+    # Statistics from the cached counters, no COUNT over the big tables
+    stats = get_portfolio_stats()
 
     # Status filter
     status_filter = request.GET.get('status', '')
@@ -24,28 +31,28 @@ def home(request):
         loans_qs = loans_qs.filter(status=status_filter)
 
     if search_query:
-        loans_qs = loans_qs.filte(
-            member__member_name__icontains=search_query
-        ) | loans_qs.filter(
-            member__member_number__icontains=search_query
+        loans_qs = loans_qs.filter(
+            Q(member__member_name__icontains=search_query) |
+            Q(member__member_number__icontains=search_query)
         )
+        paginator = Paginator(loans_qs, 10)
+    else:
+        count = stats['loans_by_status'].get(status_filter, 0) if status_filter else stats['total_loans']
+        paginator = CountedPaginator(loans_qs, 10, count)
 
     # Pagination - 10 per page
-    paginator = Paginator(loans_qs, 10)
     page_number = request.GET.get('page', 1)
     page_obj = paginator.get_page(page_number)
 
-    # Recent Loans
-    # recent_loans = LoanInfo.objects.select_related('member').order_by('-created_at')[:10]
-
     context = {
-        'total_members': total_members,
-        'total_loans': total_loans,
-        'pending_loans': pending_loans,
-        'approved_loans': approved_loans,
+        'total_members': stats['total_members'],
+        'total_loans': stats['total_loans'],
+        'pending_loans': stats['pending_loans'],
+        'approved_loans': stats['approved_loans'],
+        'portfolio_outstanding': stats['portfolio_outstanding'],
         'page_obj': page_obj,
+        'page_range': paginator.get_elided_page_range(page_obj.number, on_each_side=2, on_ends=1),
         'status_filter': status_filter,
         'search_query': search_query,
     }
     return render(request, 'dashboard/home.html', context)
-
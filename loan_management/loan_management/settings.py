@@ -95,6 +95,16 @@ DATABASES = {
     }
 }
 
+# Shared by every worker process, so the dashboard counters and import
+# progress one process drops or writes are seen by the others. File based
+# rather than the database cache, to keep cache writes off the SQLite lock.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache'),
+    }
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,3 +151,52 @@ AUTH_USER_MODEL = 'accounts.User'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 MEDIA_URL = '/media/'
+
+# Members written per query by the Excel member import
+MEMBER_IMPORT_BATCH_SIZE = 500
+
+# Members fetched per database round trip by the Excel member export
+MEMBER_EXPORT_CHUNK_SIZE = 2000
+
+# Background threads running queued member imports (per process)
+MEMBER_IMPORT_WORKERS = 1
+
+# Interest method of repayment schedules: 'reducing' (EMI) or 'flat'
+LOAN_INTEREST_METHOD = 'reducing'
+
+# Seconds other worker processes may keep serving a stale loan scheme catalog
+LOAN_SCHEME_CACHE_SECONDS = 300
+
+# Dashboard counters are dropped on every change; this only bounds changes no signal announces
+DASHBOARD_STATS_CACHE_SECONDS = 300
+
+# Parsed report templates kept in memory per process (least recently used dropped first)
+REPORT_TEMPLATE_CACHE_SIZE = 16
+
+# Documents of one report request rendered side by side, at most one per CPU (1 renders them in the request)
+REPORT_RENDER_WORKERS = 6
+# Render in worker processes; False (or no working multiprocessing) uses threads
+REPORT_RENDER_PROCESSES = True
+
+# Background threads running queued report batch jobs (per process), and members rendered per step
+REPORT_BATCH_WORKERS = 1
+REPORT_BATCH_CHUNK_SIZE = 50
+# Seconds a batch job may wait in the queue; older queued jobs were lost with a restarted process
+# and are marked failed (manage.py run_report_batches runs them instead)
+REPORT_BATCH_QUEUE_TIMEOUT = 6 * 60 * 60
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'members': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
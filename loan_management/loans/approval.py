@@ -0,0 +1,61 @@
+"""
+Approving many pending loans at once (committee days).
+
+The pending rows are locked (SELECT ... FOR UPDATE where the database
+supports it) and flipped with a conditional UPDATE on status='pending',
+so when two officers approve overlapping selections each loan is approved
+once: the second officer's transaction finds it no longer pending and
+skips it. ApprovalInfo rows are inserted with one bulk_create. Single
+approvals from the loan page go through the same path.
+"""
+from django.db import transaction
+from .models import LoanInfo, ApprovalInfo
+from .status_log import record_transition
+
+
+def approve_loans(loan_ids, approval_date, approved_by, approved_post, entered_by, entered_post, remarks='',
+                  user=None, amounts=None):
+    """
+    Approve those of ``loan_ids`` that are still pending.
+
+    Each loan is approved for its requested amount, unless ``amounts``
+    maps its id to an (amount, amount in words) pair. Returns the ids that
+    this call approved; ids that were not pending (or no longer are) are
+    left out. Raises ValueError, with nothing written, if a selected loan
+    changed status under it.
+    """
+    with transaction.atomic():
+        loans = list(
+            LoanInfo.objects.select_for_update()
+            .filter(pk__in=loan_ids, status='pending')
+            .only('id', 'member', 'loan_amount', 'loan_amount_in_words')
+            .order_by('id')
+        )
+        approved_ids = [loan.id for loan in loans]
+        if not approved_ids:
+            return []
+        amounts = {
+            loan.id: (loan.loan_amount, loan.loan_amount_in_words) for loan in loans
+        } | (amounts or {})
+
+        updated = LoanInfo.objects.filter(pk__in=approved_ids, status='pending').update(status='approved')
+        if updated != len(approved_ids):
+            # Only possible without row locks; roll back rather than approve twice
+            raise ValueError("Some loans changed status while being approved, please try again")
+
+        ApprovalInfo.objects.bulk_create([
+            ApprovalInfo(
+                member_id=loan.member_id,
+                approval_date=approval_date,
+                entered_by=entered_by,
+                entered_post=entered_post,
+                approved_by=approved_by,
+                approved_post=approved_post,
+                approved_loan_amount=amounts[loan.id][0],
+                approved_loan_amount_words=amounts[loan.id][1],
+                remarks=remarks,
+            )
+            for loan in loans
+        ])
+        record_transition(approved_ids, 'pending', 'approved', changed_by=user)
+    return approved_ids
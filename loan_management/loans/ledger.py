@@ -0,0 +1,291 @@
+"""
+Installment and payment ledger of disbursed loans.
+
+Opening a ledger turns the loan's repayment schedule (loans.schedule) into
+LoanInstallment rows and a LoanBalance row. Every posting then adjusts the
+balance row in place: a payment is split over the oldest unpaid
+installments (interest first) and subtracted from the outstanding amounts,
+and arrears move forward as installments fall due. Nothing is ever
+recomputed from the full history, so reading a loan's balance is a single
+row lookup.
+"""
+import calendar
+from datetime import date
+from functools import lru_cache
+from decimal import Decimal
+from django.db import connection, transaction
+from django.db.models import DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+from .models import LoanInfo, LoanInstallment, LoanPayment, LoanBalance
+from .schedule import iter_portfolio_schedules, loan_schedule
+from .signals import loans_bulk_changed
+from .status_log import record_transition
+
+ZERO = Decimal('0.00')
+_CENTS = Decimal('0.01')
+
+
+@lru_cache(maxsize=8192)
+def add_months(start, months):
+    """Same day ``months`` later, clamped to the end of shorter months"""
+    month_index = start.month - 1 + months
+    year = start.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(start.day, calendar.monthrange(year, month)[1]))
+
+
+def _decimal(value):
+    return Decimal(repr(float(value))).quantize(_CENTS)
+
+
+INSTALLMENT_COLUMNS = (
+    'loan_id', 'number', 'due_date', 'principal_due', 'interest_due', 'amount_due',
+    'principal_paid', 'interest_paid',
+)
+BALANCE_COLUMNS = (
+    'loan_id', 'principal_outstanding', 'interest_outstanding', 'total_paid', 'due_to_date',
+    'arrears', 'arrears_as_of', 'next_due_date', 'updated_at',
+)
+
+
+def _build_ledger(loan_id, start_date, rows):
+    """
+    Installment and balance value tuples, in INSTALLMENT_COLUMNS and
+    BALANCE_COLUMNS order, for one loan (updated_at is left out).
+
+    ``rows`` are (number, month, installment, principal, interest, balance)
+    tuples as produced by ScheduleTable.iter_rows without the loan id.
+    """
+    installments = []
+    principal_total = interest_total = ZERO
+    for number, month, _installment, principal, interest, _balance in rows:
+        principal_due = _decimal(principal)
+        interest_due = _decimal(interest)
+        principal_total += principal_due
+        interest_total += interest_due
+        installments.append((
+            loan_id, number, add_months(start_date, month),
+            principal_due, interest_due, principal_due + interest_due, ZERO, ZERO,
+        ))
+
+    next_due_date = installments[0][2] if installments else None
+    balance = (loan_id, principal_total, interest_total, ZERO, ZERO, ZERO, start_date, next_due_date)
+    return installments, balance
+
+
+def _insert_rows(model, columns, rows, batch_size=5000):
+    """
+    INSERT value tuples straight through the cursor with executemany.
+
+    A disbursed portfolio runs to millions of installments; building model
+    instances for bulk_create costs several times more than the inserts.
+    Values must already be plain Python types the database adapts.
+    """
+    quote = connection.ops.quote_name
+    opts = model._meta
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        quote(opts.db_table),
+        ', '.join(quote(opts.get_field(name).column) for name in columns),
+        ', '.join(['%s'] * len(columns)),
+    )
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            cursor.executemany(sql, rows[start:start + batch_size])
+
+
+def open_ledger(loan, start_date=None, method=None):
+    """
+    Create the installments and balance of a loan from its schedule.
+
+    Installments fall due counting from ``start_date`` (today by default).
+    An existing ledger without payments is replaced; one with payments is
+    left alone and ValueError is raised.
+    """
+    start_date = start_date or timezone.localdate()
+    schedule, _table = loan_schedule(loan, method=method)
+    if not schedule:
+        raise ValueError("Loan amount or duration is missing, no schedule can be made")
+
+    rows = [
+        (row['number'], row['month'], row['installment'], row['principal'], row['interest'], row['balance'])
+        for row in schedule
+    ]
+    installments, balance_values = _build_ledger(loan.pk, start_date, rows)
+    balance = LoanBalance(**dict(zip(BALANCE_COLUMNS, balance_values)))
+
+    with transaction.atomic():
+        if LoanPayment.objects.filter(loan=loan).exists():
+            raise ValueError("Payments are already posted for this loan")
+        LoanInstallment.objects.filter(loan=loan).delete()
+        LoanBalance.objects.filter(loan=loan).delete()
+        _insert_rows(LoanInstallment, INSTALLMENT_COLUMNS, installments)
+        _roll_balance(balance, timezone.localdate())
+        balance.save()
+    return balance
+
+
+def open_ledgers(loans, method=None, chunk_size=2000):
+    """
+    Open ledgers for every loan in ``loans`` that has none yet.
+
+    Schedules come from the vectorized engine a chunk at a time and each
+    chunk is inserted in one transaction. Installments count from the
+    loan's created_at date. Returns the number of ledgers opened.
+    """
+    loans = loans.filter(loanbalance__isnull=True)
+    opened = 0
+    for table in iter_portfolio_schedules(loans, method=method, chunk_size=chunk_size):
+        start_dates = {
+            pk: timezone.localdate(created_at)
+            for pk, created_at in LoanInfo.objects.filter(
+                pk__in=table.loan_ids.tolist()
+            ).values_list('pk', 'created_at')
+        }
+
+        rows_by_loan = {}
+        for loan_id, *row in table.iter_rows():
+            rows_by_loan.setdefault(loan_id, []).append(row)
+
+        updated_at = connection.ops.adapt_datetimefield_value(timezone.now())
+        installments, balances = [], []
+        for loan_id, rows in rows_by_loan.items():
+            loan_installments, balance = _build_ledger(loan_id, start_dates[loan_id], rows)
+            installments.extend(loan_installments)
+            balances.append(balance + (updated_at,))
+
+        with transaction.atomic():
+            _insert_rows(LoanInstallment, INSTALLMENT_COLUMNS, installments)
+            _insert_rows(LoanBalance, BALANCE_COLUMNS, balances)
+        opened += len(balances)
+        loans_bulk_changed.send(sender=LoanBalance, loan_ids=list(rows_by_loan))
+
+    roll_arrears()
+    return opened
+
+
+def _roll_balance(balance, as_of):
+    """Move ``balance`` forward to ``as_of``, adding installments that fell due; not saved"""
+    if balance.arrears_as_of >= as_of:
+        return False
+    newly_due = LoanInstallment.objects.filter(
+        loan_id=balance.loan_id,
+        due_date__gt=balance.arrears_as_of,
+        due_date__lte=as_of,
+    ).aggregate(total=Sum('amount_due'))['total'] or ZERO
+    balance.due_to_date += newly_due
+    balance.arrears = max(balance.due_to_date - balance.total_paid, ZERO)
+    balance.arrears_as_of = as_of
+    return True
+
+
+def current_balance(balance, as_of=None):
+    """
+    ``balance`` moved forward to ``as_of`` for display, without saving it.
+
+    Reading a loan never writes; the stored row is rolled by roll_arrears
+    (the daily roll_loan_arrears command) and by post_payment.
+    """
+    if balance is not None:
+        _roll_balance(balance, as_of or timezone.localdate())
+    return balance
+
+
+def roll_arrears(as_of=None):
+    """
+    Move every stale balance forward to ``as_of`` (today by default).
+
+    Done as one UPDATE: for each balance, only the installments that fell
+    due since its last roll are summed, through the (loan, due_date) index.
+    Returns the number of balances rolled.
+    """
+    as_of = as_of or timezone.localdate()
+    newly_due = Coalesce(
+        Subquery(
+            LoanInstallment.objects.filter(
+                loan_id=OuterRef('loan_id'),
+                due_date__gt=OuterRef('arrears_as_of'),
+                due_date__lte=as_of,
+            ).values('loan_id').annotate(total=Sum('amount_due')).values('total')
+        ),
+        Value(ZERO),
+        output_field=DecimalField(max_digits=14, decimal_places=2),
+    )
+    due_to_date = F('due_to_date') + newly_due
+    return LoanBalance.objects.filter(arrears_as_of__lt=as_of).update(
+        due_to_date=due_to_date,
+        arrears=Greatest(due_to_date - F('total_paid'), Value(ZERO)),
+        arrears_as_of=as_of,
+    )
+
+
+def post_payment(loan, amount, paid_on=None, received_by=None, remarks=''):
+    """
+    Record a repayment and update the loan's balance in place.
+
+    The amount is applied to unpaid installments oldest first, interest
+    before principal. Raises ValueError for a loan without a ledger, a
+    non-positive amount or one larger than what is outstanding.
+    """
+    amount = Decimal(amount).quantize(_CENTS)
+    paid_on = paid_on or timezone.localdate()
+    if amount <= ZERO:
+        raise ValueError("Payment amount must be more than zero")
+
+    with transaction.atomic():
+        try:
+            balance = LoanBalance.objects.select_for_update().get(loan=loan)
+        except LoanBalance.DoesNotExist:
+            raise ValueError("This loan has no repayment ledger, disburse it first")
+
+        _roll_balance(balance, max(paid_on, timezone.localdate()))
+        if amount > balance.total_outstanding:
+            raise ValueError(f"Payment is more than the outstanding Rs. {balance.total_outstanding}")
+
+        remaining = amount
+        principal_part = interest_part = ZERO
+        touched = []
+        for installment in LoanInstallment.objects.filter(loan=loan, paid_on__isnull=True).order_by('number'):
+            interest = min(remaining, installment.interest_due - installment.interest_paid)
+            remaining -= interest
+            principal = min(remaining, installment.principal_due - installment.principal_paid)
+            remaining -= principal
+
+            installment.interest_paid += interest
+            installment.principal_paid += principal
+            if installment.is_paid:
+                installment.paid_on = paid_on
+            touched.append(installment)
+            interest_part += interest
+            principal_part += principal
+            if remaining <= ZERO:
+                break
+
+        LoanInstallment.objects.bulk_update(touched, ['principal_paid', 'interest_paid', 'paid_on'])
+
+        payment = LoanPayment.objects.create(
+            loan=loan,
+            paid_on=paid_on,
+            amount=amount,
+            principal_part=principal_part,
+            interest_part=interest_part,
+            received_by=received_by,
+            remarks=remarks,
+        )
+
+        balance.principal_outstanding -= principal_part
+        balance.interest_outstanding -= interest_part
+        balance.total_paid += amount
+        balance.arrears = max(balance.due_to_date - balance.total_paid, ZERO)
+        balance.last_payment_on = max(paid_on, balance.last_payment_on or paid_on)
+        balance.next_due_date = (
+            LoanInstallment.objects.filter(loan=loan, paid_on__isnull=True)
+            .order_by('number').values_list('due_date', flat=True).first()
+        )
+        balance.save()
+
+        if balance.total_outstanding <= ZERO:
+            if LoanInfo.objects.filter(pk=loan.pk, status='disbursed').update(status='completed'):
+                record_transition([loan.pk], 'disbursed', 'completed', changed_by=received_by)
+
+    return payment
@@ -0,0 +1,46 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from utils.money import MoneyShadowMixin, backfill_money_columns
+
+
+def money_models():
+    return [model for model in apps.get_models() if issubclass(model, MoneyShadowMixin)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the Decimal shadow columns of CharField amounts. Works in chunks "
+        "committed one at a time, so it can be stopped and run again: rows "
+        "already filled are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument(
+            '--model', action='append', dest='models',
+            help="Only backfill this model (app_label.ModelName), may be repeated",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = max(options['chunk_size'], 1)
+        models = money_models()
+        if options['models']:
+            try:
+                models = [apps.get_model(label) for label in options['models']]
+            except (LookupError, ValueError) as e:
+                raise CommandError(str(e))
+            unsupported = [m._meta.label for m in models if not issubclass(m, MoneyShadowMixin)]
+            if unsupported:
+                raise CommandError(f"No money columns on: {', '.join(unsupported)}")
+
+        for model in models:
+            processed, unparsed = self.backfill(model, chunk_size)
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.label}: processed {processed} row(s), {unparsed} value(s) could not be parsed"
+            ))
+
+    def backfill(self, model, chunk_size):
+        return backfill_money_columns(
+            model, model.money_fields, chunk_size,
+            progress=lambda last_pk: self.stdout.write(f"  {model._meta.label}: up to id {last_pk}"),
+        )
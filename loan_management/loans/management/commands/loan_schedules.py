@@ -0,0 +1,46 @@
+import csv
+import time
+from django.core.management.base import BaseCommand
+from loans.models import LoanInfo
+from loans.schedule import METHODS, iter_portfolio_schedules
+
+
+class Command(BaseCommand):
+    help = "Compute repayment schedules for the whole loan portfolio, optionally writing them to CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=METHODS)
+        parser.add_argument('--status', action='append', help="Only loans with this status, may be repeated")
+        parser.add_argument('--output', help="CSV file to write every installment to")
+        parser.add_argument('--chunk-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        loans = LoanInfo.objects.all()
+        if options['status']:
+            loans = loans.filter(status__in=options['status'])
+
+        started = time.perf_counter()
+        loan_count = installment_count = 0
+        total_interest = 0.0
+
+        out = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else None
+        try:
+            writer = None
+            if out:
+                writer = csv.writer(out)
+                writer.writerow(['loan_id', 'number', 'month', 'installment', 'principal', 'interest', 'balance'])
+
+            for table in iter_portfolio_schedules(loans, method=options['method'], chunk_size=options['chunk_size']):
+                loan_count += len(table)
+                installment_count += int(table.periods.sum())
+                total_interest += float(table.total_interest.sum())
+                if writer:
+                    writer.writerows(table.iter_rows())
+        finally:
+            if out:
+                out.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{loan_count} loan(s), {installment_count} installment(s), "
+            f"total interest {total_interest:,.2f} in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,37 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from loans.status_log import throughput, turnaround
+
+# (from, to) status pairs whose turnaround is reported
+STAGES = [
+    ('pending', 'approved'),
+    ('approved', 'disbursed'),
+    ('disbursed', 'completed'),
+]
+
+
+class Command(BaseCommand):
+    help = "Report loan status throughput and turnaround times from the status event log"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help="Length of the window ending now (default 30)")
+
+    def handle(self, *args, **options):
+        end = timezone.now()
+        start = end - timedelta(days=options['days'])
+        self.stdout.write(f"Loan status changes {start:%Y-%m-%d} to {end:%Y-%m-%d}")
+
+        counts = throughput(start, end)
+        for status in ('pending', 'approved', 'rejected', 'disbursed', 'completed'):
+            self.stdout.write(f"  {status:<10} {counts.get(status, 0)}")
+
+        for from_status, to_status in STAGES:
+            count, average = turnaround(from_status, to_status, start, end)
+            if average is None:
+                self.stdout.write(f"  {from_status} -> {to_status}: no loans")
+            else:
+                self.stdout.write(
+                    f"  {from_status} -> {to_status}: {count} loan(s), "
+                    f"average {average.total_seconds() / 86400:.1f} day(s)"
+                )
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from loans.ledger import open_ledgers
+from loans.models import LoanInfo
+from loans.schedule import METHODS
+
+
+class Command(BaseCommand):
+    help = (
+        "Open repayment ledgers for disbursed loans that have none yet "
+        "(e.g. loans disbursed before the ledger existed). Installments "
+        "count from each loan's application date."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=METHODS)
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        loans = LoanInfo.objects.filter(status='disbursed')
+        opened = open_ledgers(loans, method=options['method'], chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Opened {opened} ledger(s)"))
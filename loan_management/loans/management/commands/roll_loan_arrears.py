@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+from loans.ledger import roll_arrears
+
+
+class Command(BaseCommand):
+    help = "Move loan balances forward to today, adding installments that fell due to arrears (run daily)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', help="Date to roll to (YYYY-MM-DD), today by default")
+
+    def handle(self, *args, **options):
+        as_of = parse_date(options['as_of']) if options['as_of'] else None
+        rolled = roll_arrears(as_of)
+        self.stdout.write(self.style.SUCCESS(f"Rolled {rolled} loan balance(s) forward"))
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0003_rename_approver_post_approvalinfo_approved_post'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='loaninfo',
+            name='loan_amount_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0004_loaninfo_loan_amount_value'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanBalance',
+            fields=[
+                ('loan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, serialize=False, to='loans.loaninfo')),
+                ('principal_outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('interest_outstanding', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('due_to_date', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('arrears', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('arrears_as_of', models.DateField()),
+                ('next_due_date', models.DateField(blank=True, null=True)),
+                ('last_payment_on', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'loan_balances',
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanInstallment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('due_date', models.DateField()),
+                ('principal_due', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('interest_due', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('amount_due', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('principal_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('interest_paid', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('paid_on', models.DateField(blank=True, null=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='loans.loaninfo')),
+            ],
+            options={
+                'db_table': 'loan_installments',
+                'ordering': ['loan', 'number'],
+                'indexes': [models.Index(fields=['loan', 'due_date'], name='loan_installment_due_idx')],
+                'constraints': [models.UniqueConstraint(fields=('loan', 'number'), name='loan_installment_number_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='LoanPayment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('paid_on', models.DateField()),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('principal_part', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('interest_part', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('remarks', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='loans.loaninfo')),
+                ('received_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'loan_payments',
+                'ordering': ['-paid_on', '-id'],
+                'indexes': [models.Index(fields=['loan', 'paid_on'], name='loan_payment_date_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:25
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0005_loanbalance_loaninstallment_loanpayment'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoanStatusEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(blank=True, max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('approved', 'Approved'), ('rejected', 'Rejected'), ('disbursed', 'Disbursed'), ('completed', 'Completed')], max_length=20)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ('loan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_events', to='loans.loaninfo')),
+            ],
+            options={
+                'db_table': 'loan_status_events',
+                'ordering': ['changed_at', 'id'],
+                'indexes': [models.Index(fields=['to_status', 'changed_at'], name='loan_status_event_status_idx'), models.Index(fields=['loan', 'changed_at'], name='loan_status_event_loan_idx')],
+            },
+        ),
+        # Every existing loan started out pending when it was created; when
+        # later changes happened was never recorded, so they are not made up
+        migrations.RunSQL(
+            "INSERT INTO loan_status_events (loan_id, from_status, to_status, changed_at, changed_by_id) "
+            "SELECT id, '', 'pending', created_at, NULL FROM loan_info",
+            "DELETE FROM loan_status_events",
+        ),
+    ]
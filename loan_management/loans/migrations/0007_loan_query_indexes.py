@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0006_loanstatusevent'),
+        ('members', '0006_member_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='loaninstallment',
+            options={'ordering': ['loan_id', 'number']},
+        ),
+        migrations.AddIndex(
+            model_name='loaninfo',
+            index=models.Index(fields=['-created_at'], name='loan_info_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loaninfo',
+            index=models.Index(fields=['status', '-created_at'], name='loan_info_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loaninfo',
+            index=models.Index(fields=['status', '-id'], name='loan_info_status_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='loaninfo',
+            index=models.Index(fields=['member', 'status'], name='loan_info_member_status_idx'),
+        ),
+    ]
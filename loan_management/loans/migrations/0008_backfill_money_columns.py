@@ -0,0 +1,23 @@
+from django.db import migrations
+from utils.money import backfill_money_columns
+
+# Money columns as they were when the shadows were added
+MONEY_FIELDS = {
+    'loans.LoanInfo': {'loan_amount': 'loan_amount_value'},
+}
+
+
+def fill_shadow_columns(apps, schema_editor):
+    for label, money_fields in MONEY_FIELDS.items():
+        backfill_money_columns(apps.get_model(label), money_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('loans', '0007_loan_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_shadow_columns, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,8 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from members.models import Member
+from utils.money import MoneyShadowMixin, amount_field
 
 class LoanScheme(models.Model):
     """Loan schemes with interest rates"""
@@ -13,7 +16,7 @@ class LoanScheme(models.Model):
     def __str__(self):
         return f"{self.loan_type} - {self.interest_rate}%"
     
-class LoanInfo(models.Model):
+class LoanInfo(MoneyShadowMixin, models.Model):
     """Main loan information"""
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -29,6 +32,7 @@ class LoanInfo(models.Model):
     loan_duration = models.CharField(max_length=50)
     repayment_duration = models.CharField(max_length=50)
     loan_amount = models.CharField(max_length=50)
+    loan_amount_value = amount_field()
     loan_amount_in_words = models.TextField()
     loan_completion_year = models.CharField(max_length=10)
     loan_completion_month = models.CharField(max_length=10)
@@ -36,9 +40,20 @@ class LoanInfo(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    money_fields = {'loan_amount': 'loan_amount_value'}
+
     class Meta:
         db_table = 'loan_info'
         ordering = ['-created_at']
+        indexes = [
+            # Loan list, newest first, with and without a status filter
+            models.Index(fields=['-created_at'], name='loan_info_created_idx'),
+            models.Index(fields=['status', '-created_at'], name='loan_info_status_created_idx'),
+            # Dashboard table, newest id first per status
+            models.Index(fields=['status', '-id'], name='loan_info_status_id_idx'),
+            # Members with an active loan (member list filter)
+            models.Index(fields=['member', 'status'], name='loan_info_member_status_idx'),
+        ]
     
     def __str__(self):
         return f"{self.member.member_number} - {self.loan_type} - {self.loan_amount}"
@@ -111,4 +126,121 @@ class ManjurinamaDetails(models.Model):
     tole = models.CharField(max_length=100)
 
     class Meta:
-        db_table = 'manjurinama_details'
\ No newline at end of file
+        db_table = 'manjurinama_details'
+
+class LoanInstallment(models.Model):
+    """One scheduled installment of a disbursed loan"""
+    loan = models.ForeignKey(LoanInfo, on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    due_date = models.DateField()
+    principal_due = amount_field(shadow=False, default=0)
+    interest_due = amount_field(shadow=False, default=0)
+    amount_due = amount_field(shadow=False, default=0)
+    principal_paid = amount_field(shadow=False, default=0)
+    interest_paid = amount_field(shadow=False, default=0)
+    paid_on = models.DateField(blank=True, null=True)  # when it was fully paid
+
+    class Meta:
+        db_table = 'loan_installments'
+        ordering = ['loan_id', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['loan', 'number'], name='loan_installment_number_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['loan', 'due_date'], name='loan_installment_due_idx'),
+        ]
+
+    @property
+    def amount_paid(self):
+        return self.principal_paid + self.interest_paid
+
+    @property
+    def is_paid(self):
+        return self.amount_paid >= self.amount_due
+
+    def __str__(self):
+        return f"{self.loan_id} - #{self.number} ({self.due_date})"
+
+
+class LoanPayment(models.Model):
+    """A repayment received against a loan, split over its installments"""
+    loan = models.ForeignKey(LoanInfo, on_delete=models.CASCADE)
+    paid_on = models.DateField()
+    amount = amount_field(shadow=False, default=0)
+    principal_part = amount_field(shadow=False, default=0)
+    interest_part = amount_field(shadow=False, default=0)
+    received_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    remarks = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'loan_payments'
+        ordering = ['-paid_on', '-id']
+        indexes = [
+            models.Index(fields=['loan', 'paid_on'], name='loan_payment_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.loan_id} - Rs. {self.amount} on {self.paid_on}"
+
+
+class LoanBalance(models.Model):
+    """
+    Running balance of a loan, updated on every posting.
+
+    Pages and reports read outstanding and arrears from this one row
+    instead of summing installments and payments. ``due_to_date`` is the
+    scheduled amount due up to ``arrears_as_of``; it is moved forward as
+    installments fall due (see loans.ledger.roll_arrears).
+    """
+    loan = models.OneToOneField(LoanInfo, on_delete=models.CASCADE, primary_key=True)
+    principal_outstanding = amount_field(shadow=False, default=0)
+    interest_outstanding = amount_field(shadow=False, default=0)
+    total_paid = amount_field(shadow=False, default=0)
+    due_to_date = amount_field(shadow=False, default=0)
+    arrears = amount_field(shadow=False, default=0)
+    arrears_as_of = models.DateField()
+    next_due_date = models.DateField(blank=True, null=True)
+    last_payment_on = models.DateField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'loan_balances'
+
+    @property
+    def total_outstanding(self):
+        return self.principal_outstanding + self.interest_outstanding
+
+    def __str__(self):
+        return f"{self.loan_id} - Outstanding Rs. {self.total_outstanding}"
+
+
+class LoanStatusEvent(models.Model):
+    """
+    One status change of a loan; rows are only ever appended.
+
+    ``from_status`` is blank for the event written when the loan is
+    created. Indexed for range scans by status and time (throughput) and
+    by loan and time (turnaround), see loans.status_log.
+    """
+    loan = models.ForeignKey(LoanInfo, on_delete=models.CASCADE, related_name='status_events')
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20, choices=LoanInfo.STATUS_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+
+    class Meta:
+        db_table = 'loan_status_events'
+        ordering = ['changed_at', 'id']
+        indexes = [
+            models.Index(fields=['to_status', 'changed_at'], name='loan_status_event_status_idx'),
+            models.Index(fields=['loan', 'changed_at'], name='loan_status_event_loan_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise ValueError("Loan status events cannot be changed once written")
+        super().save(*args, **kwargs)
+
+    def __str__(self):
+        return f"{self.loan_id} - {self.from_status or 'new'} -> {self.to_status} ({self.changed_at:%Y-%m-%d})"
@@ -0,0 +1,67 @@
+"""
+Process-local cache of the loan scheme catalog.
+
+Schemes change a few times a year but are read by every loan form and
+the scheme list. The catalog is loaded once per process and dropped by
+the LoanScheme save/delete signals (loans.signals), so an edit is seen at
+once by the process that made it. Other worker processes reload after
+``LOAN_SCHEME_CACHE_SECONDS`` at the latest.
+"""
+import hashlib
+import json
+import threading
+import time
+from django.conf import settings
+from .models import LoanScheme
+
+_lock = threading.Lock()
+_catalog = None
+
+
+class SchemeCatalog:
+    """All loan schemes ordered by loan type, with their rates and an ETag"""
+
+    def __init__(self, schemes):
+        self.schemes = tuple(schemes)
+        self.rates = {scheme.loan_type: scheme.interest_rate for scheme in self.schemes}
+        self.payload = {
+            'schemes': [
+                {'id': scheme.id, 'loan_type': scheme.loan_type, 'interest_rate': scheme.interest_rate}
+                for scheme in self.schemes
+            ]
+        }
+        body = json.dumps(self.payload, ensure_ascii=False, sort_keys=True)
+        self.etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+        self.loaded_at = time.monotonic()
+
+    def __iter__(self):
+        return iter(self.schemes)
+
+    def __len__(self):
+        return len(self.schemes)
+
+    def rate_for(self, loan_type):
+        return self.rates.get(loan_type)
+
+
+def _max_age():
+    return getattr(settings, 'LOAN_SCHEME_CACHE_SECONDS', 300)
+
+
+def get_scheme_catalog():
+    """The cached catalog, loaded with one query when missing or expired"""
+    global _catalog
+    catalog = _catalog
+    if catalog is not None and time.monotonic() - catalog.loaded_at < _max_age():
+        return catalog
+    with _lock:
+        # Another thread may have reloaded (or invalidated) while we waited
+        if _catalog is None or _catalog is catalog:
+            _catalog = SchemeCatalog(LoanScheme.objects.order_by('loan_type'))
+        return _catalog
+
+
+def invalidate_scheme_catalog():
+    global _catalog
+    with _lock:
+        _catalog = None
@@ -0,0 +1,25 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import LoanInfo, LoanScheme
+from .scheme_catalog import invalidate_scheme_catalog
+
+# Sent after writes that bypass model signals (queryset updates, bulk
+# inserts) and change loan statuses or balances, with the affected loan_ids
+loans_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=LoanScheme)
+@receiver(post_delete, sender=LoanScheme)
+def drop_scheme_catalog(sender, **kwargs):
+    """Scheme create/edit/delete (views or admin) reloads the catalog once the change commits"""
+    transaction.on_commit(invalidate_scheme_catalog)
+
+
+@receiver(post_save, sender=LoanInfo)
+def log_new_loan(sender, instance, created, raw=False, **kwargs):
+    """A new loan starts its status history; later changes are logged where they happen"""
+    from .status_log import record_transition
+
+    if created and not raw:
+        record_transition([instance.pk], '', instance.status, changed_at=instance.created_at)
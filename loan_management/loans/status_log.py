@@ -0,0 +1,69 @@
+"""
+Status history of loans and the metrics read from it.
+
+LoanInfo.status only holds the current state. Every place that moves a
+loan to another status also appends a LoanStatusEvent through
+``record_transition``, so questions like "how many loans were approved
+last month" or "how long do loans wait for approval" are range scans over
+the (to_status, changed_at) and (loan, changed_at) indexes instead of
+guesses from the current state.
+"""
+from datetime import timedelta
+from django.db.models import Count, OuterRef, Subquery
+from django.utils import timezone
+from .models import LoanStatusEvent
+from .signals import loans_bulk_changed
+
+
+def record_transition(loan_ids, from_status, to_status, changed_by=None, changed_at=None):
+    """Append one event per loan id, in one INSERT, and announce the change"""
+    changed_at = changed_at or timezone.now()
+    events = LoanStatusEvent.objects.bulk_create([
+        LoanStatusEvent(
+            loan_id=loan_id,
+            from_status=from_status or '',
+            to_status=to_status,
+            changed_at=changed_at,
+            changed_by=changed_by,
+        )
+        for loan_id in loan_ids
+    ])
+    loans_bulk_changed.send(sender=LoanStatusEvent, loan_ids=[event.loan_id for event in events])
+
+
+def throughput(start, end):
+    """{status: number of loans that entered it} for events in [start, end)"""
+    rows = (
+        LoanStatusEvent.objects
+        .filter(changed_at__gte=start, changed_at__lt=end)
+        .values('to_status')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    return {row['to_status']: row['total'] for row in rows}
+
+
+def turnaround(from_status, to_status, start, end):
+    """
+    Time loans spent from entering ``from_status`` to entering ``to_status``.
+
+    Covers loans that reached ``to_status`` within [start, end). Returns
+    (count, average timedelta), the average being None when there were none.
+    """
+    entered = (
+        LoanStatusEvent.objects
+        .filter(loan=OuterRef('loan'), to_status=from_status, changed_at__lte=OuterRef('changed_at'))
+        .order_by('-changed_at')
+        .values('changed_at')[:1]
+    )
+    pairs = (
+        LoanStatusEvent.objects
+        .filter(to_status=to_status, changed_at__gte=start, changed_at__lt=end)
+        .annotate(entered_at=Subquery(entered))
+        .exclude(entered_at=None)
+        .values_list('entered_at', 'changed_at')
+    )
+    waits = [reached - entered_at for entered_at, reached in pairs]
+    if not waits:
+        return 0, None
+    return len(waits), sum(waits, timedelta()) / len(waits)
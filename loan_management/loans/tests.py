@@ -1,3 +1,405 @@
+from datetime import date
+from decimal import Decimal
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+from django.apps import apps as django_apps
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import OperationalError
+from django.db.models.signals import post_save
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+from collateral.models import CollateralIncomeExpense
+from members.dossier import load_member_dossier, load_member_dossiers
+from members.models import Member
+from utils.money import parse_amount, sum_shadow, unsynced_total
+from .approval import approve_loans
+from .ledger import add_months, open_ledger, open_ledgers, post_payment, roll_arrears
+from .models import (LoanInfo, LoanInstallment, LoanBalance, LoanScheme, ApprovalInfo, LoanStatusEvent,
+                     WitnessInfo, GuarantorDetails, ManjurinamaDetails)
+from .schedule import compute_schedules, duration_months, interval_months, iter_portfolio_schedules, loan_schedule
+from .scheme_catalog import get_scheme_catalog, invalidate_scheme_catalog
+from .status_log import throughput, turnaround
 
-# Create your tests here.
+
+class MoneyColumnTests(TestCase):
+
+    def test_parse_amount(self):
+        self.assertEqual(parse_amount('1,50,000'), Decimal('150000.00'))
+        self.assertEqual(parse_amount('रु. १२,५००.५'), Decimal('12500.50'))
+        self.assertIsNone(parse_amount(''))
+        self.assertIsNone(parse_amount('about 5 lakh'))
+
+    def test_backfill_fills_shadow_columns_and_can_be_rerun(self):
+        member = Member.objects.create(date=date(2024, 1, 1), member_number='2001', member_name='Hari')
+        for amount in ('100000', '२५,०००', 'n/a'):
+            LoanInfo.objects.create(
+                member=member, loan_type='Business', interest_rate=12, loan_duration='1',
+                repayment_duration='1', loan_amount=amount, loan_amount_in_words='',
+                loan_completion_year='', loan_completion_month='', loan_completion_day='',
+                status='approved',
+            )
+        # Rows saved before the shadow column existed
+        LoanInfo.objects.update(loan_amount_value=None)
+
+        call_command('backfill_money_columns', '--model', 'loans.LoanInfo', '--chunk-size', '2', stdout=StringIO())
+        call_command('backfill_money_columns', '--model', 'loans.LoanInfo', stdout=StringIO())
+
+        values = sorted(LoanInfo.objects.values_list('loan_amount_value', flat=True), key=str)
+        self.assertEqual(values, [Decimal('100000.00'), Decimal('25000.00'), None])
+
+    def test_rows_without_shadow_are_parsed_and_migrated(self):
+        member = Member.objects.create(date=date(2024, 1, 1), member_number='2002', member_name='Hari')
+        for amount, type_ in (('५,०००', 'income'), ('3000', 'income'), ('1,000', 'expense')):
+            CollateralIncomeExpense.objects.create(member=member, field='Farm', amount=amount, type=type_)
+        # Written by the desktop app, which knows nothing of the shadow column
+        CollateralIncomeExpense.objects.filter(amount='५,०००').update(amount_value=None)
+
+        dossier = load_member_dossier('2002')
+        self.assertEqual((dossier.total_income, dossier.total_expense), (Decimal('8000'), Decimal('1000')))
+
+        migration = import_module('collateral.migrations.0004_backfill_money_columns')
+        migration.fill_shadow_columns(django_apps, None)
+        self.assertFalse(CollateralIncomeExpense.objects.filter(amount_value=None).exists())
+
+    def test_totals_add_unsynced_rows_on_every_path(self):
+        member = Member.objects.create(date=date(2024, 1, 1), member_number='2003', member_name='Hari')
+        for amount, type_ in (('2000', 'income'), ('१,५००', 'income'), ('n/a', 'income'), ('७००', 'expense')):
+            CollateralIncomeExpense.objects.create(member=member, field='Farm', amount=amount, type=type_)
+        CollateralIncomeExpense.objects.exclude(amount='2000').update(amount_value=None)
+
+        totals = CollateralIncomeExpense.objects.filter(member=member).aggregate(total=sum_shadow('amount_value'))
+        rows = CollateralIncomeExpense.objects.filter(member=member)
+        self.assertEqual(totals['total'] + unsynced_total(rows, 'amount', 'amount_value'), Decimal('4200'))
+
+        dossier = load_member_dossiers(['2003'])['2003']
+        self.assertEqual((dossier.total_income, dossier.total_expense), (Decimal('3500'), Decimal('700')))
+
+
+class RepaymentScheduleTests(TestCase):
+
+    def test_reducing_balance_emi(self):
+        table = compute_schedules([1], [100000], [12], [12], [1], method='reducing')
+        rows = table.rows(0)
+        self.assertEqual(len(rows), 12)
+        self.assertEqual(rows[0]['installment'], 8884.88)
+        self.assertEqual(rows[0]['interest'], 1000.0)
+        self.assertEqual(rows[-1]['balance'], 0.0)
+        self.assertAlmostEqual(sum(r['principal'] for r in rows), 100000, places=2)
+
+    def test_flat_rate(self):
+        table = compute_schedules([1], [100000], [12], [24], [3], method='flat')
+        rows = table.rows(0)
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(rows[0]['interest'], 3000.0)
+        self.assertAlmostEqual(float(table.total_interest[0]), 24000, places=2)
+        self.assertAlmostEqual(sum(r['principal'] for r in rows), 100000, places=2)
+
+    def test_portfolio_matches_single_loans(self):
+        terms = ([1, 2, 3], [50000, 250000, 0], [10, 14.5, 12], [6, 60, 12], [1, 3, 1])
+        table = compute_schedules(*terms)
+        for i in range(3):
+            single = compute_schedules(*([column[i]] for column in terms))
+            self.assertEqual(table.rows(i), single.rows(0))
+        self.assertEqual(table.rows(2), [])
+
+    def test_portfolio_parses_loans_without_shadow(self):
+        loan_id = _make_loans('2101', ['approved'])[0]
+        LoanInfo.objects.filter(pk=loan_id).update(loan_amount='१०,०००', loan_amount_value=None)
+
+        table = next(iter_portfolio_schedules(LoanInfo.objects.filter(pk=loan_id)))
+        self.assertEqual(table.rows(0), loan_schedule(LoanInfo.objects.get(pk=loan_id))[0])
+        self.assertAlmostEqual(sum(row['principal'] for row in table.rows(0)), 10000, places=2)
+
+    def test_duration_parsing(self):
+        self.assertEqual(duration_months('२ वर्ष'), 24)
+        self.assertEqual(duration_months('अर्धवार्षिक'), 6)
+        self.assertEqual(interval_months('त्रैमासिक'), 3)
+        self.assertEqual(interval_months(''), 1)
+
+
+class RepaymentLedgerTests(TestCase):
+
+    def setUp(self):
+        member = Member.objects.create(date=date(2024, 1, 1), member_number='3001', member_name='Gita')
+        self.loan = LoanInfo.objects.create(
+            member=member, loan_type='Business', interest_rate=12, loan_duration='वार्षिक',
+            repayment_duration='मासिक', loan_amount='1,20,000', loan_amount_in_words='',
+            loan_completion_year='', loan_completion_month='', loan_completion_day='',
+            status='disbursed',
+        )
+
+    def test_open_ledger_and_post_payments(self):
+        year = timezone.localdate().year + 1
+        balance = open_ledger(self.loan, start_date=date(year, 1, 15), method='flat')
+        self.assertEqual(LoanInstallment.objects.filter(loan=self.loan).count(), 12)
+        self.assertEqual(balance.principal_outstanding, Decimal('120000.00'))
+        self.assertEqual(balance.interest_outstanding, Decimal('14400.00'))
+        self.assertEqual(balance.next_due_date, date(year, 2, 15))
+
+        # Two installments (11,200 each) have fallen due by 20 March
+        roll_arrears(date(year, 3, 20))
+        balance.refresh_from_db()
+        self.assertEqual(balance.arrears, Decimal('22400.00'))
+
+        payment = post_payment(self.loan, Decimal('15000'), paid_on=date(year, 3, 20))
+        self.assertEqual(payment.interest_part, Decimal('2400.00'))
+        self.assertEqual(payment.principal_part, Decimal('12600.00'))
+
+        balance.refresh_from_db()
+        self.assertEqual(balance.arrears, Decimal('7400.00'))
+        self.assertEqual(balance.principal_outstanding, Decimal('107400.00'))
+        self.assertEqual(balance.next_due_date, date(year, 3, 15))
+
+        with self.assertRaises(ValueError):
+            post_payment(self.loan, balance.total_outstanding + 1)
+
+        post_payment(self.loan, balance.total_outstanding)
+        balance.refresh_from_db()
+        self.assertEqual(balance.total_outstanding, 0)
+        self.assertIsNone(balance.next_due_date)
+        self.loan.refresh_from_db()
+        self.assertEqual(self.loan.status, 'completed')
+
+    def test_loan_detail_shows_rolled_balance_without_saving_it(self):
+        start = add_months(timezone.localdate(), -3)
+        open_ledger(self.loan, start_date=start, method='flat')
+        # As if the daily roll had not run since the ledger was opened
+        LoanBalance.objects.filter(loan=self.loan).update(due_to_date=0, arrears=0, arrears_as_of=start)
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+        response = self.client.get(reverse('loans:loan_detail', args=[self.loan.id]))
+
+        self.assertEqual(response.status_code, 200)
+        # Three monthly installments of 11,200 have fallen due since the start
+        self.assertEqual(response.context['balance'].arrears, Decimal('33600.00'))
+        stored = LoanBalance.objects.get(loan=self.loan)
+        self.assertEqual((stored.arrears, stored.arrears_as_of), (Decimal('0.00'), start))
+
+    def test_open_ledgers_in_bulk_matches_single(self):
+        open_ledgers(LoanInfo.objects.all(), method='reducing')
+        bulk = list(LoanInstallment.objects.filter(loan=self.loan).values_list('amount_due', flat=True))
+        LoanInstallment.objects.all().delete()
+        LoanBalance.objects.all().delete()
+
+        open_ledger(self.loan, start_date=timezone.localdate(self.loan.created_at), method='reducing')
+        single = list(LoanInstallment.objects.filter(loan=self.loan).values_list('amount_due', flat=True))
+        self.assertEqual(bulk, single)
+
+
+class SchemeCatalogTests(TestCase):
+
+    def setUp(self):
+        invalidate_scheme_catalog()
+        self.scheme = LoanScheme.objects.create(loan_type='Business', interest_rate=12)
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+    def test_catalog_is_cached_until_a_scheme_changes(self):
+        self.assertEqual(get_scheme_catalog().rate_for('Business'), 12)
+        with self.assertNumQueries(0):
+            get_scheme_catalog()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('loans:scheme_edit', args=[self.scheme.id]),
+                             {'loan_type': 'Business', 'interest_rate': '13.5'})
+        self.assertEqual(get_scheme_catalog().rate_for('Business'), 13.5)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.scheme.delete()
+        self.assertEqual(len(get_scheme_catalog()), 0)
+
+    def test_catalog_is_dropped_only_when_the_change_commits(self):
+        get_scheme_catalog()
+        with self.captureOnCommitCallbacks() as callbacks:
+            LoanScheme.objects.create(loan_type='Agriculture', interest_rate=10)
+            # Still the cached catalog until the transaction commits
+            self.assertEqual(len(get_scheme_catalog()), 1)
+
+        self.assertIn(invalidate_scheme_catalog, callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(get_scheme_catalog()), 2)
+
+    def test_catalog_json_answers_not_modified_for_current_etag(self):
+        url = reverse('loans:scheme_catalog_json')
+        response = self.client.get(url)
+        self.assertEqual(response.json()['schemes'][0]['interest_rate'], 12)
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        with self.captureOnCommitCallbacks(execute=True):
+            LoanScheme.objects.create(loan_type='Agriculture', interest_rate=10)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['schemes']), 2)
+
+
+class LoanWizardTests(TestCase):
+
+    def setUp(self):
+        self.member = Member.objects.create(date=date(2024, 1, 1), member_number='4001', member_name='Sita')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+    def _post(self, name, data):
+        return self.client.post(reverse(f'loans:{name}', args=[self.member.member_number]), data)
+
+    def test_loan_and_supporting_documents_are_written_together(self):
+        self._post('loan_create', {
+            'loan_type': 'Business', 'interest_rate': '12', 'loan_duration': 'वार्षिक',
+            'repayment_duration': 'मासिक', 'loan_amount': '50000', 'loan_amount_in_words': 'पचास हजार',
+            'loan_completion_year': '2083', 'loan_completion_month': '01', 'loan_completion_day': '01',
+        })
+        self._post('witness_form', {'name': 'Hari', 'relation': 'Friend', 'address': 'Pokhara', 'ward': '1', 'age': '40'})
+        self._post('guarantor_form', {
+            'guarantor_name': 'Shyam', 'guarantor_address': 'Pokhara', 'guarantor_ward': '1',
+            'guarantor_phone': '98', 'guarantor_citizenship': '1', 'guarantor_grandfather': 'A',
+            'guarantor_father': 'B', 'guarantor_citizenship_issue_district': 'Kaski', 'guarantor_age': '45',
+        })
+        self.assertFalse(LoanInfo.objects.filter(member=self.member).exists())
+        self.assertFalse(WitnessInfo.objects.filter(member=self.member).exists())
+
+        saved = mock.Mock()
+        post_save.connect(saved)
+        self.addCleanup(post_save.disconnect, saved)
+        response = self._post('manjurinama_form', {
+            'person_name': 'Gita', 'grandfather_name': 'A', 'father_name': 'B', 'age': '50',
+            'district': 'Kaski', 'municipality': 'Pokhara', 'wada_no': '1', 'tole': 'Lakeside',
+        })
+        # Every step went through save(), so post_save receivers saw it
+        self.assertEqual(
+            {call.kwargs['sender'] for call in saved.call_args_list if call.kwargs.get('created')},
+            {LoanInfo, WitnessInfo, GuarantorDetails, ManjurinamaDetails},
+        )
+        loan = LoanInfo.objects.get(member=self.member)
+        self.assertRedirects(response, reverse('loans:loan_detail', args=[loan.id]), fetch_redirect_response=False)
+        self.assertEqual(loan.loan_amount_value, Decimal('50000'))
+        self.assertEqual(GuarantorDetails.objects.filter(member=self.member).count(), 1)
+        self.assertEqual(ManjurinamaDetails.objects.filter(member=self.member).count(), 1)
+        self.assertNotIn(f'draft:loan:{self.member.member_number}', self.client.session)
+
+    def test_invalid_loan_step_comes_back_with_its_values_and_errors(self):
+        # A loan step stored earlier that no longer validates (the amount is now required)
+        session = self.client.session
+        session[f'draft:loan:{self.member.member_number}'] = {
+            'loan': {'loan_type': ['Business'], 'interest_rate': ['12'], 'loan_amount_in_words': ['पचास हजार']},
+        }
+        session.save()
+
+        response = self._post('manjurinama_form', {
+            'person_name': 'Gita', 'grandfather_name': 'A', 'father_name': 'B', 'age': '50',
+            'district': 'Kaski', 'municipality': 'Pokhara', 'wada_no': '1', 'tole': 'Lakeside',
+        })
+        url = reverse('loans:loan_create', args=[self.member.member_number])
+        self.assertRedirects(response, url, fetch_redirect_response=False)
+        self.assertFalse(LoanInfo.objects.filter(member=self.member).exists())
+
+        form = self.client.get(url).context['form']
+        self.assertTrue(form.is_bound)
+        self.assertIn('loan_amount', form.errors)
+        self.assertEqual(form['loan_amount_in_words'].value(), 'पचास हजार')
+
+
+def _make_loans(member_number, statuses):
+    member = Member.objects.create(date=date(2024, 1, 1), member_number=member_number, member_name='Hari')
+    return [
+        LoanInfo.objects.create(
+            member=member, loan_type='Business', interest_rate=12, loan_duration='वार्षिक',
+            repayment_duration='मासिक', loan_amount=str(10000 * (i + 1)), loan_amount_in_words='',
+            loan_completion_year='', loan_completion_month='', loan_completion_day='', status=status,
+        ).id
+        for i, status in enumerate(statuses)
+    ]
+
+
+def _approve(ids, user=None):
+    return approve_loans(ids, '2082-01-01', 'Committee', 'Chair', 'officer', 'Officer', user=user)
+
+
+class BulkApprovalTests(TestCase):
+
+    def setUp(self):
+        self.ids = _make_loans('5001', ['pending', 'pending', 'rejected'])
+
+    def test_only_pending_loans_are_approved_once(self):
+        self.assertEqual(_approve(self.ids), self.ids[:2])
+        # A second officer submitting the same selection approves nothing
+        self.assertEqual(_approve(self.ids), [])
+
+        self.assertEqual(ApprovalInfo.objects.count(), 2)
+        self.assertEqual(
+            list(LoanInfo.objects.filter(pk__in=self.ids).order_by('id').values_list('status', flat=True)),
+            ['approved', 'approved', 'rejected'],
+        )
+        self.assertEqual(ApprovalInfo.objects.order_by('id').first().approved_loan_amount, '10000')
+
+    def test_bulk_approve_view_is_for_admins(self):
+        user = get_user_model().objects.create_user('officer', password='x', role='officer')
+        self.client.force_login(user)
+        data = {'loan_ids': self.ids, 'approval_date': '2082-01-01', 'approved_by': 'A', 'approved_post': 'B'}
+        self.assertEqual(self.client.post(reverse('loans:loan_bulk_approve'), data).status_code, 403)
+
+        user.role = 'admin'
+        user.save()
+        self.client.post(reverse('loans:loan_bulk_approve'), data)
+        self.assertEqual(LoanInfo.objects.filter(status='approved').count(), 2)
+
+    def test_single_approval_takes_the_same_locked_path(self):
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+        url = reverse('loans:loan_approval', args=[self.ids[0]])
+        data = {
+            'approval_date': '2082-01-01', 'approved_by': 'A', 'approved_post': 'B',
+            'approved_loan_amount': '8000', 'approved_loan_amount_words': 'आठ हजार',
+        }
+
+        self.client.post(url, data)
+        approval = ApprovalInfo.objects.get()
+        self.assertEqual((approval.approved_loan_amount, approval.approved_loan_amount_words), ('8000', 'आठ हजार'))
+
+        def bulk_first(*args, **kwargs):
+            # A bulk approval lands between the page's status check and its own approval
+            _approve(self.ids)
+            return approve_loans(*args, **kwargs)
+
+        url = reverse('loans:loan_approval', args=[self.ids[1]])
+        with mock.patch('loans.views.approve_loans', side_effect=bulk_first):
+            self.client.post(url, data)
+
+        self.assertEqual(ApprovalInfo.objects.count(), 2)
+        self.assertEqual(LoanStatusEvent.objects.filter(loan_id=self.ids[1], to_status='approved').count(), 1)
+
+    def test_locked_database_approves_nothing(self):
+        self.client.force_login(get_user_model().objects.create_user('admin', password='x', role='admin'))
+        data = {'loan_ids': self.ids, 'approval_date': '2082-01-01', 'approved_by': 'A', 'approved_post': 'B'}
+        with mock.patch('loans.views.approve_loans', side_effect=OperationalError('database is locked')):
+            response = self.client.post(reverse('loans:loan_bulk_approve'), data)
+
+        self.assertRedirects(response, f"{reverse('loans:loan_list')}?status=pending", fetch_redirect_response=False)
+        self.assertFalse(LoanInfo.objects.filter(status='approved').exists())
+
+
+class LoanStatusEventTests(TestCase):
+
+    def test_transitions_are_logged_and_measured(self):
+        ids = _make_loans('6001', ['pending', 'pending', 'rejected'])
+        user = get_user_model().objects.create_user('officer', password='x')
+        _approve(ids, user=user)
+        loan = LoanInfo.objects.get(pk=ids[0])
+        self.client.force_login(user)
+        self.client.post(reverse('loans:loan_disburse', args=[loan.id]))
+
+        events = LoanStatusEvent.objects.filter(loan=loan)
+        self.assertEqual(
+            [(e.from_status, e.to_status) for e in events],
+            [('', 'pending'), ('pending', 'approved'), ('approved', 'disbursed')],
+        )
+        with self.assertRaises(ValueError):
+            events[0].save()
+
+        now = timezone.now()
+        counts = throughput(now - timezone.timedelta(days=1), now + timezone.timedelta(seconds=1))
+        self.assertEqual(counts, {'pending': 2, 'rejected': 1, 'approved': 2, 'disbursed': 1})
+        count, average = turnaround('pending', 'approved', now - timezone.timedelta(days=1), now)
+        self.assertEqual(count, 2)
+        self.assertGreaterEqual(average.total_seconds(), 0)
@@ -7,14 +7,19 @@ urlpatterns = [
     # Loan CRUD
     path('', views.loan_list, name='loan_list'),
     path('create/<str:member_number>/', views.loan_create, name='loan_create'),
+    path('approve/', views.loan_bulk_approve, name='loan_bulk_approve'),
     path('<int:loan_id>/', views.loan_detail, name='loan_detail'),
     path('<int:loan_id>/approve/', views.loan_approval, name='loan_approval'),
+    path('<int:loan_id>/schedule/', views.loan_schedule_view, name='loan_schedule'),
+    path('<int:loan_id>/disburse/', views.loan_disburse, name='loan_disburse'),
+    path('<int:loan_id>/payment/', views.loan_payment, name='loan_payment'),
 
     # Loan Schemes
     path('schemes/', views.loan_schemes_list, name='schemes_list'),
     path('schemes/create/', views.scheme_create, name='scheme_create'),
     path('schemes/<int:scheme_id>/edit/', views.scheme_edit, name='scheme_edit'),
     path('schemes/<int:scheme_id>/delete/', views.scheme_delete, name='scheme_delete'),
+    path('schemes/catalog.json', views.scheme_catalog_json, name='scheme_catalog_json'),
 
     # Witness, Guarantor, Manjurinama (Supporting Documents)
     path('witness/<str:member_number>/', views.witness_form, name='witness_form'),
@@ -1,36 +1,88 @@
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import (LoanInfo, LoanScheme, ApprovalInfo,
-                     WitnessInfo, GuarantorDetails, ManjurinamaDetails)
+from django.core.exceptions import PermissionDenied
+from django.db import OperationalError, transaction
+from django.http import JsonResponse
+from django.views.decorators.http import condition
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from .models import (LoanInfo, LoanScheme,
+                     WitnessInfo, GuarantorDetails, ManjurinamaDetails,
+                     LoanInstallment, LoanPayment, LoanBalance)
 from .forms import LoanInfoForm, ApprovalForm, WitnessInfoForm, GuarantorForm, ManjurinamaForm
 from members.models import Member
-from collateral.models import (CollateralBasic, CollateralProperty,
-                               CollateralFamilyDetail, CollateralIncomeExpense,
-                               CollateralAffiliation)
-from projects.models import ProjectDetail
+from members.dossier import load_member_dossier
+from utils.money import parse_amount
+from utils.wizard_draft import WizardDraft
+from .approval import approve_loans
+from .ledger import current_balance, open_ledger, post_payment
+from .schedule import METHODS, default_method, loan_schedule
+from .scheme_catalog import get_scheme_catalog
+from .status_log import record_transition
+
+# Steps of the loan application wizard, in order
+LOAN_WIZARD_STEPS = [
+    ('loan', LoanInfoForm),
+    ('witness', WitnessInfoForm),
+    ('guarantor', GuarantorForm),
+    ('manjurinama', ManjurinamaForm),
+]
+
+
+def _loan_draft(request, member_number):
+    return WizardDraft(request, 'loan', member_number)
+
+
+def _commit_loan_draft(member, draft):
+    """
+    Write every step of a loan draft in one transaction.
+
+    Stored steps are validated again first. Returns (loan, None) once
+    written (loan is None when the draft had no loan step), or
+    (None, step) naming the first step that no longer validates.
+    """
+    rows = {}
+    for step, form_class in LOAN_WIZARD_STEPS:
+        data = draft.data(step)
+        if data is None:
+            continue
+        form = form_class(data)
+        if not form.is_valid():
+            return None, step
+        instance = form.save(commit=False)
+        instance.member = member
+        rows[step] = instance
+
+    loan = rows.pop('loan', None)
+    with transaction.atomic():
+        if loan is not None:
+            loan.save()
+        # save() rather than bulk_create, so model save() logic and post_save run
+        for instance in rows.values():
+            instance.save()
+    draft.discard()
+    return loan, None
+
 
 @login_required
 def loan_create(request, member_number):
     """Create loan application for a member """
     member = get_object_or_404(Member, member_number=member_number)
-    loan_schemes = LoanScheme.objects.all()
+    loan_schemes = get_scheme_catalog()
+    draft = _loan_draft(request, member_number)
 
     if request.method == 'POST':
         form = LoanInfoForm(request.POST)
         if form.is_valid():
-            loan = form.save(commit=False)
-            loan.member = member
-            loan.save()
-            messages.success(request, 'Loan application saved successfully!')
-
-            # Store in session for multi-step process
-            request.session['current_loan_id'] = loan.id
-            request.session['member_number'] = member_number
-
+            # Kept in the draft; written together with the supporting documents
+            draft.save_step('loan', request.POST)
+            messages.success(request, 'Loan application saved to draft. Complete the remaining steps to submit it.')
             return redirect('loans:witness_form', member_number=member_number)
     else:
-        form = LoanInfoForm()
+        # Bound to the draft when coming back, so the entered values and their errors show
+        form = LoanInfoForm(draft.data('loan'))
 
     context = {
         'form': form,
@@ -39,10 +91,53 @@ def loan_create(request, member_number):
     }
     return render(request, 'loans/loan_form.html', context)
 
+@login_required
+def loan_bulk_approve(request):
+    """Approve the selected pending loans together, each for its requested amount"""
+    if request.user.role != 'admin':
+        raise PermissionDenied
+    if request.method != 'POST':
+        return redirect('loans:loan_list')
+
+    loan_ids = [i for i in request.POST.getlist('loan_ids') if i.isdigit()]
+    approval_date = request.POST.get('approval_date')
+    approved_by = request.POST.get('approved_by')
+    approved_post = request.POST.get('approved_post')
+
+    if not loan_ids or not all([approval_date, approved_by, approved_post]):
+        messages.error(request, '❌ कृपया ऋण छान्नुहोस् र सबै आवश्यक फिल्डहरू भर्नुहोस् (Select loans and fill all required fields)')
+        return redirect(f"{reverse('loans:loan_list')}?status=pending")
+
+    try:
+        approved = approve_loans(
+            loan_ids,
+            approval_date=approval_date,
+            approved_by=approved_by,
+            approved_post=approved_post,
+            entered_by=request.user.full_name_nepali or request.user.username,
+            entered_post=request.user.post or 'Officer',
+            remarks=request.POST.get('remarks', ''),
+            user=request.user,
+        )
+    except ValueError as e:
+        messages.error(request, f'❌ {e}')
+        return redirect(f"{reverse('loans:loan_list')}?status=pending")
+    except OperationalError:
+        # SQLite answers 'database is locked' while another write runs; the transaction rolled back
+        messages.error(request, '❌ Database is busy, no loans were approved. Please try again.')
+        return redirect(f"{reverse('loans:loan_list')}?status=pending")
+
+    messages.success(request, f'✅ {len(approved)} ऋण स्वीकृत भयो (Loans approved)')
+    skipped = len(loan_ids) - len(approved)
+    if skipped:
+        messages.warning(request, f'⚠️ {skipped} loan(s) were no longer pending and were skipped')
+    return redirect('loans:loan_list')
+
+
 @login_required
 def loan_list(request):
     """List all loans"""
-    loans = LoanInfo.objects.select_related('member').all().order_by('-created_at')
+    loans = LoanInfo.objects.select_related('member', 'loanbalance').all().order_by('-created_at')
 
     # Filter by status if provided
     status = request.GET.get('status')
@@ -52,7 +147,7 @@ def loan_list(request):
     # Filter by member if provided
     member_number = request.GET.get('member')
     if member_number:
-        loans = loans.filter(member__number_number=member_number)
+        loans = loans.filter(member__member_number=member_number)
     
     context = {
         'loans': loans,
@@ -63,47 +158,68 @@ def loan_list(request):
 @login_required
 def loan_detail(request, loan_id):
     """View loan detail"""
-    loan = get_object_or_404(LoanInfo, id=loan_id)
-    
+    loan = get_object_or_404(LoanInfo.objects.select_related('loanbalance'), id=loan_id)
+    dossier = load_member_dossier(loan.member_id)
+    loan.member = dossier.member
 
-    # Get related data
     try:
-        approval = ApprovalInfo.objects.filter(member=loan.member).first()
-    except:
-        approval = None
-        
-    # Collateral data
-    collateral_basic = CollateralBasic.objects.filter(member=loan.member).first()
-    collateral_properties = CollateralProperty.objects.filter(member=loan.member)
-    collateral_family = CollateralFamilyDetail.objects.filter(member=loan.member)
-    collateral_income = CollateralIncomeExpense.objects.filter(member=loan.member, type="income")
-    collateral_expense = CollateralIncomeExpense.objects.filter(member=loan.member, type="expense")
-    collateral_affiliations = CollateralAffiliation.objects.filter(member=loan.member)
-
-    total_income = sum(float(i.amount or 0) for i in collateral_income)
-    total_expense = sum(float(e.amount or 0) for e in collateral_expense)
-
-    projects = ProjectDetail.objects.filter(member=loan.member)
+        balance = current_balance(loan.loanbalance)
+    except LoanBalance.DoesNotExist:
+        balance = None
 
     context = {
         'loan': loan,
         'member': loan.member,
-        'approval': approval,
+        'approval': dossier.approval,
         # Collateral
-        'collateral_basic':collateral_basic,
-        'collateral_properties': collateral_properties,
-        'collateral_family': collateral_family,
-        'collateral_affiliations': collateral_affiliations,
-        'collateral_income': collateral_income,
-        'collateral_expense': collateral_expense,
-        'total_income': total_income,
-        'total_expense': total_expense,
-        'net_income': total_income - total_expense,
-        'projects': projects,     
+        'collateral_basic': dossier.collateral_basic,
+        'collateral_properties': dossier.properties,
+        'collateral_family': dossier.family,
+        'collateral_affiliations': dossier.affiliations,
+        'collateral_income': dossier.income,
+        'collateral_expense': dossier.expense,
+        'total_income': dossier.total_income,
+        'total_expense': dossier.total_expense,
+        'net_income': dossier.net_income,
+        'projects': dossier.projects,
+        # Repayment ledger
+        'balance': balance,
+        'today': timezone.localdate(),
     }
 
     return render(request, 'loans/loan_detail.html', context)
 
+@login_required
+def loan_schedule_view(request, loan_id):
+    """Repayment schedule (installment table) of a loan"""
+    loan = get_object_or_404(LoanInfo.objects.select_related('member'), id=loan_id)
+
+    method = request.GET.get('method') or default_method()
+    if method not in METHODS:
+        method = default_method()
+
+    installments, table = loan_schedule(loan, method=method)
+    if not installments:
+        messages.warning(request, '⚠️ ऋण रकम वा अवधि नमिलेकोले किस्ता तालिका बनाउन सकिएन (Loan amount or duration missing)')
+
+    # Once disbursed, the ledger's own installments and payments are shown
+    ledger_installments = LoanInstallment.objects.filter(loan=loan)
+    payments = LoanPayment.objects.filter(loan=loan).select_related('received_by')
+
+    context = {
+        'loan': loan,
+        'member': loan.member,
+        'method': method,
+        'methods': METHODS,
+        'installments': installments,
+        'total_interest': float(table.total_interest[0]),
+        'total_payable': float(table.total_payable[0]),
+        'ledger_installments': ledger_installments,
+        'payments': payments,
+        'today': timezone.localdate(),
+    }
+    return render(request, 'loans/loan_schedule.html', context)
+
 @login_required
 def loan_approval(request, loan_id):
     """Approve a loan"""
@@ -116,46 +232,45 @@ def loan_approval(request, loan_id):
     
     if request.method == 'POST':
         # ✨ NEW: Direct form data extraction (no Django form)
-        approval_data = {
-            'approval_date': request.POST.get('approval_date'),
-            'entered_by': request.user.full_name_nepali or request.user.username,
-            'entered_post': request.user.post or 'Officer',
-            'approved_by': request.POST.get('approved_by'),
-            'approved_post': request.POST.get('approved_post'),
-            'approved_loan_amount': request.POST.get('approved_loan_amount'),
-            'approved_loan_amount_words': request.POST.get('approved_loan_amount_words'),
-            'remarks': request.POST.get('remarks', ''),
-        }
-        
+        approval_date = request.POST.get('approval_date')
+        approved_by = request.POST.get('approved_by')
+        approved_post = request.POST.get('approved_post')
+        approved_loan_amount = request.POST.get('approved_loan_amount')
+
         # ✨ NEW: Manual validation
-        if not all([approval_data['approval_date'], approval_data['approved_by'], 
-                   approval_data['approved_post'], approval_data['approved_loan_amount']]):
+        if not all([approval_date, approved_by, approved_post, approved_loan_amount]):
             messages.error(request, '❌ कृपया सबै आवश्यक फिल्डहरू भर्नुहोस् (Please fill all required fields)')
             return redirect('loans:loan_approval', loan_id=loan_id)
-        
+
         try:
-            # ✨ NEW: Create approval with unpacked data
-            ApprovalInfo.objects.create(
-                member=loan.member,
-                **approval_data
+            # Same locked, conditional path as bulk approval, so a loan is approved once
+            approved = approve_loans(
+                [loan.pk],
+                approval_date=approval_date,
+                approved_by=approved_by,
+                approved_post=approved_post,
+                entered_by=request.user.full_name_nepali or request.user.username,
+                entered_post=request.user.post or 'Officer',
+                remarks=request.POST.get('remarks', ''),
+                user=request.user,
+                amounts={loan.pk: (approved_loan_amount, request.POST.get('approved_loan_amount_words'))},
             )
-            
-            # Update loan status
-            loan.status = 'approved'
-            loan.save()
-            
-            # ✨ NEW: Better success message with amount
-            messages.success(
-                request, 
-                f'✅ ऋण सफलतापूर्वक स्वीकृत भयो (Loan approved successfully) - रु. {approval_data["approved_loan_amount"]}'
-            )
-            # ✨ NEW: Redirect to loan detail instead of list
-            return redirect('loans:loan_detail', loan_id=loan_id)
-            
-        except Exception as e:
-            messages.error(request, f'❌ Error approving loan: {str(e)}')
+        except (ValueError, OperationalError) as e:
+            messages.error(request, f'❌ Error approving loan, nothing was saved: {str(e)}')
             return redirect('loans:loan_approval', loan_id=loan_id)
-    
+
+        if not approved:
+            messages.warning(request, '⚠️ This loan is no longer pending and was not approved')
+            return redirect('loans:loan_detail', loan_id=loan_id)
+
+        # ✨ NEW: Better success message with amount
+        messages.success(
+            request,
+            f'✅ ऋण सफलतापूर्वक स्वीकृत भयो (Loan approved successfully) - रु. {approved_loan_amount}'
+        )
+        # ✨ NEW: Redirect to loan detail instead of list
+        return redirect('loans:loan_detail', loan_id=loan_id)
+
     # ✨ NEW: Simpler context (no form object)
     context = {
         'loan': loan,
@@ -165,10 +280,69 @@ def loan_approval(request, loan_id):
     return render(request, 'loans/loan_approval.html', context)
 
 
+@login_required
+def loan_disburse(request, loan_id):
+    """Disburse an approved loan and open its repayment ledger"""
+    loan = get_object_or_404(LoanInfo, id=loan_id)
+    if request.method != 'POST':
+        return redirect('loans:loan_detail', loan_id=loan_id)
+
+    try:
+        with transaction.atomic():
+            # Conditional update so a double submit cannot disburse twice
+            if not LoanInfo.objects.filter(pk=loan.pk, status='approved').update(status='disbursed'):
+                messages.warning(request, '⚠️ Only approved loans can be disbursed')
+                return redirect('loans:loan_detail', loan_id=loan_id)
+            record_transition([loan.pk], 'approved', 'disbursed', changed_by=request.user)
+            balance = open_ledger(loan)
+    except ValueError as e:
+        messages.error(request, f'❌ Error disbursing loan: {str(e)}')
+        return redirect('loans:loan_detail', loan_id=loan_id)
+
+    messages.success(
+        request,
+        f'✅ ऋण वितरण भयो (Loan disbursed) - पहिलो किस्ता {balance.next_due_date}'
+    )
+    return redirect('loans:loan_detail', loan_id=loan_id)
+
+
+@login_required
+def loan_payment(request, loan_id):
+    """Post a repayment to a disbursed loan"""
+    loan = get_object_or_404(LoanInfo, id=loan_id)
+    if request.method != 'POST':
+        return redirect('loans:loan_detail', loan_id=loan_id)
+
+    amount = parse_amount(request.POST.get('amount'))
+    try:
+        paid_on = parse_date(request.POST.get('paid_on') or '') or timezone.localdate()
+    except ValueError:
+        paid_on = None
+    if amount is None or paid_on is None:
+        messages.error(request, '❌ कृपया सही रकम र मिति भर्नुहोस् (Please enter a valid amount and date)')
+        return redirect('loans:loan_detail', loan_id=loan_id)
+
+    try:
+        payment = post_payment(
+            loan, amount, paid_on=paid_on, received_by=request.user,
+            remarks=request.POST.get('remarks', '')[:200],
+        )
+    except ValueError as e:
+        messages.error(request, f'❌ Error posting payment: {str(e)}')
+        return redirect('loans:loan_detail', loan_id=loan_id)
+
+    messages.success(
+        request,
+        f'✅ भुक्तानी रेकर्ड भयो (Payment recorded) - रु. {payment.amount} '
+        f'(Principal {payment.principal_part}, Interest {payment.interest_part})'
+    )
+    return redirect('loans:loan_detail', loan_id=loan_id)
+
+
 @login_required
 def loan_schemes_list(request):
     """List all loan schemes"""
-    schemes = LoanScheme.objects.all().order_by('loan_type')
+    schemes = get_scheme_catalog()
 
     context = {
         'schemes': schemes
@@ -218,12 +392,12 @@ def scheme_edit(request, scheme_id):
                 if LoanScheme.objects.filter(loan_type=loan_type).exists():
                     messages.error(request, f'Loan type "{loan_type}" already exists.')
                     return redirect('loans:schemes_list')
-                
-                scheme.loan_type = loan_type
-                scheme.interest_rate = float(interest_rate)
-                scheme.save()
 
-                messages.success(request, 'Loan scheme updated successfully.')
+            scheme.loan_type = loan_type
+            scheme.interest_rate = float(interest_rate)
+            scheme.save()
+
+            messages.success(request, 'Loan scheme updated successfully.')
         except Exception as e:
             messages.error(request, f'Error occured: {str(e)}')
 
@@ -241,99 +415,88 @@ def scheme_delete(request, scheme_id):
 
     return redirect('loans:schemes_list')
 
-@login_required
-def witness_form(request, member_number):
-    """ Witness information form"""
-    member = get_object_or_404(Member, member_number=member_number)
-
-    # Get current loan from session
-    loan_id = request.session.get('current_loan_id')
-    loan = LoanInfo.objects.filter(id=loan_id, member=member).first() if loan_id else None
+def _scheme_catalog_etag(request):
+    return get_scheme_catalog().etag
 
-    if request.method == 'POST':
-        form = WitnessInfoForm(request.POST)
-        if form.is_valid():
-            witness = form.save(commit=False)
-            witness.member = member
-            witness.save()
-            messages.success(request, 'साक्षी जानकारी सफलतापूर्वक रेकर्ड भयो।')
-            return redirect('loans:guarantor_form', member_number=member_number)
-    else:
-        form = WitnessInfoForm()
 
-    context = {
+@login_required
+@condition(etag_func=_scheme_catalog_etag)
+def scheme_catalog_json(request):
+    """Loan types and interest rates for the loan form; answers 304 while unchanged"""
+    response = JsonResponse(get_scheme_catalog().payload)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+def _supporting_docs_context(member, draft, form, step):
+    steps = [name for name, _form_class in LOAN_WIZARD_STEPS]
+    index = steps.index(step)
+    loan_data = draft.data('loan')
+    return {
         'form': form,
         'member': member,
-        'loan': loan,
-        'step': 'witness',
-        'next_step': 'guarantor'
+        'member_number': member.member_number,
+        'draft_loan_type': loan_data.get('loan_type') if loan_data else None,
+        'done_steps': [name for name in steps if name in draft],
+        'step': step,
+        'prev_step': steps[index - 1] if index > 1 else None,
+        'next_step': steps[index + 1] if index + 1 < len(steps) else None,
     }
 
-    return render(request, 'loans/supporting_docs.html', context)
 
-@login_required
-def guarantor_form(request, member_number):
-    """Guarantor information form"""
+def _supporting_doc_step(request, member_number, step, form_class, success_message):
     member = get_object_or_404(Member, member_number=member_number)
-    loan_id = request.session.get('current_loan_id')
-    loan = LoanInfo.objects.filter(id=loan_id, member=member).first() if loan_id else None
+    draft = _loan_draft(request, member_number)
 
     if request.method == 'POST':
-        form = GuarantorForm(request.POST)
+        form = form_class(request.POST)
         if form.is_valid():
-            guarantor = form.save(commit=False)
-            guarantor.member = member
-            guarantor.save()
-            messages.success(request, 'जमानी विवरण सफलतापूर्वक रेकर्ड भयो।')
-            return redirect('loans:manjurinama_form', member_number=member_number)
+            draft.save_step(step, request.POST)
+            messages.success(request, success_message)
+            context = _supporting_docs_context(member, draft, form, step)
+            if context['next_step']:
+                return redirect(f"loans:{context['next_step']}_form", member_number=member_number)
+            return _finish_loan_draft(request, member, draft)
     else:
-        form = GuarantorForm()
+        form = form_class(draft.data(step))
 
-    context = {
-        'form': form,
-        'member': member,
-        'loan': loan,
-        'step': 'guarantor',
-        'prev_step': 'witness',
-        'next_step': 'manjurinama',
-        'member_number': member_number
-    }
+    return render(request, 'loans/supporting_docs.html', _supporting_docs_context(member, draft, form, step))
 
-    return render(request, 'loans/supporting_docs.html', context)
 
-@login_required
-def manjurinama_form(request, member_number):
-    """Manjurinama details form"""
-    member = get_object_or_404(Member, member_number=member_number)
-    loan_id = request.session.get('current_loan_id')
-    loan = LoanInfo.objects.filter(member=member, status__in=['pending', 'draft']).last() 
+def _finish_loan_draft(request, member, draft):
+    loan, invalid_step = _commit_loan_draft(member, draft)
+    if invalid_step:
+        messages.error(request, '❌ कृपया फाराम सही तरिकाले भर्नुहोस् (Please correct this step)')
+        if invalid_step == 'loan':
+            return redirect('loans:loan_create', member_number=member.member_number)
+        return redirect(f'loans:{invalid_step}_form', member_number=member.member_number)
 
-    if request.method == 'POST':
-        form = ManjurinamaForm(request.POST)
-        if form.is_valid():
-            manjuri = form.save(commit=False)
-            manjuri.member = member
-            manjuri.save()
-            messages.success(request, 'मञ्जुरीनामा दिनेको विवरण सफलतापूर्वक रेकर्ड भयो।')
-
-            if loan:
-            # Clear session
-                if 'current_loan_id' in request.session:
-                    del request.session['current_loan_id']
-                return redirect('loans:loan_detail', loan_id=loan.id)
-            else:
-                messages.warning(request, '⚠️ Loan not found. Please create loan first.')
-                return redirect('loans:loan_list')
-    else:
-        form = ManjurinamaForm()
+    loan = loan or LoanInfo.objects.filter(member=member).order_by('-id').first()
+    if loan:
+        return redirect('loans:loan_detail', loan_id=loan.id)
+    messages.warning(request, '⚠️ Loan not found. Please create loan first.')
+    return redirect('loans:loan_list')
 
-    context = {
-        'form': form,
-        'member': member,
-        'loan': loan,
-        'step': 'manjurinama',
-        'prev_step': 'guarantor',
-        'member_number': member_number
-    }
 
-    return render(request, 'loans/supporting_docs.html', context)
+@login_required
+def witness_form(request, member_number):
+    """ Witness information form"""
+    return _supporting_doc_step(
+        request, member_number, 'witness', WitnessInfoForm,
+        'साक्षी जानकारी सफलतापूर्वक रेकर्ड भयो।',
+    )
+
+@login_required
+def guarantor_form(request, member_number):
+    """Guarantor information form"""
+    return _supporting_doc_step(
+        request, member_number, 'guarantor', GuarantorForm,
+        'जमानी विवरण सफलतापूर्वक रेकर्ड भयो।',
+    )
+
+@login_required
+def manjurinama_form(request, member_number):
+    """Manjurinama details form; submitting it writes the whole draft"""
+    return _supporting_doc_step(
+        request, member_number, 'manjurinama', ManjurinamaForm,
+        'मञ्जुरीनामा दिनेको विवरण सफलतापूर्वक रेकर्ड भयो।',
+    )
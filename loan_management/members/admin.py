@@ -1,5 +1,6 @@
 from django.contrib import admin
 
-from .models import Member
+from .models import Member, MemberImportJob
 
 admin.site.register(Member)
+admin.site.register(MemberImportJob)
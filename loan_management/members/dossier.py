@@ -0,0 +1,141 @@
+"""
+Everything the loan pages and reports show about one member, loaded at once.
+
+The loan detail page, the collateral overview and the report context used
+to query approvals, collateral, family, income/expense, affiliations,
+projects, witnesses, guarantors and manjurinama one table at a time (some
+of them twice, through related managers). ``load_member_dossier`` prefetches all of them
+with one query per table, so the cost is fixed no matter how many rows a
+member has, and the related managers on the member read from that cache.
+Income and expense totals are SUMs over the Decimal amount columns, plus
+the typed amounts of any rows whose Decimal column is still empty.
+"""
+from django.db.models import Prefetch, Q, prefetch_related_objects
+from utils.money import sum_shadow, unsynced_total
+from .models import Member
+
+# Related tables of a member, each ordered by id so `.first()`-style picks
+# stay the same as before
+DOSSIER_RELATIONS = [
+    'approvalinfo_set',
+    'collateralbasic_set',
+    'collateralproperty_set',
+    'collateralfamilydetail_set',
+    'collateralincomeexpense_set',
+    'collateralaffiliation_set',
+    'projectdetail_set',
+    'witnessinfo_set',
+    'guarantordetails_set',
+    'manjurinamadetails_set',
+]
+
+
+def _prefetches():
+    # Resolved through Member's reverse relations so this module does not
+    # import the loans / collateral / projects apps that depend on members
+    prefetches = []
+    for name in DOSSIER_RELATIONS:
+        related_model = Member._meta.get_field(name[:-len('_set')]).related_model
+        prefetches.append(Prefetch(name, queryset=related_model.objects.order_by('id')))
+    return prefetches
+
+
+class MemberDossier:
+    """A member with its approval, collateral, project and party rows prefetched"""
+
+    def __init__(self, member):
+        self.member = member
+
+    @property
+    def approval(self):
+        return next(iter(self.member.approvalinfo_set.all()), None)
+
+    @property
+    def collateral_basic(self):
+        return next(iter(self.member.collateralbasic_set.all()), None)
+
+    @property
+    def properties(self):
+        return list(self.member.collateralproperty_set.all())
+
+    @property
+    def family(self):
+        return list(self.member.collateralfamilydetail_set.all())
+
+    @property
+    def income(self):
+        return [i for i in self.member.collateralincomeexpense_set.all() if i.type == 'income']
+
+    @property
+    def expense(self):
+        return [e for e in self.member.collateralincomeexpense_set.all() if e.type == 'expense']
+
+    @property
+    def affiliations(self):
+        return list(self.member.collateralaffiliation_set.all())
+
+    @property
+    def projects(self):
+        return list(self.member.projectdetail_set.all())
+
+    @property
+    def witnesses(self):
+        return list(self.member.witnessinfo_set.all())
+
+    @property
+    def guarantors(self):
+        return list(self.member.guarantordetails_set.all())
+
+    @property
+    def manjurinama(self):
+        return next(iter(self.member.manjurinamadetails_set.all()), None)
+
+    @property
+    def total_income(self):
+        return self.member.total_income + unsynced_total(self.income, 'amount', 'amount_value')
+
+    @property
+    def total_expense(self):
+        return self.member.total_expense + unsynced_total(self.expense, 'amount', 'amount_value')
+
+    @property
+    def net_income(self):
+        return self.total_income - self.total_expense
+
+
+def _income_total(type_):
+    return sum_shadow('collateralincomeexpense__amount_value', filter=Q(collateralincomeexpense__type=type_))
+
+
+def load_member_dossier(member_number):
+    """
+    Build a MemberDossier for a member_number.
+
+    Takes one query for the member, with its income / expense totals summed
+    by the database, plus one per related table. Raises Member.DoesNotExist
+    for an unknown number.
+    """
+    member = Member.objects.annotate(
+        total_income=_income_total('income'),
+        total_expense=_income_total('expense'),
+    ).get(member_number=member_number)
+    prefetch_related_objects([member], *_prefetches())
+    return MemberDossier(member)
+
+
+def load_member_dossiers(member_numbers):
+    """
+    MemberDossiers of many members, as {member_number: dossier}.
+
+    Same queries as load_member_dossier, but each one covers all the
+    members: one for the members and their totals plus one per related
+    table. Unknown numbers are left out.
+    """
+    members = list(
+        Member.objects.annotate(
+            total_income=_income_total('income'),
+            total_expense=_income_total('expense'),
+        ).filter(member_number__in=member_numbers)
+    )
+    prefetch_related_objects(members, *_prefetches())
+    return {member.member_number: MemberDossier(member) for member in members}
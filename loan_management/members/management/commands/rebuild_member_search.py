@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand, CommandError
+from members import search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text member search index from the members table"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        if not search_index.search_available():
+            raise CommandError("Member search index table is missing (SQLite with FTS5 is required)")
+        count = search_index.rebuild_index(chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} member(s)"))
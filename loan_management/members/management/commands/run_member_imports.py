@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from members.utils.import_jobs import run_queued_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued member import jobs (e.g. ones left behind by a restarted server)"
+
+    def handle(self, *args, **options):
+        count = run_queued_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} import job(s)"))
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0002_memberimportjob'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='memberimportjob',
+            name='errors',
+        ),
+        migrations.RemoveField(
+            model_name='memberimportjob',
+            name='warnings',
+        ),
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='error_report_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='summary_notified',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='warning_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 14:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0003_remove_memberimportjob_errors_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='diff_report_path',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='dry_run',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='unchanged_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
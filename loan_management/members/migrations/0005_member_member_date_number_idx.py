@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0004_memberimportjob_diff_report_path_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='member',
+            index=models.Index(fields=['date', 'member_number'], name='member_date_number_idx'),
+        ),
+    ]
@@ -0,0 +1,78 @@
+import re
+import unicodedata
+from django.db import migrations
+
+# Frozen copies of members.search_index as it was when this migration was
+# written, so later changes there cannot change what this migration does
+TABLE_NAME = 'member_search'
+
+INDEXED_FIELDS = ['member_number', 'member_name', 'member_name_nepali', 'phone', 'email']
+
+_ZERO_WIDTH = re.compile('[\u200b\u200c\u200d]')
+
+_DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+
+
+def normalize_search_text(value):
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFC', str(value))
+    value = _ZERO_WIDTH.sub('', value)
+    return value.translate(_DIGITS).lower()
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE_NAME} USING fts5("
+            f"{', '.join(INDEXED_FIELDS)}, "
+            "tokenize='unicode61 remove_diacritics 0', prefix='2 3 4')"
+        )
+
+        Member = apps.get_model('members', 'Member')
+        members = (
+            Member.objects.using(connection.alias)
+            .order_by('id').values_list('id', *INDEXED_FIELDS).iterator(chunk_size=2000)
+        )
+        batch = []
+        for row in members:
+            batch.append((row[0], *(normalize_search_text(value) for value in row[1:])))
+            if len(batch) >= 2000:
+                _insert_rows(cursor, batch)
+                batch = []
+        if batch:
+            _insert_rows(cursor, batch)
+
+
+def _insert_rows(cursor, rows):
+    cursor.executemany(
+        f"INSERT INTO {TABLE_NAME} (rowid, {', '.join(INDEXED_FIELDS)}) "
+        f"VALUES (%s, {', '.join(['%s'] * len(INDEXED_FIELDS))})",
+        rows,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0005_member_member_date_number_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
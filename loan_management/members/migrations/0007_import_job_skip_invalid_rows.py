@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_member_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='memberimportjob',
+            name='skip_invalid_rows',
+            field=models.BooleanField(default=False),
+        ),
+    ]
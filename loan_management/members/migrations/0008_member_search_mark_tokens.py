@@ -0,0 +1,86 @@
+import re
+import unicodedata
+from django.db import migrations
+
+# Frozen copies of members.search_index as it was when this migration was
+# written, so later changes there cannot change what this migration does
+TABLE_NAME = 'member_search'
+
+INDEXED_FIELDS = ['member_number', 'member_name', 'member_name_nepali', 'phone', 'email']
+
+# Combining marks (M*) are token characters too: the default categories make
+# Devanagari vowel signs and the virama separators, splitting every name
+MARK_TOKENIZER = "unicode61 remove_diacritics 0 categories 'L* N* Co M*'"
+OLD_TOKENIZER = "unicode61 remove_diacritics 0"
+
+_ZERO_WIDTH = re.compile('[\u200b\u200c\u200d]')
+
+_DIGITS = str.maketrans('०१२३४५६७८९', '0123456789')
+
+
+def normalize_search_text(value):
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFC', str(value))
+    value = _ZERO_WIDTH.sub('', value)
+    return value.translate(_DIGITS).lower()
+
+
+def _rebuild(apps, schema_editor, tokenizer):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+
+        # The tokenizer of an FTS5 table is fixed, so it is created again
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE_NAME}")
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE {TABLE_NAME} USING fts5("
+            f"{', '.join(INDEXED_FIELDS)}, "
+            f"tokenize=\"{tokenizer}\", prefix='2 3 4')"
+        )
+
+        Member = apps.get_model('members', 'Member')
+        members = (
+            Member.objects.using(connection.alias)
+            .order_by('id').values_list('id', *INDEXED_FIELDS).iterator(chunk_size=2000)
+        )
+        batch = []
+        for row in members:
+            batch.append((row[0], *(normalize_search_text(value) for value in row[1:])))
+            if len(batch) >= 2000:
+                _insert_rows(cursor, batch)
+                batch = []
+        if batch:
+            _insert_rows(cursor, batch)
+
+
+def _insert_rows(cursor, rows):
+    cursor.executemany(
+        f"INSERT INTO {TABLE_NAME} (rowid, {', '.join(INDEXED_FIELDS)}) "
+        f"VALUES (%s, {', '.join(['%s'] * len(INDEXED_FIELDS))})",
+        rows,
+    )
+
+
+def use_mark_tokenizer(apps, schema_editor):
+    _rebuild(apps, schema_editor, MARK_TOKENIZER)
+
+
+def use_old_tokenizer(apps, schema_editor):
+    _rebuild(apps, schema_editor, OLD_TOKENIZER)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0007_import_job_skip_invalid_rows'),
+    ]
+
+    operations = [
+        migrations.RunPython(use_mark_tokenizer, use_old_tokenizer),
+    ]
@@ -1,4 +1,6 @@
+from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 class Member(models.Model):
     """ Member information matching member_info table in PyQt5 app"""
@@ -28,7 +30,80 @@ class Member(models.Model):
     class Meta:
         db_table = 'member_info'
         ordering = ['-date']
+        indexes = [
+            # Keyset pagination of the member list
+            models.Index(fields=['date', 'member_number'], name='member_date_number_idx'),
+        ]
     
     def __str__(self):
         return f"{self.member_number} - {self.member_name}"
 
+
+
+class MemberImportJob(models.Model):
+    """Background Excel member import, polled for progress by the upload page"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    original_filename = models.CharField(max_length=255)
+    file_path = models.CharField(max_length=500)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    dry_run = models.BooleanField(default=False)
+    # Commit valid rows batch by batch and skip invalid ones, instead of all-or-nothing
+    skip_invalid_rows = models.BooleanField(default=False)
+    total_rows = models.PositiveIntegerField(default=0)
+    processed_rows = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    updated_count = models.PositiveIntegerField(default=0)
+    unchanged_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    warning_count = models.PositiveIntegerField(default=0)
+    message = models.TextField(blank=True, default='')
+    error_report_path = models.CharField(max_length=500, blank=True, default='')
+    diff_report_path = models.CharField(max_length=500, blank=True, default='')
+    summary_notified = models.BooleanField(default=False)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'member_import_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.original_filename} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def has_error_report(self):
+        return bool(self.error_report_path)
+
+    @property
+    def has_diff_report(self):
+        return bool(self.diff_report_path)
+
+    @property
+    def percent(self):
+        if self.is_finished:
+            return 100
+        if not self.total_rows:
+            return 0
+        return min(int(self.processed_rows * 100 / self.total_rows), 99)
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds left, from the average speed so far"""
+        if self.status != 'running' or not self.started_at or not self.processed_rows:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = max(self.total_rows - self.processed_rows, 0)
+        return int(elapsed / self.processed_rows * remaining)
@@ -0,0 +1,172 @@
+"""
+Full-text member search backed by an SQLite FTS5 table.
+
+``member_search`` holds one row per member (rowid = member id) with the
+searchable fields normalized: Devanagari digits folded to ASCII, zero-width
+joiners dropped, Unicode NFC and lower case. The table is kept in sync by
+the signals in members/signals.py and by the bulk import, and can be rebuilt
+with ``manage.py rebuild_member_search``. On databases without FTS5 the
+search falls back to plain ``icontains`` lookups.
+"""
+import re
+import unicodedata
+from django.db import connection
+from django.db.models import Q
+from utils.nepali_number import to_english_digits
+from .models import Member
+
+TABLE_NAME = 'member_search'
+
+INDEXED_FIELDS = ['member_number', 'member_name', 'member_name_nepali', 'phone', 'email']
+
+# Zero-width (non-)joiners are common in typed Nepali but never matter for search
+_ZERO_WIDTH = re.compile('[\u200b\u200c\u200d]')
+
+# Query words split exactly as the FTS5 tokenizer (unicode61 with categories
+# 'L* N* Co M*') splits indexed text: letters, numbers, private use and
+# combining marks (Devanagari vowel signs and virama) make up tokens,
+# everything else separates them
+def _is_token_char(char):
+    category = unicodedata.category(char)
+    return category[0] in 'LNM' or category == 'Co'
+
+
+def _tokens(text):
+    token = []
+    for char in text:
+        if _is_token_char(char):
+            token.append(char)
+        elif token:
+            yield ''.join(token)
+            token = []
+    if token:
+        yield ''.join(token)
+
+_available = None
+
+
+def normalize_search_text(value):
+    """Fold a field or query to the form stored in the index"""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFC', str(value))
+    value = _ZERO_WIDTH.sub('', value)
+    return to_english_digits(value).lower()
+
+
+def search_available():
+    """True when the FTS5 table exists on the default database"""
+    global _available
+    if _available is None:
+        _available = (
+            connection.vendor == 'sqlite'
+            and TABLE_NAME in connection.introspection.table_names()
+        )
+    return _available
+
+
+def _index_rows(rows):
+    """(id, *INDEXED_FIELDS) tuples -> rows for the FTS table"""
+    return [
+        (row[0], *(normalize_search_text(value) for value in row[1:]))
+        for row in rows
+    ]
+
+
+def index_members(member_ids):
+    """(Re)index the given members, reading their current values in one query"""
+    if not search_available():
+        return
+    member_ids = list(member_ids)
+    if not member_ids:
+        return
+
+    rows = Member.objects.filter(id__in=member_ids).values_list('id', *INDEXED_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.executemany(f"DELETE FROM {TABLE_NAME} WHERE rowid = %s", [(i,) for i in member_ids])
+        cursor.executemany(
+            f"INSERT INTO {TABLE_NAME} (rowid, {', '.join(INDEXED_FIELDS)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(INDEXED_FIELDS))})",
+            _index_rows(rows),
+        )
+
+
+def index_member_numbers(member_numbers, chunk_size=500):
+    """Reindex members by member_number, used after bulk writes that skip signals"""
+    member_numbers = list(member_numbers)
+    for start in range(0, len(member_numbers), chunk_size):
+        ids = Member.objects.filter(
+            member_number__in=member_numbers[start:start + chunk_size]
+        ).values_list('id', flat=True)
+        index_members(ids)
+
+
+def remove_member(member_id):
+    if not search_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE_NAME} WHERE rowid = %s", [member_id])
+
+
+def rebuild_index(chunk_size=2000):
+    """Drop every indexed row and index all members again, returns the count"""
+    if not search_available():
+        return 0
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {TABLE_NAME}")
+
+    count = 0
+    rows = Member.objects.order_by('id').values_list('id', *INDEXED_FIELDS).iterator(chunk_size=chunk_size)
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk_size:
+            count += _insert_batch(batch)
+            batch = []
+    if batch:
+        count += _insert_batch(batch)
+    return count
+
+
+def _insert_batch(batch):
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {TABLE_NAME} (rowid, {', '.join(INDEXED_FIELDS)}) "
+            f"VALUES (%s, {', '.join(['%s'] * len(INDEXED_FIELDS))})",
+            _index_rows(batch),
+        )
+    return len(batch)
+
+
+def build_match_query(query):
+    """
+    Turn user input into an FTS5 prefix query: every word must match the
+    start of some indexed token, e.g. 'राम श्रे' -> '"राम"* AND "श्रे"*'.
+    """
+    tokens = _tokens(normalize_search_text(query))
+    return ' AND '.join(f'"{token}"*' for token in tokens)
+
+
+def search_members(query, limit=10):
+    """Members matching ``query`` by prefix, best matches first"""
+    if search_available():
+        match = build_match_query(query)
+        if not match:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {TABLE_NAME} WHERE {TABLE_NAME} MATCH %s ORDER BY rank LIMIT %s",
+                [match, limit],
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+        members = Member.objects.in_bulk(ids)
+        return [members[i] for i in ids if i in members]
+
+    return list(Member.objects.filter(
+        Q(member_number__icontains=query) |
+        Q(member_name__icontains=query) |
+        Q(member_name_nepali__icontains=query) |
+        Q(phone__icontains=query) |
+        Q(email__icontains=query)
+    )[:limit])
@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+from .models import Member
+from . import search_index
+
+# Sent after bulk member writes (Excel import), which skip post_save
+members_bulk_changed = Signal()
+
+
+@receiver(post_save, sender=Member)
+def index_saved_member(sender, instance, **kwargs):
+    """Keep the member search index in step with form and admin edits"""
+    search_index.index_members([instance.pk])
+
+
+@receiver(post_delete, sender=Member)
+def unindex_deleted_member(sender, instance, **kwargs):
+    search_index.remove_member(instance.pk)
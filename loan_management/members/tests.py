@@ -1,3 +1,634 @@
-from django.test import TestCase
+import codecs
+import io
+import os
+import shutil
+import tempfile
+from datetime import date
+from decimal import Decimal
+from unittest import mock
+import openpyxl
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from collateral.models import (CollateralBasic, CollateralProperty,
+                               CollateralFamilyDetail, CollateralIncomeExpense,
+                               CollateralAffiliation)
+from loans.models import LoanInfo, ApprovalInfo, WitnessInfo, GuarantorDetails
+from projects.models import ProjectDetail
+from reports.services.report_context.context_builder import ReportContextBuilder
+from . import search_index
+from .dossier import load_member_dossier
+from .models import Member, MemberImportJob
+from .signals import members_bulk_changed
+from .utils import import_jobs
+from .utils.excel_handler import ExcelHandler, COLUMN_FIELD_MAP
+from .utils.import_report import ImportDiffReport
+from .utils.text_handler import TextHandler
 
-# Create your tests here.
+# One query per prefetched related table
+DOSSIER_QUERIES = 10
+
+
+class MemberDossierQueryTests(TestCase):
+    """The member dossier and its call sites run a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('officer', password='x', role='officer')
+        cls.small = cls._make_member('1001', rows=1)
+        cls.large = cls._make_member('1002', rows=4)
+
+    @staticmethod
+    def _make_member(member_number, rows):
+        member = Member.objects.create(date=date(2024, 1, 1), member_number=member_number, member_name='Ram')
+        LoanInfo.objects.create(
+            member=member, loan_type='Business', interest_rate=12, loan_duration='1 year',
+            repayment_duration='Monthly', loan_amount='100000', loan_amount_in_words='',
+            loan_completion_year='2082', loan_completion_month='01', loan_completion_day='01',
+        )
+        CollateralBasic.objects.create(
+            member=member, monthly_saving='500', child_saving='0', total_saving='500', share_amount='100'
+        )
+        for i in range(rows):
+            ApprovalInfo.objects.create(
+                member=member, approval_date='2081-01-01', entered_by='a', entered_post='b',
+                approved_by='c', approved_post='d', remarks='', approved_loan_amount='100000',
+                approved_loan_amount_words='',
+            )
+            CollateralProperty.objects.create(
+                member=member, owner_name='Ram', father_or_spouse_name='', grandfather_or_father_inlaw_name='',
+                district='Kaski', municipality_vdc='Pokhara', sheet_no='1', ward_no='1', plot_no=str(i),
+                area='1-0-0', land_type='Bari',
+            )
+            CollateralFamilyDetail.objects.create(
+                member=member, name='Sita', age='30', relation='Wife', member_of_other_coop='',
+                occupation='Farming', monthly_income='1000',
+            )
+            CollateralIncomeExpense.objects.create(member=member, field='Salary', amount='2000', type='income')
+            CollateralIncomeExpense.objects.create(member=member, field='Rent', amount='500', type='expense')
+            CollateralAffiliation.objects.create(
+                member=member, institution='Coop', address_of_institution='Pokhara', position='Member',
+                estimated_income='0',
+            )
+            ProjectDetail.objects.create(
+                member=member, project_name='Dairy', self_investment='1000', requested_loan_amount='5000',
+                total_cost='6000',
+            )
+            WitnessInfo.objects.create(member=member, name='Hari', relation='Friend', address='Pokhara', ward='1', age='40')
+            GuarantorDetails.objects.create(
+                member=member, guarantor_name='Shyam', guarantor_address='Pokhara', guarantor_ward='1',
+                guarantor_phone='98', guarantor_citizenship='1', guarantor_grandfather='', guarantor_father='',
+                guarantor_citizenship_issue_district='Kaski', guarantor_age='45',
+            )
+        return member
+
+    def _read_everything(self, dossier):
+        return (
+            dossier.approval, dossier.collateral_basic, dossier.properties, dossier.family,
+            dossier.income, dossier.expense, dossier.affiliations, dossier.projects,
+            dossier.witnesses, dossier.guarantors, dossier.manjurinama, dossier.net_income,
+        )
+
+    def test_loader_query_budget_does_not_grow_with_rows(self):
+        for member in (self.small, self.large):
+            with self.assertNumQueries(DOSSIER_QUERIES + 1):
+                dossier = load_member_dossier(member.member_number)
+                self._read_everything(dossier)
+
+        self.assertEqual(len(dossier.properties), 4)
+        self.assertEqual(dossier.total_income, Decimal('8000'))
+        self.assertEqual(dossier.net_income, 6000)
+
+    def test_loan_detail_query_budget(self):
+        self.client.force_login(self.user)
+        for member in (self.small, self.large):
+            loan = LoanInfo.objects.get(member=member)
+            # session + user + loan + member with totals + dossier
+            with self.assertNumQueries(4 + DOSSIER_QUERIES):
+                response = self.client.get(reverse('loans:loan_detail', args=[loan.id]))
+            self.assertEqual(response.status_code, 200)
+
+    def test_collateral_overview_query_budget(self):
+        self.client.force_login(self.user)
+        for member in (self.small, self.large):
+            # session + user + member with totals + dossier
+            with self.assertNumQueries(3 + DOSSIER_QUERIES):
+                response = self.client.get(reverse('collateral:overview', args=[member.member_number]))
+            self.assertEqual(response.status_code, 200)
+
+    def test_report_context_query_budget(self):
+        for member in (self.small, self.large):
+            # member + dossier + latest loan + organization profile
+            with self.assertNumQueries(3 + DOSSIER_QUERIES):
+                context = ReportContextBuilder.build(member.member_number, 'a', 'b', 'c', 'd')
+
+        self.assertEqual(len(context['guarantors']), 4)
+        self.assertEqual(len(context['income_items']), 4)
+
+
+class MemberImportJobTests(TestCase):
+    """Background import jobs always finish, as completed or failed"""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def _job(self, lines, **fields):
+        path = os.path.join(self.media_root, 'members.csv')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('date,member_number,member_name\n')
+            f.writelines(f"{line}\n" for line in lines)
+        return MemberImportJob.objects.create(original_filename='members.csv', file_path=path, **fields)
+
+    def _run(self, job):
+        # The worker closes its connections when done, which would end the test transaction
+        with mock.patch.object(import_jobs, 'connections'):
+            import_jobs.run_import_job(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_error_outside_the_import_marks_job_failed(self):
+        job = self._job(['2024-01-01,1,Ram'])
+        with mock.patch.object(import_jobs, 'ImportIssueReport', side_effect=OSError('disk full')), \
+                self.assertLogs(import_jobs.logger, 'ERROR'):
+            job = self._run(job)
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('disk full', job.message)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_invalid_row_rolls_back_whole_import(self):
+        job = self._run(self._job(['2024-01-01,1,Ram', '2024-01-01,2,', '2024-01-01,3,Sita']))
+
+        self.assertEqual(job.status, 'failed')
+        self.assertIn('Nothing was saved', job.message)
+        self.assertEqual(job.error_count, 1)
+        self.assertEqual(job.created_count, 0)
+        self.assertFalse(Member.objects.exists())
+
+    def test_skip_invalid_rows_saves_the_valid_ones(self):
+        job = self._run(self._job(
+            ['2024-01-01,1,Ram', '2024-01-01,2,', '2024-01-01,3,Sita'], skip_invalid_rows=True
+        ))
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual((job.created_count, job.skipped_count, job.error_count), (2, 1, 1))
+        self.assertEqual(
+            sorted(Member.objects.values_list('member_number', flat=True)), ['000000001', '000000003']
+        )
+
+    def test_progress_of_atomic_job_is_read_from_cache(self):
+        job = self._job(['2024-01-01,1,Ram'], status='running')
+        stats = {'total_rows': 10, 'processed_rows': 4, 'created': 3, 'updated': 1,
+                 'unchanged': 0, 'skipped': 0, 'errors': 0}
+        with mock.patch.object(import_jobs.cache, 'get', return_value=stats):
+            job = import_jobs.live_progress(job)
+
+        self.assertEqual((job.processed_rows, job.total_rows, job.created_count), (4, 10, 3))
+
+    def test_issue_report_lists_bad_rows_and_downloads(self):
+        job = self._run(self._job(['2024-01-01,1,Ram', '01/02/2024,2,Sita', '2024-01-01,3,']))
+
+        with open(job.error_report_path, 'rb') as f:
+            content = f.read()
+        self.assertTrue(content.startswith(codecs.BOM_UTF8))
+        self.assertEqual(content.decode('utf-8-sig').splitlines(), [
+            'row,level,column,message',
+            '3,error,date,Invalid date format. Use YYYY-MM-DD',
+            '4,error,member_name,member_name is required!',
+        ])
+        self.assertEqual(job.error_count, 2)
+
+        user = get_user_model().objects.create_user('officer', password='x', role='officer')
+        self.client.force_login(user)
+        response = self.client.get(reverse('members:import_job_errors', args=[job.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Disposition'], f'attachment; filename="import_{job.pk}_errors.csv"')
+        self.assertEqual(b''.join(response.streaming_content), content)
+
+    def test_clean_import_has_no_issue_report(self):
+        job = self._run(self._job(['2024-01-01,1,Ram']))
+
+        self.assertEqual(job.status, 'completed')
+        self.assertEqual(job.error_report_path, '')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x', role='officer'))
+        response = self.client.get(reverse('members:import_job_errors', args=[job.pk]))
+        self.assertEqual(response.status_code, 404)
+
+
+class MemberBatchImportTests(TestCase):
+    """Batched upserts of ExcelHandler.import_rows"""
+
+    HEADER = ('date', 'member_number', 'member_name', 'phone')
+
+    def _import(self, rows, **options):
+        return ExcelHandler.import_rows(iter([self.HEADER, *rows]), **options)
+
+    def _upsert(self, rows):
+        batch = dict(
+            ExcelHandler._prepare_member_data(dict(zip(self.HEADER, row))) for row in rows
+        )
+        return ExcelHandler._upsert_member_batch(batch)
+
+    def test_created_updated_and_unchanged_counts(self):
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000001', member_name='Ram', phone='98')
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000002', member_name='Sita', phone='97')
+
+        success, message, errors, _warnings = self._import([
+            ('2024-01-01', '1', 'Ram', '98'),
+            ('2024-01-01', '2', 'Sita', '99'),
+            ('2024-01-01', '3', 'Hari', '96'),
+        ])
+
+        self.assertTrue(success, errors)
+        self.assertIn('Created: 1, Updated: 1, Unchanged: 1', message)
+        self.assertEqual(Member.objects.get(member_number='000000002').phone, '99')
+        self.assertEqual(Member.objects.count(), 3)
+
+    def test_rows_are_flushed_at_batch_boundaries(self):
+        progress = []
+        rows = [('2024-01-01', str(n), f'Member {n}', '') for n in range(1, 6)]
+
+        success, _message, errors, _warnings = self._import(
+            rows, batch_size=2, progress_callback=progress.append
+        )
+
+        self.assertTrue(success, errors)
+        # Two full batches and the remainder, each reported as it is written
+        self.assertEqual([stats['created'] for stats in progress], [1, 3, 5])
+        self.assertEqual(Member.objects.count(), 5)
+
+    def test_atomic_import_rolls_back_on_invalid_row(self):
+        rows = [('2024-01-01', str(n), f'Member {n}', '') for n in range(1, 5)]
+        rows.append(('2024-01-01', '5', '', ''))
+
+        success, _message, errors, _warnings = self._import(rows, batch_size=2)
+
+        self.assertFalse(success)
+        self.assertEqual(errors, ['Row 6: member_name is required!'])
+        self.assertFalse(Member.objects.exists())
+
+    def test_insert_conflict_updates_existing_member(self):
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000001', member_name='Ram', phone='98')
+
+        # Hide the stored member from the change lookup, as if another import added it meanwhile
+        hidden = Member.objects.none()
+        with mock.patch.object(Member.objects, 'filter', return_value=hidden):
+            created, updated, unchanged = self._upsert([('2024-01-01', '1', 'Ram Bahadur', '99')])
+
+        self.assertEqual((created, updated, unchanged), (1, 0, 0))
+        member = Member.objects.get(member_number='000000001')
+        self.assertEqual((member.member_name, member.phone), ('Ram Bahadur', '99'))
+
+
+class StreamingExcelImportTests(TestCase):
+    """ExcelHandler.import_from_excel_streaming reads the sheet once, by header name"""
+
+    def _workbook(self, rows):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'members.xlsx')
+        wb = openpyxl.Workbook()
+        for row in rows:
+            wb.active.append(row)
+        wb.save(path)
+        return path
+
+    def test_columns_map_by_header_and_blank_or_short_rows_pass(self):
+        path = self._workbook([
+            # Any column order, stray spaces around header names
+            [' member_name ', 'phone', 'member_number', 'date', 'address'],
+            ['Ram', '98', 7, '2024-01-01', 'Kathmandu'],
+            [None, None, None, None, None],
+            ['Sita', '97', '8', '2024-02-01'],
+        ])
+
+        with mock.patch('openpyxl.load_workbook', wraps=openpyxl.load_workbook) as load:
+            success, message, errors, _warnings = ExcelHandler.import_from_excel_streaming(path)
+
+        self.assertTrue(success, errors)
+        self.assertEqual(load.call_count, 1)
+        self.assertTrue(load.call_args.kwargs['read_only'])
+        self.assertIn('Created: 2', message)
+        self.assertIn('Skipped: 1', message)
+
+        ram = Member.objects.get(member_number='000000007')
+        self.assertEqual((ram.member_name, ram.phone, ram.address), ('Ram', '98', 'Kathmandu'))
+        self.assertEqual(ram.date, date(2024, 1, 1))
+        # The short row has no address cell at all
+        sita = Member.objects.get(member_number='000000008')
+        self.assertEqual((sita.member_name, sita.address), ('Sita', ''))
+
+    def test_missing_required_column_is_reported(self):
+        path = self._workbook([['member_number', 'member_name'], ['1', 'Ram']])
+
+        success, _message, errors, _warnings = ExcelHandler.import_from_excel_streaming(path)
+
+        self.assertFalse(success)
+        self.assertEqual(errors, ['Missing required column: date'])
+        self.assertFalse(Member.objects.exists())
+
+
+class MemberExportTests(TestCase):
+    """export_members streams every member and logs how much memory it took"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('officer', password='x', role='officer')
+        for n in range(1, 4):
+            Member.objects.create(date=date(2024, 1, n), member_number=f'00000000{n}', member_name=f'Member {n}')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _export(self, fmt):
+        with mock.patch('members.views.current_rss_mb', side_effect=[100.0, 112.5]), \
+                self.assertLogs('members.views', 'INFO') as logs:
+            response = self.client.get(reverse('members:export_members'), {'format': fmt})
+            content = b''.join(response.streaming_content)
+        return response, content, logs.output
+
+    def test_xlsx_export(self):
+        response, content, logs = self._export('xlsx')
+
+        self.assertEqual(response.status_code, 200)
+        rows = list(openpyxl.load_workbook(io.BytesIO(content), read_only=True).active.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:3], ('date', 'member_number', 'member_name'))
+        self.assertEqual([row[1] for row in rows[1:]], ['000000001', '000000002', '000000003'])
+        self.assertIn('Member export (xlsx): 3 members', logs[0])
+        self.assertIn('RSS change +12.5 MB', logs[0])
+
+    def test_csv_export_is_streamed(self):
+        response, content, logs = self._export('csv')
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(len(content.decode('utf-8-sig').splitlines()), 4)
+        self.assertIn('Member export (csv): 3 members', logs[0])
+        self.assertIn('RSS change +12.5 MB', logs[0])
+
+
+class TemplateDownloadTests(TestCase):
+    """The import template is revalidated with its ETag instead of downloaded again"""
+
+    def setUp(self):
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x', role='officer'))
+
+    def test_matching_etag_returns_304_without_body(self):
+        url = reverse('members:download_template')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.content.startswith(b'PK'))
+        self.assertIn('no-cache', first['Cache-Control'])
+        etag = first['ETag']
+
+        second = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.content, b'')
+        self.assertEqual(second['ETag'], etag)
+
+        stale = self.client.get(url, HTTP_IF_NONE_MATCH='"stale"')
+        self.assertEqual(stale.status_code, 200)
+        self.assertEqual(stale.content, first.content)
+
+
+class MemberImportWriteTests(TestCase):
+    """Imports only write what changed, and dry runs write nothing"""
+
+    HEADER = ('date', 'member_number', 'member_name', 'phone')
+
+    @classmethod
+    def setUpTestData(cls):
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000001', member_name='Ram', phone='98')
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000002', member_name='Sita', phone='97')
+
+    def _snapshot(self):
+        return list(Member.objects.order_by('pk').values())
+
+    @staticmethod
+    def _writes(queries):
+        return [
+            query['sql'] for query in queries
+            if query['sql'].lstrip().upper().startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+
+    def test_unchanged_rows_are_not_written(self):
+        before = self._snapshot()
+        rows = [self.HEADER, ('2024-01-01', '1', 'Ram', '98'), ('2024-01-01', 2, 'Sita', 97)]
+
+        with CaptureQueriesContext(connection) as queries:
+            success, message, errors, _warnings = ExcelHandler.import_rows(iter(rows))
+
+        self.assertTrue(success, errors)
+        self.assertIn('Created: 0, Updated: 0, Unchanged: 2', message)
+        self.assertEqual(self._writes(queries.captured_queries), [])
+        self.assertEqual(self._snapshot(), before)
+
+    def test_dry_run_writes_nothing_and_reports_changes(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        before = self._snapshot()
+        rows = [self.HEADER, ('2024-01-01', '1', 'Ram', '99'), ('2024-01-01', '3', 'Hari', '96')]
+
+        with override_settings(MEDIA_ROOT=media_root), CaptureQueriesContext(connection) as queries:
+            diff_report = ImportDiffReport('changes.csv')
+            success, message, errors, _warnings = ExcelHandler.import_rows(
+                iter(rows), dry_run=True, diff_report=diff_report
+            )
+            diff_report.close()
+
+        self.assertTrue(success, errors)
+        self.assertIn('Dry run (nothing saved). Created: 1, Updated: 1', message)
+        self.assertEqual(self._writes(queries.captured_queries), [])
+        self.assertEqual(self._snapshot(), before)
+        with open(diff_report.path, encoding='utf-8-sig') as f:
+            self.assertEqual(f.read().splitlines()[1:], [
+                '000000001,update,phone,98,99',
+                '000000003,create,,,',
+            ])
+
+
+class TextRoundTripTests(TestCase):
+    """A CSV or NDJSON export imports back into the same members"""
+
+    FIELDS = ['member_number', *COLUMN_FIELD_MAP.values()]
+
+    @classmethod
+    def setUpTestData(cls):
+        for n, name in enumerate(['राम बहादुर थापा', 'सीता "कुमारी", श्रेष्ठ', 'Hari Prasad'], 1):
+            Member.objects.create(
+                date=date(2024, 1, n),
+                member_number=f'00000000{n}',
+                member_name=name,
+                phone=f'98000000{n}',
+                email=f'member{n}@example.com',
+                father_name='हरि प्रसाद',
+                address='काठमाडौं\nवडा नं. ५',
+                ward_no='५',
+                business_name='किराना पसल',
+                job='',
+            )
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def _members(self):
+        return [
+            {field: value if value is not None else '' for field, value in row.items()}
+            for row in Member.objects.order_by('member_number').values(*self.FIELDS)
+        ]
+
+    def _round_trip(self, fmt):
+        before = self._members()
+        path = os.path.join(self.directory, f'members.{fmt}')
+        with open(path, 'wb') as f:
+            # One member per block, so block edges fall between multi-byte lines
+            for block in TextHandler.iter_export(fmt, lines_per_block=1):
+                f.write(block)
+
+        Member.objects.all().delete()
+        success, message, errors, _warnings = TextHandler.import_from_file(path)
+
+        self.assertTrue(success, errors)
+        self.assertIn('Created: 3', message)
+        self.assertEqual(self._members(), before)
+
+    def test_csv_round_trip(self):
+        self._round_trip('csv')
+
+    def test_ndjson_round_trip(self):
+        self._round_trip('ndjson')
+
+
+@mock.patch('members.views.MEMBER_PAGE_SIZE', 2)
+class MemberListPaginationTests(TestCase):
+    """member_list pages by (date, member_number), newest first"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('officer', password='x', role='officer')
+        # Five members on one date, so only member_number tells them apart
+        for number in ['000000003', '000000001', '000000005', '000000002', '000000004']:
+            Member.objects.create(date=date(2024, 1, 1), member_number=number, member_name='Ram')
+        Member.objects.create(date=date(2024, 2, 1), member_number='000000009', member_name='Sita')
+        Member.objects.create(date=date(2023, 12, 1), member_number='000000008', member_name='Hari')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _page(self, **params):
+        response = self.client.get(reverse('members:member_list'), params)
+        self.assertEqual(response.status_code, 200)
+        context = response.context
+        return [member.member_number for member in context['members']], context
+
+    def test_pages_forward_and_back_across_equal_dates(self):
+        expected = [
+            ['000000009', '000000005'],
+            ['000000004', '000000003'],
+            ['000000002', '000000001'],
+            ['000000008'],
+        ]
+
+        pages = []
+        numbers, context = self._page()
+        self.assertFalse(context['has_previous'])
+        pages.append(numbers)
+        while context['has_next']:
+            numbers, context = self._page(after=context['next_cursor'])
+            self.assertTrue(context['has_previous'])
+            pages.append(numbers)
+        self.assertEqual(pages, expected)
+
+        back = [pages[-1]]
+        while context['has_previous']:
+            numbers, context = self._page(before=context['previous_cursor'])
+            self.assertTrue(context['has_next'])
+            back.append(numbers)
+        self.assertEqual(back, expected[::-1])
+
+    def test_cursor_keeps_the_filter(self):
+        numbers, context = self._page(q='Ram')
+        self.assertEqual(numbers, ['000000005', '000000004'])
+        self.assertIn('q=Ram', context['base_query'])
+
+        numbers, context = self._page(q='Ram', after=context['next_cursor'])
+        self.assertEqual(numbers, ['000000003', '000000002'])
+
+
+class MemberSearchIndexTests(TestCase):
+    """The FTS5 member index finds Nepali names and follows every kind of write"""
+
+    def setUp(self):
+        if not search_index.search_available():
+            self.skipTest('SQLite FTS5 table not available')
+
+    def _found(self, query):
+        return [member.member_number for member in search_index.search_members(query)]
+
+    def test_devanagari_name_by_word_prefix(self):
+        Member.objects.create(
+            date=date(2024, 1, 1), member_number='000000001', member_name='Ram Bahadur Shrestha',
+            member_name_nepali='राम बहादुर श्रेष्ठ', phone='९८४१२३४५६७',
+        )
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000002', member_name='Sita Thapa')
+
+        self.assertEqual(self._found('राम श्रे'), ['000000001'])
+        # Zero-width joiners typed into the query, Devanagari digits stored in the row
+        self.assertEqual(self._found('श्\u200dरेष्ठ'), ['000000001'])
+        self.assertEqual(self._found('9841'), ['000000001'])
+        self.assertEqual(self._found('थापा'), [])
+
+    def test_vowel_signs_do_not_split_names(self):
+        for number, name in [('1', 'सुतार'), ('2', 'सीता'), ('3', 'रमेश'), ('4', 'राम')]:
+            Member.objects.create(
+                date=date(2024, 1, 1), member_number=f'00000000{number}', member_name='x', member_name_nepali=name
+            )
+
+        self.assertEqual(self._found('सीता'), ['000000002'])
+        self.assertEqual(self._found('सु'), ['000000001'])
+        self.assertEqual(self._found('रा'), ['000000004'])
+        self.assertEqual(sorted(self._found('र')), ['000000003', '000000004'])
+        self.assertEqual(self._found('सीत'), ['000000002'])
+        self.assertEqual(self._found('ता'), [])
+
+    def test_query_splits_like_the_index(self):
+        self.assertEqual(search_index.build_match_query('राम श्रे'), '"राम"* AND "श्रे"*')
+        self.assertEqual(search_index.build_match_query('राम।सीता, ९८४१'), '"राम"* AND "सीता"* AND "9841"*')
+        self.assertEqual(search_index.build_match_query('__ --'), '')
+
+    def test_index_follows_save_and_delete(self):
+        member = Member.objects.create(date=date(2024, 1, 1), member_number='000000001', member_name='Ram')
+        self.assertEqual(self._found('ram'), ['000000001'])
+
+        member.member_name_nepali = 'हरि'
+        member.member_name = 'Hari'
+        member.save()
+        self.assertEqual(self._found('ram'), [])
+        self.assertEqual(self._found('हरि'), ['000000001'])
+
+        member.delete()
+        self.assertEqual(self._found('hari'), [])
+
+    def test_index_follows_bulk_import(self):
+        Member.objects.create(date=date(2024, 1, 1), member_number='000000001', member_name='Ram')
+        receiver = mock.Mock()
+        members_bulk_changed.connect(receiver)
+        self.addCleanup(members_bulk_changed.disconnect, receiver)
+
+        success, _message, errors, _warnings = ExcelHandler.import_rows(iter([
+            ('date', 'member_number', 'member_name'),
+            ('2024-01-01', '1', 'सीता'),
+            ('2024-01-01', '2', 'गीता'),
+        ]))
+
+        self.assertTrue(success, errors)
+        receiver.assert_called_once()
+        self.assertEqual(self._found('ram'), [])
+        self.assertEqual(self._found('सीता'), ['000000001'])
+        self.assertEqual(self._found('गीता'), ['000000002'])
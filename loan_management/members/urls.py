@@ -17,6 +17,10 @@ urlpatterns = [
     # Excel operations
     path('excel/template/', views.download_template, name='download_template'),
     path('excel/import/', views.import_members, name='import_page'),
+    path('excel/import/jobs/<int:job_id>/', views.import_job_detail, name='import_job_detail'),
+    path('excel/import/jobs/<int:job_id>/progress/', views.import_job_progress, name='import_job_progress'),
+    path('excel/import/jobs/<int:job_id>/errors/', views.import_job_errors, name='import_job_errors'),
+    path('excel/import/jobs/<int:job_id>/changes/', views.import_job_changes, name='import_job_changes'),
     path('excel/export/', views.export_members, name='export_members'),
 
 ]
@@ -1,42 +1,79 @@
+import hashlib
+import io
+from collections import defaultdict
 import openpyxl
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.utils import get_column_letter
 from datetime import datetime
+from django.conf import settings
 from django.db import transaction
 from members.models import Member
+from members import search_index
+from members.signals import members_bulk_changed
+
+# Column headers of the import template, in sheet order
+TEMPLATE_HEADERS = [
+    'date',
+    'member_number',
+    'member_name',
+    'phone',
+    'dob_bs',
+    'citizenship_no',
+    'email',
+    'profession',
+    'facebook_detail',
+    'whatsapp_detail',
+    'father_name',
+    'grandfather_name',
+    'spouse_name',
+    'spouse_phone',
+    'address',
+    'ward_no',
+    'business_name',
+    'business_address',
+    'job_name',
+    'job_address',
+]
+
+REQUIRED_HEADERS = ['date', 'member_number', 'member_name']
+
+DEFAULT_IMPORT_BATCH_SIZE = 500
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+# header tuple -> (template bytes, etag), filled by ExcelHandler.get_template_bytes
+_template_cache = {}
+
+# Sheet column -> Member field, for every column except member_number
+COLUMN_FIELD_MAP = {
+    header: ('job' if header == 'job_name' else header)
+    for header in TEMPLATE_HEADERS
+    if header != 'member_number'
+}
+
+
+def _comparable(value):
+    """Normalize a sheet or stored value so '5' == 5 and None == ''"""
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return str(value)
+
 
 class ExcelHandler:
     """Handle Excel import / export operations for members"""
 
     @staticmethod
-    def generate_template():
+    def generate_template(headers=None):
         """Generate excel template for member import"""
         wb = openpyxl.Workbook()
         ws = wb.active
         ws.title = "Member Import Template"
 
         # Define headers 
-        headers = [
-            'date',
-            'member_number',
-            'member_name',
-            'phone',
-            'dob_bs',
-            'citizenship_no',
-            'email',
-            'profession',
-            'facebook_detail',
-            'whatsapp_detail',
-            'father_name',
-            'grandfather_name',
-            'spouse_name',
-            'spouse_phone',
-            'address',
-            'ward_no',           
-            'business_name',
-            'business_address',
-            'job_name',
-            'job_address'
-        ]
+        headers = list(headers or TEMPLATE_HEADERS)
 
         # Style for header row
         header_fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
@@ -57,14 +94,14 @@ class ExcelHandler:
             cell.alignment = Alignment(horizontal='center', vertical='center')
             cell.border = border
 
-        # Set column width
-        ws.column_dimensions[cell.column_letter].width = 20
+            # Set column width
+            ws.column_dimensions[cell.column_letter].width = 20
+
+            # Format member_number column as TEXT to preserve leading zeros.
+            # A column level style covers every row without touching 10k cells.
+            if header == 'member_number':
+                ws.column_dimensions[cell.column_letter].number_format = '@'
 
-        # Format member_number column  as TEXT to preserve leading zeros
-        if  header == 'member_number':
-            for row_num in range(1, 10001):
-                ws.cell(row=row_num, column=col_num).number_format = '@'
-        
 
         # Add sample data row
         sample_data = [
@@ -90,9 +127,13 @@ class ExcelHandler:
             'काठमाडौं'              # job_address
         ]
 
-        for col_num, value in enumerate(sample_data, 1):
+        sample_row = dict(zip(TEMPLATE_HEADERS, sample_data))
+
+        for col_num, header in enumerate(headers, 1):
             cell = ws.cell(row=2, column=col_num)
-            cell.value = value
+            cell.value = sample_row.get(header, '')
+            if header == 'member_number':
+                cell.number_format = '@'
             cell.border = border
             cell.alignment = Alignment(horizontal='left', vertical='center')
 
@@ -133,6 +174,77 @@ class ExcelHandler:
 
         return wb
     
+    @staticmethod
+    def get_template_bytes(headers=None):
+        """
+        Return (xlsx bytes, etag) of the import template.
+
+        The template only depends on the header list, so it is built once per
+        process and served from memory afterwards.
+        """
+        key = tuple(headers or TEMPLATE_HEADERS)
+        cached = _template_cache.get(key)
+        if cached is None:
+            buffer = io.BytesIO()
+            ExcelHandler.generate_template(key).save(buffer)
+            content = buffer.getvalue()
+            cached = (content, hashlib.sha1(content).hexdigest())
+            _template_cache[key] = cached
+        return cached
+
+    @staticmethod
+    def export_to_excel(output, chunk_size=None):
+        """
+        Write all members to ``output`` (a path or binary file) as .xlsx.
+
+        Uses a write-only workbook fed from a chunked ``values_list`` iterator,
+        so neither the queryset nor the sheet is ever held in memory. Columns
+        follow the import template so an export can be re-imported as is.
+        Returns the number of members written.
+        """
+        wb = openpyxl.Workbook(write_only=True)
+        ws = wb.create_sheet("Members")
+
+        for col_num in range(1, len(TEMPLATE_HEADERS) + 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = 20
+
+        header_fill = PatternFill(start_color="3498DB", end_color="3498DB", fill_type="solid")
+        header_font = Font(bold=True, color="FFFFFF", size=11)
+        header_cells = []
+        for header in TEMPLATE_HEADERS:
+            cell = WriteOnlyCell(ws, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+            header_cells.append(cell)
+        ws.append(header_cells)
+
+        count = 0
+        for row in ExcelHandler.export_rows(chunk_size):
+            ws.append(row)
+            count += 1
+
+        wb.save(output)
+        return count
+
+    @staticmethod
+    def export_rows(chunk_size=None):
+        """Yield members as lists in template column order, dates as YYYY-MM-DD"""
+        if chunk_size is None:
+            chunk_size = getattr(settings, 'MEMBER_EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+
+        fields = [
+            'member_number' if header == 'member_number' else COLUMN_FIELD_MAP[header]
+            for header in TEMPLATE_HEADERS
+        ]
+        date_index = fields.index('date')
+
+        rows = Member.objects.order_by('member_number').values_list(*fields).iterator(chunk_size=chunk_size)
+        for row in rows:
+            row = list(row)
+            if row[date_index]:
+                row[date_index] = row[date_index].strftime('%Y-%m-%d')
+            yield row
+
     @staticmethod
     def validate_excel_data(file_path):
         """Validate Excel file before import"""
@@ -203,7 +315,7 @@ class ExcelHandler:
 
     @staticmethod
     @transaction.atomic
-    def import_from_excel(file_path):
+    def import_from_excel(file_path, batch_size=None):
         """Import members from Excel file"""
         try:
             # Validate first
@@ -217,9 +329,12 @@ class ExcelHandler:
             # Get headers
             headers = [cell.value for cell in ws[1]]
 
+            batch_size = ExcelHandler._get_batch_size(batch_size)
             created_count = 0
             updated_count = 0
+            unchanged_count = 0
             skipped_count = 0
+            batch = {}
 
             # Process each row
             for row_num in range(2, ws.max_row + 1):
@@ -233,63 +348,329 @@ class ExcelHandler:
                     skipped_count += 1
                     continue
 
-                # Prepare member data
-                member_number = str(row_data['member_number']).strip()
+                member_number, member_data = ExcelHandler._prepare_member_data(row_data)
 
-                # Handle leading zeros: pad to 9 digits if numeric
-                if member_number.isdigit():
-                    member_number = member_number.zfill(9)
+                batch[member_number] = member_data
+                if len(batch) >= batch_size:
+                    created, updated, unchanged = ExcelHandler._upsert_member_batch(batch)
+                    created_count += created
+                    updated_count += updated
+                    unchanged_count += unchanged
+                    batch = {}
 
-                # Parse Date
-                date_value = row_data.get('date')    
-                if isinstance(date_value, str):
-                    try:
-                        date_value = datetime.strptime(date_value, '%Y-%m-%d').date()
-                    except ValueError:
-                        date_value = datetime.now().date()
-                elif not date_value:
-                    date_value = datetime.now().date()
-                
-                member_data = {
-                    'date': date_value,
-                    'member_name': row_data.get('member_name', ''),
-                    'phone': row_data.get('phone', ''),
-                    'dob_bs': row_data.get('dob_bs', ''),
-                    'citizenship_no': row_data.get('citizenship_no', ''),
-                    'email': row_data.get('email', ''),
-                    'profession': row_data.get('profession', ''),
-                    'facebook_detail': row_data.get('facebook_detail', ''),
-                    'whatsapp_detail': row_data.get('whatsapp_detail', ''),
-                    'father_name': row_data.get('father_name', ''),
-                    'grandfather_name': row_data.get('grandfather_name', ''),
-                    'spouse_name': row_data.get('spouse_name', ''),
-                    'spouse_phone': row_data.get('spouse_phone', ''),
-                    'address': row_data.get('address', ''),
-                    'ward_no': row_data.get('ward_no', ''),
-                    'business_name': row_data.get('business_name', ''),
-                    'business_address': row_data.get('business_address', ''),
-                    'job': row_data.get('job_name', ''),
-                    'job_address': row_data.get('job_address', ''),
-
-                }
-
-                # Check if member exists
-                try:
-                    member = Member.objects.get(member_number=member_number)
-                    # Update existing member
-                    for key, value in member_data.items():
-                        setattr(member, key, value)
-                    member.save()
-                    updated_count += 1
-                except Member.DoesNotExist:
-                    # Create new member
-                    Member.objects.create(
-                        member_number=member_number,
-                        **member_data
-                    )
-                    created_count += 1
-            message = f"Import successful! Created: {created_count}, Updated: {updated_count}, Skipped: {skipped_count}" 
+            if batch:
+                created, updated, unchanged = ExcelHandler._upsert_member_batch(batch)
+                created_count += created
+                updated_count += updated
+                unchanged_count += unchanged
+
+            message = (
+                f"Import successful! Created: {created_count}, Updated: {updated_count}, "
+                f"Unchanged: {unchanged_count}, Skipped: {skipped_count}"
+            )
             return True, message, [], warnings
         
         except Exception as e:
-            return False, f"Import failed: {str(e)}", [], []
\ No newline at end of file
+            return False, f"Import failed: {str(e)}", [], []
+
+    @staticmethod
+    def _normalize_member_number(value):
+        """Strip member number and pad numeric ones to 9 digits (leading zeros)"""
+        member_number = str(value).strip()
+        if member_number.isdigit():
+            member_number = member_number.zfill(9)
+        return member_number
+
+    @staticmethod
+    def _prepare_member_data(row_data):
+        """Turn one sheet row into (member_number, Member field values)"""
+        member_number = ExcelHandler._normalize_member_number(row_data['member_number'])
+
+        # Parse Date
+        date_value = row_data.get('date')
+        if isinstance(date_value, datetime):
+            date_value = date_value.date()
+        elif isinstance(date_value, str) and date_value:
+            try:
+                date_value = datetime.strptime(date_value, '%Y-%m-%d').date()
+            except ValueError:
+                date_value = datetime.now().date()
+        elif not date_value:
+            date_value = datetime.now().date()
+
+        member_data = {'date': date_value}
+        for column, field in COLUMN_FIELD_MAP.items():
+            if column == 'date':
+                continue
+            value = row_data.get(column)
+            member_data[field] = value if value else ''
+
+        return member_number, member_data
+
+    @staticmethod
+    def _validate_row(row_data, seen_member_numbers):
+        """Validate a single data row, returns (errors, warnings) as (column, message) pairs"""
+        errors = []
+        warnings = []
+
+        if not row_data.get('member_number'):
+            errors.append(('member_number', "member_number is required!"))
+        else:
+            member_number = ExcelHandler._normalize_member_number(row_data['member_number'])
+            if member_number in seen_member_numbers:
+                errors.append(('member_number', f"Duplicate member_number {member_number}"))
+            else:
+                seen_member_numbers.add(member_number)
+
+        if not row_data.get('member_name'):
+            errors.append(('member_name', "member_name is required!"))
+
+        if not row_data.get('date'):
+            warnings.append(('date', "date is missing, will use today's date"))
+        elif isinstance(row_data['date'], str):
+            try:
+                datetime.strptime(row_data['date'], '%Y-%m-%d')
+            except ValueError:
+                errors.append(('date', "Invalid date format. Use YYYY-MM-DD"))
+
+        return errors, warnings
+
+    @staticmethod
+    def import_from_excel_streaming(file_path, batch_size=None, atomic=True, progress_callback=None,
+                                    issue_report=None, dry_run=False, diff_report=None):
+        """
+        Import members reading the sheet only once.
+
+        The workbook is opened in read-only mode and every row is validated
+        and written as it streams past, so memory stays flat regardless of
+        the row count. Rows are written in batches of ``batch_size`` (default
+        ``settings.MEMBER_IMPORT_BATCH_SIZE``).
+
+        With ``atomic=True`` the whole import runs in one transaction which is
+        rolled back if any row fails validation. With ``atomic=False`` every
+        batch commits on its own and invalid rows are reported and skipped,
+        which lets background jobs expose their progress while they run.
+
+        ``progress_callback`` is called with a stats dict after every batch.
+        When an ``issue_report`` is given, row errors and warnings are written
+        to it instead of being collected in the returned lists.
+
+        Existing members are only written when a field actually changed. With
+        ``dry_run=True`` nothing is written at all; the would-be creates and
+        per-field changes go to ``diff_report`` instead.
+        """
+        try:
+            wb = openpyxl.load_workbook(file_path, read_only=True, data_only=True)
+        except Exception as e:
+            return False, f"Error reading Excel file: {str(e)}", [], []
+
+        try:
+            ws = wb.active
+            # Read-only sheets report the size recorded in the file, which is cheap
+            total_rows = max((ws.max_row or 1) - 1, 0)
+            return ExcelHandler.import_rows(
+                ws.iter_rows(values_only=True), total_rows=total_rows,
+                batch_size=batch_size, atomic=atomic, progress_callback=progress_callback,
+                issue_report=issue_report, dry_run=dry_run, diff_report=diff_report,
+            )
+        finally:
+            wb.close()
+
+    @staticmethod
+    def import_rows(rows, total_rows=0, atomic=True, dry_run=False, **options):
+        """
+        Import members from any iterator of value tuples, header row first.
+
+        This is the format independent part of the streaming import, shared
+        by the Excel, CSV and NDJSON readers. See import_from_excel_streaming
+        for the options.
+        """
+        try:
+            if not atomic:
+                return ExcelHandler._import_rows(
+                    rows, atomic=False, total_rows=total_rows, dry_run=dry_run, **options
+                )
+
+            with transaction.atomic():
+                result = ExcelHandler._import_rows(
+                    rows, total_rows=total_rows, dry_run=dry_run, **options
+                )
+                if not result[0] or dry_run:
+                    transaction.set_rollback(True)
+            return result
+        except Exception as e:
+            return False, f"Import failed: {str(e)}", [], []
+
+    @staticmethod
+    def _import_rows(rows, batch_size=None, atomic=True, total_rows=0, progress_callback=None,
+                     issue_report=None, dry_run=False, diff_report=None):
+        """Validate and upsert members from an iterator of row value tuples"""
+        batch_size = ExcelHandler._get_batch_size(batch_size)
+        errors = []
+        warnings = []
+
+        header_row = next(rows, None)
+        if header_row is None:
+            return False, 'Data validation failed!', ["Excel file is empty. No data to import."], warnings
+
+        headers = [h.strip() if isinstance(h, str) else h for h in header_row]
+        for req_header in REQUIRED_HEADERS:
+            if req_header not in headers:
+                errors.append(f"Missing required column: {req_header}")
+        if errors:
+            return False, 'Data validation failed!', errors, warnings
+
+        stats = {
+            'total_rows': total_rows,
+            'processed_rows': 0,
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'skipped': 0,
+            'errors': 0,
+        }
+        data_rows = 0
+        seen_member_numbers = set()
+        batch = {}
+
+        def flush():
+            if batch and not (atomic and stats['errors']):
+                created, updated, unchanged = ExcelHandler._upsert_member_batch(
+                    batch, dry_run=dry_run, diff_report=diff_report
+                )
+                stats['created'] += created
+                stats['updated'] += updated
+                stats['unchanged'] += unchanged
+            batch.clear()
+            if progress_callback:
+                progress_callback(dict(stats))
+
+        for row_num, values in enumerate(rows, 2):
+            stats['processed_rows'] += 1
+            if stats['processed_rows'] % batch_size == 0:
+                flush()
+
+            # Skip completely blank rows (read-only sheets often report trailing ones)
+            if all(value is None or value == '' for value in values):
+                stats['skipped'] += 1
+                continue
+
+            data_rows += 1
+            row_data = dict(zip(headers, values))
+
+            row_errors, row_warnings = ExcelHandler._validate_row(row_data, seen_member_numbers)
+            for column, text in row_warnings:
+                if issue_report is not None:
+                    issue_report.add(row_num, 'warning', column, text)
+                else:
+                    warnings.append(f"Row {row_num}: {text}")
+            if row_errors:
+                for column, text in row_errors:
+                    if issue_report is not None:
+                        issue_report.add(row_num, 'error', column, text)
+                    else:
+                        errors.append(f"Row {row_num}: {text}")
+                stats['errors'] += 1
+                if not atomic:
+                    stats['skipped'] += 1
+                continue
+
+            # Once a row has failed nothing will be committed, keep validating only
+            if atomic and stats['errors']:
+                continue
+
+            member_number, member_data = ExcelHandler._prepare_member_data(row_data)
+            batch[member_number] = member_data
+
+        flush()
+
+        if not data_rows:
+            errors.append("Excel file is empty. No data to import.")
+            return False, 'Data validation failed!', errors, warnings
+
+        if stats['errors'] and atomic:
+            return False, 'Data validation failed!', errors, warnings
+
+        message = (
+            f"Created: {stats['created']}, Updated: {stats['updated']}, "
+            f"Unchanged: {stats['unchanged']}, Skipped: {stats['skipped']}"
+        )
+        if dry_run:
+            message = f"Dry run (nothing saved). {message}"
+        else:
+            message = f"Import successful! {message}"
+        if stats['errors']:
+            message += f", Rows with errors: {stats['errors']}"
+        return True, message, errors, warnings
+
+    @staticmethod
+    def _get_batch_size(batch_size=None):
+        """Resolve the import batch size from the argument or settings"""
+        if batch_size is None:
+            batch_size = getattr(settings, 'MEMBER_IMPORT_BATCH_SIZE', DEFAULT_IMPORT_BATCH_SIZE)
+        return max(int(batch_size), 1)
+
+    @staticmethod
+    def _upsert_member_batch(batch, dry_run=False, diff_report=None):
+        """
+        Create new members and update only what changed on existing ones.
+
+        ``batch`` maps member_number -> Member field values. Stored values are
+        fetched in one query and compared field by field; unchanged members
+        are not written at all and changed ones are updated grouped by the set
+        of fields that differ. New members go through a conflict-aware insert.
+        Returns (created_count, updated_count, unchanged_count).
+        """
+        fields = list(COLUMN_FIELD_MAP.values())
+        existing = {
+            row['member_number']: row
+            for row in Member.objects.filter(member_number__in=list(batch)).values('id', 'member_number', *fields)
+        }
+
+        new_members = []
+        changed_groups = defaultdict(list)
+        unchanged_count = 0
+
+        for member_number, data in batch.items():
+            current = existing.get(member_number)
+            if current is None:
+                new_members.append(Member(member_number=member_number, **data))
+                if diff_report is not None:
+                    diff_report.add(member_number, 'create')
+                continue
+
+            changed_fields = tuple(
+                field for field in fields
+                if _comparable(data[field]) != _comparable(current[field])
+            )
+            if not changed_fields:
+                unchanged_count += 1
+                continue
+
+            if diff_report is not None:
+                for field in changed_fields:
+                    diff_report.add(member_number, 'update', field, current[field], data[field])
+            changed_groups[changed_fields].append(
+                Member(id=current['id'], member_number=member_number, **data)
+            )
+
+        if not dry_run:
+            if new_members:
+                Member.objects.bulk_create(
+                    new_members,
+                    update_conflicts=True,
+                    unique_fields=['member_number'],
+                    update_fields=fields,
+                )
+            for changed_fields, members in changed_groups.items():
+                Member.objects.bulk_update(members, changed_fields)
+
+            # Bulk writes skip post_save, so keep the search index current here
+            search_index.index_member_numbers(
+                [member.member_number for member in new_members]
+                + [member.member_number for members in changed_groups.values() for member in members]
+            )
+            members_bulk_changed.send(sender=Member)
+
+        updated_count = sum(len(members) for members in changed_groups.values())
+        return len(new_members), updated_count, unchanged_count
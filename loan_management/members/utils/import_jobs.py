@@ -0,0 +1,186 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.utils import timezone
+from members.models import MemberImportJob
+from .excel_handler import ExcelHandler
+from .text_handler import TextHandler
+from .import_report import ImportIssueReport, ImportDiffReport
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+
+# Progress of an all-or-nothing import is kept here, its row writes would be invisible
+PROGRESS_CACHE_TIMEOUT = 60 * 60
+
+
+def _get_executor():
+    """Process-local worker pool, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'MEMBER_IMPORT_WORKERS', 1),
+            thread_name_prefix='member-import',
+        )
+    return _executor
+
+
+def upload_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'imports')
+
+
+def enqueue_import_job(uploaded_file, user=None, dry_run=False, skip_invalid_rows=False):
+    """
+    Save the uploaded file, create a queued job and hand it to the worker pool.
+
+    The import is all-or-nothing unless ``skip_invalid_rows`` is set, in
+    which case valid rows are committed batch by batch and invalid ones are
+    only reported.
+    """
+    os.makedirs(upload_dir(), exist_ok=True)
+    job = MemberImportJob.objects.create(
+        original_filename=uploaded_file.name,
+        dry_run=dry_run,
+        skip_invalid_rows=skip_invalid_rows,
+        created_by=user,
+    )
+
+    file_path = os.path.join(upload_dir(), f"{job.pk}_{os.path.basename(uploaded_file.name)}")
+    with open(file_path, 'wb+') as destination:
+        for chunk in uploaded_file.chunks():
+            destination.write(chunk)
+
+    job.file_path = file_path
+    job.save(update_fields=['file_path'])
+
+    # Start only once the job row is visible to the worker's own connection
+    transaction.on_commit(lambda: _get_executor().submit(run_import_job, job.pk))
+    return job
+
+
+def import_member_file(file_path, **options):
+    """Import an .xlsx, .csv or .ndjson member file with the streaming importer"""
+    fmt = TextHandler.format_for(file_path)
+    if fmt:
+        return TextHandler.import_from_file(file_path, fmt, **options)
+    return ExcelHandler.import_from_excel_streaming(file_path, **options)
+
+
+def _progress_key(job_id):
+    return f"member_import_progress:{job_id}"
+
+
+def _progress_fields(stats):
+    """Job row counters for an importer stats dict"""
+    return {
+        'total_rows': max(stats['total_rows'], stats['processed_rows']),
+        'processed_rows': stats['processed_rows'],
+        'created_count': stats['created'],
+        'updated_count': stats['updated'],
+        'unchanged_count': stats['unchanged'],
+        'skipped_count': stats['skipped'],
+        'error_count': stats['errors'],
+    }
+
+
+def live_progress(job):
+    """Fill in the counters of a running all-or-nothing job from the progress cache"""
+    if job.status == 'running' and not job.skip_invalid_rows:
+        stats = cache.get(_progress_key(job.pk))
+        if stats:
+            for field, value in _progress_fields(stats).items():
+                setattr(job, field, value)
+    return job
+
+
+def run_import_job(job_id):
+    """Run one queued import job, making sure it ends as completed or failed"""
+    try:
+        claimed = MemberImportJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if not claimed:
+            return
+        try:
+            _run_claimed_job(job_id)
+        except Exception as e:
+            # Whatever broke (reports, the job row itself), never leave the job 'running'
+            logger.exception("Member import job %s failed", job_id)
+            MemberImportJob.objects.filter(pk=job_id).update(
+                status='failed', message=f"Import failed: {str(e)}", finished_at=timezone.now()
+            )
+    finally:
+        cache.delete(_progress_key(job_id))
+        # Worker threads own their connections, close them when the job is done
+        connections.close_all()
+
+
+def _run_claimed_job(job_id):
+    job = MemberImportJob.objects.get(pk=job_id)
+    atomic = not job.skip_invalid_rows
+    latest_stats = {}
+
+    def report_progress(stats):
+        latest_stats.update(stats)
+        if atomic:
+            # Written inside the import's transaction the row would only change at the end
+            cache.set(_progress_key(job_id), stats, PROGRESS_CACHE_TIMEOUT)
+        else:
+            MemberImportJob.objects.filter(pk=job_id).update(**_progress_fields(stats))
+
+    report = ImportIssueReport(f"import_{job_id}_issues.csv")
+    diff_report = ImportDiffReport(f"import_{job_id}_changes.csv") if job.dry_run else None
+    try:
+        success, message, errors, warnings = import_member_file(
+            job.file_path, atomic=atomic, progress_callback=report_progress,
+            issue_report=report, dry_run=job.dry_run, diff_report=diff_report,
+        )
+    except Exception as e:
+        success, message, errors, warnings = False, f"Import failed: {str(e)}", [], []
+
+    # File level problems (missing columns, unreadable file) come back as plain messages
+    for error in errors:
+        report.add('', 'error', '', error)
+    for warning in warnings:
+        report.add('', 'warning', '', warning)
+    report.close()
+    if diff_report is not None:
+        diff_report.close()
+
+    job.refresh_from_db()
+    if latest_stats:
+        for field, value in _progress_fields(latest_stats).items():
+            setattr(job, field, value)
+    if atomic and not success:
+        # The whole import was rolled back
+        job.created_count = job.updated_count = job.unchanged_count = 0
+        message = f"{message} Nothing was saved."
+    job.status = 'completed' if success else 'failed'
+    job.message = message
+    job.error_count = max(job.error_count, len(errors))
+    job.warning_count = report.warning_count
+    job.error_report_path = report.path
+    job.diff_report_path = diff_report.path if diff_report is not None else ''
+    job.finished_at = timezone.now()
+    job.save()
+
+    try:
+        os.remove(job.file_path)
+    except OSError:
+        pass
+
+
+def run_queued_jobs():
+    """Run every queued job in the current process, oldest first"""
+    job_ids = list(
+        MemberImportJob.objects.filter(status='queued')
+        .order_by('created_at')
+        .values_list('pk', flat=True)
+    )
+    for job_id in job_ids:
+        run_import_job(job_id)
+    return len(job_ids)
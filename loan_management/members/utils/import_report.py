@@ -0,0 +1,79 @@
+import csv
+import os
+from django.conf import settings
+
+
+def report_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'import_reports')
+
+
+class CsvReport:
+    """
+    CSV file written line by line while an import runs.
+
+    Lines go straight to disk so a big file never holds its messages in
+    memory (or in the session). The file is written with a BOM so Excel
+    shows Nepali text correctly, and removed on close if nothing was written.
+    """
+    headers = []
+
+    def __init__(self, filename):
+        os.makedirs(report_dir(), exist_ok=True)
+        self.path = os.path.join(report_dir(), filename)
+        self.line_count = 0
+        self._file = open(self.path, 'w', newline='', encoding='utf-8-sig')
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.headers)
+
+    def write(self, row):
+        self._writer.writerow(row)
+        self.line_count += 1
+
+    def close(self):
+        """Close the file, removing it when nothing was reported"""
+        self._file.close()
+        if not self.line_count:
+            os.remove(self.path)
+            self.path = ''
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ImportIssueReport(CsvReport):
+    """Per-row import errors and warnings"""
+    headers = ['row', 'level', 'column', 'message']
+
+    def __init__(self, filename):
+        super().__init__(filename)
+        self.error_count = 0
+        self.warning_count = 0
+
+    def add(self, row_num, level, column, message):
+        self.write([row_num, level, column or '', message])
+        if level == 'error':
+            self.error_count += 1
+        else:
+            self.warning_count += 1
+
+    @property
+    def issue_count(self):
+        return self.error_count + self.warning_count
+
+
+class ImportDiffReport(CsvReport):
+    """What an import would change: one line per new member or changed field"""
+    headers = ['member_number', 'change', 'field', 'old_value', 'new_value']
+
+    def add(self, member_number, change, field='', old_value='', new_value=''):
+        self.write([
+            member_number,
+            change,
+            field,
+            '' if old_value is None else old_value,
+            '' if new_value is None else new_value,
+        ])
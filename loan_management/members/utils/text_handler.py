@@ -0,0 +1,125 @@
+import csv
+import io
+import json
+from .excel_handler import ExcelHandler, TEMPLATE_HEADERS
+
+# File extension -> interchange format
+TEXT_FORMATS = {
+    '.csv': 'csv',
+    '.ndjson': 'ndjson',
+    '.jsonl': 'ndjson',
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+}
+
+
+def _count_lines(file_path):
+    """Count lines by scanning raw bytes, far cheaper than parsing them"""
+    count = 0
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            count += block.count(b'\n')
+    return count
+
+
+class TextHandler:
+    """
+    Handle CSV / NDJSON import / export operations for members.
+
+    Plain-text counterpart of ExcelHandler for data moved between this app
+    and the desktop app. Uses the same columns as the Excel template and
+    the same streaming import pipeline, reading and writing line by line so
+    memory stays constant.
+    """
+
+    @staticmethod
+    def format_for(filename):
+        """Return 'csv' / 'ndjson' for a supported file name, else None"""
+        lowered = filename.lower()
+        for extension, fmt in TEXT_FORMATS.items():
+            if lowered.endswith(extension):
+                return fmt
+        return None
+
+    @staticmethod
+    def import_from_file(file_path, fmt=None, **options):
+        """
+        Import members from a CSV or NDJSON file.
+
+        Takes the same options as ExcelHandler.import_from_excel_streaming.
+        """
+        fmt = fmt or TextHandler.format_for(file_path)
+        try:
+            f = open(file_path, newline='', encoding='utf-8-sig')
+        except OSError as e:
+            return False, f"Error reading file: {str(e)}", [], []
+
+        with f:
+            if fmt == 'csv':
+                rows = TextHandler._csv_rows(f)
+                total_rows = max(_count_lines(file_path) - 1, 0)
+            elif fmt == 'ndjson':
+                rows = TextHandler._ndjson_rows(f)
+                total_rows = _count_lines(file_path)
+            else:
+                return False, f"Unsupported file format: {file_path}", [], []
+
+            return ExcelHandler.import_rows(rows, total_rows=total_rows, **options)
+
+    @staticmethod
+    def _csv_rows(f):
+        """Header row, then one tuple per line; empty cells become None"""
+        for row in csv.reader(f):
+            yield tuple(value if value != '' else None for value in row)
+
+    @staticmethod
+    def _ndjson_rows(f):
+        """Template headers, then one tuple per JSON object line"""
+        yield tuple(TEMPLATE_HEADERS)
+        for line in f:
+            line = line.strip()
+            if not line:
+                yield (None,) * len(TEMPLATE_HEADERS)
+                continue
+            record = json.loads(line)
+            yield tuple(record.get(header) for header in TEMPLATE_HEADERS)
+
+    @staticmethod
+    def iter_export(fmt, chunk_size=None, lines_per_block=1000, stats=None):
+        """
+        Yield the member export as encoded byte blocks, for streaming responses.
+
+        Lines are buffered into blocks of ``lines_per_block`` so the client
+        gets reasonably sized writes instead of one per member. If a ``stats``
+        dict is passed, its 'rows' key is kept at the number of members written.
+        """
+        if stats is None:
+            stats = {}
+        stats['rows'] = 0
+        buffer = io.StringIO()
+        writer = csv.writer(buffer) if fmt == 'csv' else None
+
+        if writer:
+            writer.writerow(TEMPLATE_HEADERS)
+
+        pending = 0
+        for row in ExcelHandler.export_rows(chunk_size):
+            if writer:
+                writer.writerow(['' if value is None else value for value in row])
+            else:
+                buffer.write(json.dumps(dict(zip(TEMPLATE_HEADERS, row)), ensure_ascii=False))
+                buffer.write('\n')
+
+            stats['rows'] += 1
+            pending += 1
+            if pending >= lines_per_block:
+                yield buffer.getvalue().encode('utf-8')
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
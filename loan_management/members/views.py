@@ -1,45 +1,125 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, FileResponse, StreamingHttpResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
 from .utils.excel_handler import ExcelHandler
+from .utils.text_handler import TextHandler, CONTENT_TYPES
+from .utils.import_jobs import enqueue_import_job, live_progress
+import logging
 import os
+import tempfile
+import time
 from datetime import datetime, timedelta
 from django.conf import settings
-from django.db.models import Q
-from .models import Member
+from django.db.models import Q, Exists, OuterRef
+from .models import Member, MemberImportJob
 from .forms import MemberForm
+from . import search_index
+from utils.process_stats import current_rss_mb
+from dashboard.stats import get_portfolio_stats
 
+logger = logging.getLogger(__name__)
 
-# updated code
-@login_required
-def member_list(request):
-    """List all members with statistics"""
-    # Get all members
-    members = Member.objects.all().order_by('-date')
 
-    # Calculate statistics
-    total_members = members.count()
+MEMBER_PAGE_SIZE = 50
+
 
-    # Members added this month
-    today = datetime.now()
-    first_day_of_month = today.replace(day=1)
-    new_this_month = members.filter(date__gte=first_day_of_month).count()
+def _encode_member_cursor(member):
+    return f"{member.date.isoformat()}_{member.member_number}"
 
-    # Active loans count (if loan model is available)
+
+def _decode_member_cursor(cursor):
+    """Return (date, member_number) from a page cursor, or None if malformed"""
     try:
+        date_str, member_number = cursor.split('_', 1)
+        return datetime.strptime(date_str, '%Y-%m-%d').date(), member_number
+    except (ValueError, AttributeError):
+        return None
+
+
+def _member_list_filters(request, today):
+    """Build the server-side filter from the query string"""
+    filters = Q()
+
+    search_query = request.GET.get('q', '').strip()
+    if search_query:
+        filters &= (
+            Q(member_number__istartswith=search_query) |
+            Q(member_name__icontains=search_query) |
+            Q(member_name_nepali__icontains=search_query) |
+            Q(phone__icontains=search_query) |
+            Q(email__icontains=search_query)
+        )
+
+    member_filter = request.GET.get('filter', 'all')
+    if member_filter == 'recent':
+        filters &= Q(date__gte=today - timedelta(days=30))
+    elif member_filter == 'active':
         from loans.models import LoanInfo
-        active_loans = LoanInfo.objects.filter(
-            status__in=['pending', 'approved', 'disbursed']
-        ).count()
-    except:
-        active_loans = 0
-    
+        filters &= Q(Exists(LoanInfo.objects.filter(
+            member=OuterRef('member_number'),
+            status__in=['pending', 'approved', 'disbursed'],
+        )))
+
+    return filters, search_query, member_filter
+
+
+@login_required
+def member_list(request):
+    """List members a page at a time, using keyset pagination on (date, member_number)"""
+    today = datetime.now().date()
+    filters, search_query, member_filter = _member_list_filters(request, today)
+
+    # Totals come from the cached dashboard counters; only a filtered
+    # count has to touch the members table
+    stats = get_portfolio_stats()
+    matching_members = Member.objects.filter(filters).count() if filters else stats['total_members']
+
+    members = Member.objects.filter(filters)
+
+    after = _decode_member_cursor(request.GET.get('after'))
+    before = _decode_member_cursor(request.GET.get('before'))
+
+    if before:
+        # Walk backwards from the first row of the current page, then flip
+        date, number = before
+        page = list(
+            members.filter(Q(date__gt=date) | Q(date=date, member_number__gt=number))
+            .order_by('date', 'member_number')[:MEMBER_PAGE_SIZE + 1]
+        )
+        has_previous = len(page) > MEMBER_PAGE_SIZE
+        page = page[:MEMBER_PAGE_SIZE][::-1]
+        has_next = True
+    else:
+        if after:
+            date, number = after
+            members = members.filter(Q(date__lt=date) | Q(date=date, member_number__lt=number))
+        page = list(members.order_by('-date', '-member_number')[:MEMBER_PAGE_SIZE + 1])
+        has_next = len(page) > MEMBER_PAGE_SIZE
+        page = page[:MEMBER_PAGE_SIZE]
+        has_previous = bool(after)
+
+    # Keep the filters on the pagination links
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    base_query = query.urlencode()
+
     context = {
-        'members': members,
-        'total_members': total_members,
-        'new_this_month': new_this_month,
-        'active_loans': active_loans,
+        'members': page,
+        'total_members': stats['total_members'],
+        'new_this_month': stats['new_this_month'],
+        'matching_members': matching_members,
+        'active_loans': stats['active_loans'],
+        'search_query': search_query,
+        'member_filter': member_filter,
+        'base_query': base_query,
+        'has_next': has_next and bool(page),
+        'has_previous': has_previous and bool(page),
+        'next_cursor': _encode_member_cursor(page[-1]) if page else '',
+        'previous_cursor': _encode_member_cursor(page[0]) if page else '',
     }
 
     return render(request, 'members/member_list.html', context)
@@ -52,12 +132,7 @@ def member_search_ajax(request):
     if len(query) < 2:
         return JsonResponse({'results':[]})
     
-    members = Member.objects.filter(
-        Q(member_number__icontains=query) |
-        Q(member_name__icontains=query) |
-        Q(phone__icontains=query) |
-        Q(email__icontains=query)
-    )[:10]
+    members = search_index.search_members(query, limit=10)
 
     results = [{
         'id': m.member_number,
@@ -167,19 +242,25 @@ def member_delete(request, member_number):
 
 # Excel Operations
 
+def _template_etag(request):
+    return ExcelHandler.get_template_bytes()[1]
+
+
 @login_required
+@condition(etag_func=_template_etag)
 def download_template(request):
     """Download Excel template for member import"""
     try:
-        wb = ExcelHandler.generate_template()
+        content, etag = ExcelHandler.get_template_bytes()
 
         # Create response
         response = HttpResponse(
+            content,
             content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
         )
         response['Content-Disposition'] = 'attachment; filename=member_import_template.xlsx'
-
-        wb.save(response)
+        # Let the browser keep it, but revalidate with the ETag before reuse
+        patch_cache_control(response, private=True, no_cache=True)
 
         messages.info(
             request, 
@@ -195,7 +276,7 @@ def download_template(request):
 
 @login_required
 def import_members(request):
-    """Import members from Excel file"""
+    """Upload an Excel file and queue it for background import"""
     if request.method == 'POST':
         if 'excel_file' not in request.FILES:
             messages.error(
@@ -207,70 +288,158 @@ def import_members(request):
         excel_file = request.FILES['excel_file']
         
         # Validate file extension
-        if not excel_file.name.endswith('.xlsx'):
+        if not (excel_file.name.endswith('.xlsx') or TextHandler.format_for(excel_file.name)):
             messages.error(
                 request, 
-                '❌ केवल .xlsx file मात्र अपलोड गर्नुहोस् (Only .xlsx files allowed)'
+                '❌ केवल .xlsx, .csv वा .ndjson file मात्र अपलोड गर्नुहोस् (Only .xlsx, .csv or .ndjson files allowed)'
             )
             return redirect('members:import_page')
         
-        # Save uploaded file temporarily
-        file_path = os.path.join(settings.MEDIA_ROOT, 'temp', excel_file.name)
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        
-        with open(file_path, 'wb+') as destination:
-            for chunk in excel_file.chunks():
-                destination.write(chunk)
-        
-        # Import data
-        success, message, errors, warnings = ExcelHandler.import_from_excel(file_path)
-        
-        # Clean up temp file
-        try:
-            os.remove(file_path)
-        except:
-            pass
-        
-        # Show results
-        if success:
-            messages.success(request, f'✅ {message}')
-            if warnings:
-                for warning in warnings:
-                    messages.warning(request, f'⚠️ {warning}')
+        # Save the file and hand it to the import worker
+        dry_run = bool(request.POST.get('dry_run'))
+        job = enqueue_import_job(
+            excel_file,
+            user=request.user,
+            dry_run=dry_run,
+            skip_invalid_rows=bool(request.POST.get('skip_invalid_rows')),
+        )
+
+        if dry_run:
+            messages.info(request, f'🔍 Preview queued (nothing will be saved): {excel_file.name}')
         else:
-            messages.error(request, f'❌ {message}')
-            for error in errors:
-                messages.error(request, f'❌ {error}')
-            if warnings:
-                for warning in warnings:
-                    messages.warning(request, f'⚠️ {warning}')
-        
-        return redirect('members:member_list')
+            messages.info(request, f'⏳ Import queued: {excel_file.name}')
+        return redirect('members:import_job_detail', job_id=job.pk)
     
     return render(request, 'members/import_members.html')
 
 
+@login_required
+def import_job_detail(request, job_id):
+    """Progress page for a background import job"""
+    job = live_progress(get_object_or_404(MemberImportJob, pk=job_id))
+
+    # Announce the outcome once, as a single summary; row details live in the report file
+    if job.is_finished and MemberImportJob.objects.filter(
+        pk=job.pk, summary_notified=False
+    ).update(summary_notified=True):
+        if job.status == 'failed':
+            messages.error(request, f'❌ {job.message} ({job.error_count} errors)')
+        elif job.error_count or job.warning_count:
+            messages.warning(
+                request,
+                f'⚠️ {job.message} — {job.error_count} errors, {job.warning_count} warnings. '
+                f'Download the error report for details.'
+            )
+        else:
+            messages.success(request, f'✅ {job.message}')
+
+    return render(request, 'members/import_job.html', {'job': job})
+
+
+@login_required
+def import_job_changes(request, job_id):
+    """Download the per-member change preview of a dry-run import job as CSV"""
+    job = get_object_or_404(MemberImportJob, pk=job_id)
+    if not job.diff_report_path or not os.path.exists(job.diff_report_path):
+        raise Http404("Change report not found")
+
+    return FileResponse(
+        open(job.diff_report_path, 'rb'),
+        as_attachment=True,
+        filename=f'import_{job.pk}_changes.csv',
+        content_type='text/csv',
+    )
+
+
+@login_required
+def import_job_errors(request, job_id):
+    """Download the per-row error/warning report of an import job as CSV"""
+    job = get_object_or_404(MemberImportJob, pk=job_id)
+    if not job.error_report_path or not os.path.exists(job.error_report_path):
+        raise Http404("Error report not found")
+
+    return FileResponse(
+        open(job.error_report_path, 'rb'),
+        as_attachment=True,
+        filename=f'import_{job.pk}_errors.csv',
+        content_type='text/csv',
+    )
+
+
+@login_required
+def import_job_progress(request, job_id):
+    """JSON progress of a background import job, polled by the progress page"""
+    job = live_progress(get_object_or_404(MemberImportJob, pk=job_id))
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'dry_run': job.dry_run,
+        'total_rows': job.total_rows,
+        'processed_rows': job.processed_rows,
+        'percent': job.percent,
+        'created': job.created_count,
+        'updated': job.updated_count,
+        'unchanged': job.unchanged_count,
+        'skipped': job.skipped_count,
+        'errors': job.error_count,
+        'eta_seconds': job.eta_seconds,
+        'message': job.message,
+        'finished': job.is_finished,
+    })
+
+
+def _log_export(fmt, count, started, rss_before):
+    """Log an export's duration and how much it grew the process, not its lifetime peak"""
+    rss_after = current_rss_mb()
+    logger.info(
+        "Member export (%s): %d members in %.2fs, RSS change %s",
+        fmt,
+        count,
+        time.monotonic() - started,
+        f"{rss_after - rss_before:+.1f} MB" if None not in (rss_before, rss_after) else 'n/a',
+    )
+
+
 @login_required
 def export_members(request):
-    """Export all members to Excel"""
-    try:
-        wb = ExcelHandler.export_to_excel()
-        
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
-        filename = f'members_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        response['Content-Disposition'] = f'attachment; filename={filename}'
-        
-        wb.save(response)
-        
-        messages.success(
-            request,
-            f'✅ {Member.objects.count()} members exported successfully!'
-        )
-        
+    """Export all members to Excel (default), CSV or NDJSON, streamed to the client"""
+    started = time.monotonic()
+    rss_before = current_rss_mb()
+    fmt = request.GET.get('format', 'xlsx')
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+    if fmt in CONTENT_TYPES:
+        def stream():
+            stats = {}
+            yield from TextHandler.iter_export(fmt, stats=stats)
+            _log_export(fmt, stats['rows'], started, rss_before)
+
+        response = StreamingHttpResponse(stream(), content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename=members_export_{timestamp}.{fmt}'
         return response
-        
+
+    try:
+        # An .xlsx is a ZIP that openpyxl writes in one save() call (and its
+        # write-only sheets already spool their rows to a temp file), so the
+        # workbook cannot be yielded piece by piece. It is written to an
+        # anonymous temp file instead, and FileResponse streams that back in
+        # blocks: memory stays flat and a failed export can still redirect.
+        export_file = tempfile.TemporaryFile()
+        count = ExcelHandler.export_to_excel(export_file)
+        export_file.seek(0)
     except Exception as e:
         messages.error(request, f"❌ Export failed: {str(e)}")
-        return redirect('members:member_list')
\ No newline at end of file
+        return redirect('members:member_list')
+
+    _log_export('xlsx', count, started, rss_before)
+
+    response = FileResponse(
+        export_file,
+        as_attachment=True,
+        filename=f'members_export_{timestamp}.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    )
+
+    messages.success(request, f'✅ {count} members exported successfully!')
+
+    return response
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0002_rename_request_loan_amount_projectdetail_requested_loan_amount_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='projectdetail',
+            name='requested_loan_amount_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectdetail',
+            name='self_investment_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='projectdetail',
+            name='total_cost_value',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=14, null=True),
+        ),
+    ]
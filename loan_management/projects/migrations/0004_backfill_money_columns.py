@@ -0,0 +1,27 @@
+from django.db import migrations
+from utils.money import backfill_money_columns
+
+# Money columns as they were when the shadows were added
+MONEY_FIELDS = {
+    'projects.ProjectDetail': {
+        'self_investment': 'self_investment_value',
+        'requested_loan_amount': 'requested_loan_amount_value',
+        'total_cost': 'total_cost_value',
+    },
+}
+
+
+def fill_shadow_columns(apps, schema_editor):
+    for label, money_fields in MONEY_FIELDS.items():
+        backfill_money_columns(apps.get_model(label), money_fields)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0003_projectdetail_requested_loan_amount_value_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_shadow_columns, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,8 @@
 from django.db import models
 from members.models import Member
+from utils.money import MoneyShadowMixin, amount_field
 
-class ProjectDetail(models.Model):
+class ProjectDetail(MoneyShadowMixin, models.Model):
     """Project details for loan purpose"""
     member = models.ForeignKey(Member, on_delete=models.CASCADE, to_field='member_number', db_column='member_number')
     project_name = models.CharField(max_length=200)
@@ -9,6 +10,15 @@ class ProjectDetail(models.Model):
     requested_loan_amount = models.CharField(max_length=50)
     total_cost = models.CharField(max_length=50)
     remarks = models.TextField(blank=True, null=True)
+    self_investment_value = amount_field()
+    requested_loan_amount_value = amount_field()
+    total_cost_value = amount_field()
+
+    money_fields = {
+        'self_investment': 'self_investment_value',
+        'requested_loan_amount': 'requested_loan_amount_value',
+        'total_cost': 'total_cost_value',
+    }
 
     class Meta:
         db_table = 'project_detail'
@@ -0,0 +1,232 @@
+"""
+Month-end report packs: the selected documents for every loan matching a
+filter, rendered in the background and collected into one ZIP.
+
+A job works through the matching members a chunk at a time. Each chunk's
+contexts come from ReportContextBuilder.build_many (one query per table
+for the whole chunk), its documents go to the render pool together, and
+the job row is updated after every chunk so the progress page can follow.
+Documents generated before from the same template and context are reused
+(reports.output_cache) rather than rendered again. A member whose context
+or documents fail is recorded in the job's member_errors and left out of
+the ZIP; the other members go on.
+"""
+import os
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Max
+from django.utils import timezone
+from loans.models import LoanInfo
+from .models import ReportBatchJob, ReportTracking
+from .output_cache import plan_reports
+from .render_pool import REPORT_TEMPLATES, render_each
+from .services.report_context.context_builder import ReportContextBuilder
+
+_executor = None
+
+
+def _get_executor():
+    """Process-local worker pool, created on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'REPORT_BATCH_WORKERS', 1),
+            thread_name_prefix='report-batch',
+        )
+    return _executor
+
+
+def batch_dir():
+    return os.path.join(settings.MEDIA_ROOT, 'report_batches')
+
+
+def expire_stale_jobs(now=None):
+    """
+    Mark jobs queued for longer than REPORT_BATCH_QUEUE_TIMEOUT as failed.
+
+    The worker pool lives in the web process, so a job queued just before
+    a restart is never picked up. Returns the number of jobs marked.
+    """
+    now = now or timezone.now()
+    timeout = timedelta(seconds=getattr(settings, 'REPORT_BATCH_QUEUE_TIMEOUT', 6 * 60 * 60))
+    return ReportBatchJob.objects.filter(status='queued', created_at__lt=now - timeout).update(
+        status='failed',
+        message="The server restarted before this batch started, please start it again",
+        finished_at=now,
+    )
+
+
+def enqueue_batch_job(report_types, user=None, **fields):
+    """Create a queued batch job and hand it to the worker pool once committed"""
+    expire_stale_jobs()
+    job = ReportBatchJob.objects.create(
+        report_types=[report_type for report_type in report_types if report_type in REPORT_TEMPLATES],
+        created_by=user,
+        **fields,
+    )
+    transaction.on_commit(lambda: _get_executor().submit(run_batch_job, job.pk))
+    return job
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def matching_loans(job):
+    """The latest loan matching the job's filter of each member, ordered by member"""
+    loans = LoanInfo.objects.filter(status=job.loan_status)
+    if job.loan_type:
+        loans = loans.filter(loan_type=job.loan_type)
+    # Whole-day bounds on created_at itself, so the (status, created_at) index applies
+    if job.date_from:
+        loans = loans.filter(created_at__gte=_day_start(job.date_from))
+    if job.date_to:
+        loans = loans.filter(created_at__lt=_day_start(job.date_to + timedelta(days=1)))
+    latest_ids = loans.order_by().values('member').annotate(latest=Max('id')).values('latest')
+    return LoanInfo.objects.filter(pk__in=latest_ids).order_by('member_id')
+
+
+def _render_chunk(job, loans):
+    """
+    Render one chunk; returns ((member_number, ReportOutput) pairs done,
+    {member_number: error message} of the members that failed).
+
+    A member whose context, plan or document fails is recorded and left out,
+    the rest of the chunk goes on.
+    """
+    failed = {}
+    try:
+        contexts = ReportContextBuilder.build_many(
+            loans, job.entered_by, job.entered_post, job.approved_by, job.approver_post, errors=failed
+        )
+    except Exception as e:
+        # Loading the chunk's rows failed, so none of its members can be done
+        return [], {loan.member_id: str(e) for loan in loans}
+
+    plans = {}
+    for member_number, context in contexts.items():
+        try:
+            plans[member_number] = plan_reports(job.report_types, REPORT_TEMPLATES, member_number, context)
+        except Exception as e:
+            failed[member_number] = str(e)
+    to_render = [
+        (member_number, output)
+        for member_number, outputs in plans.items()
+        for output in outputs
+        if not output.cached
+    ]
+    results = render_each([
+        (output.template_name, output.filename, contexts[member_number])
+        for member_number, output in to_render
+    ])
+
+    for (member_number, output), (_path, error) in zip(to_render, results):
+        if error:
+            failed.setdefault(member_number, f"{output.report_type}: {error}")
+    for loan in loans:
+        if loan.member_id not in contexts:
+            failed.setdefault(loan.member_id, "Member not found")
+    done = [
+        (member_number, output)
+        for member_number, outputs in plans.items() if member_number not in failed
+        for output in outputs
+    ]
+    return done, failed
+
+
+def _write_zip(job, done):
+    """Collect the documents into the job's ZIP, stored under <member>/<file>"""
+    os.makedirs(batch_dir(), exist_ok=True)
+    zip_path = os.path.join(batch_dir(), job.zip_filename)
+    partial_path = f"{zip_path}.part"
+    # .docx files are compressed already, deflating them again gains nothing
+    with zipfile.ZipFile(partial_path, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for member_number, output in done:
+            archive.write(output.path, arcname=f"{member_number}/{output.filename}")
+    os.replace(partial_path, zip_path)
+    return zip_path
+
+
+def run_batch_job(job_id):
+    """Run one queued batch job, recording progress on the job row after each chunk"""
+    try:
+        claimed = ReportBatchJob.objects.filter(pk=job_id, status='queued').update(
+            status='running', started_at=timezone.now()
+        )
+        if not claimed:
+            return
+
+        job = ReportBatchJob.objects.get(pk=job_id)
+        try:
+            loans = list(matching_loans(job))
+            ReportBatchJob.objects.filter(pk=job_id).update(total_members=len(loans))
+
+            chunk_size = getattr(settings, 'REPORT_BATCH_CHUNK_SIZE', 50)
+            done, failed = [], {}
+            rendered = reused = 0
+            for start in range(0, len(loans), chunk_size):
+                chunk = loans[start:start + chunk_size]
+                chunk_done, chunk_failed = _render_chunk(job, chunk)
+                done.extend(chunk_done)
+                failed.update(chunk_failed)
+                rendered += sum(1 for _member_number, output in chunk_done if not output.cached)
+                reused += sum(1 for _member_number, output in chunk_done if output.cached)
+
+                ReportTracking.objects.bulk_create([
+                    ReportTracking(
+                        member_id=member_number,
+                        report_type=output.report_type,
+                        file_path=output.filename,
+                        generated_by_id=job.created_by_id,
+                        generated_date=timezone.localdate(),
+                        from_cache=output.cached,
+                    )
+                    for member_number, output in chunk_done
+                ])
+                ReportBatchJob.objects.filter(pk=job_id).update(
+                    processed_members=start + len(chunk),
+                    rendered_count=rendered,
+                    reused_count=reused,
+                    error_count=len(failed),
+                    member_errors=failed,
+                )
+
+            zip_path = _write_zip(job, done) if done else ''
+            success = bool(done) or not loans
+            if not loans:
+                message = "No loans match this filter"
+            else:
+                message = f"{len(done)} documents for {len(loans) - len(failed)} members ({reused} reused)"
+            if failed:
+                failed_members = sorted(failed)
+                message += (
+                    f"; failed for members {', '.join(failed_members[:10])}"
+                    f"{' ...' if len(failed_members) > 10 else ''}"
+                )
+        except Exception as e:
+            success, message, zip_path = False, f"Batch failed: {str(e)}", ''
+
+        ReportBatchJob.objects.filter(pk=job_id).update(
+            status='completed' if success else 'failed',
+            message=message,
+            zip_path=zip_path,
+            finished_at=timezone.now(),
+        )
+    finally:
+        # Worker threads own their connections, close them when the job is done
+        connections.close_all()
+
+
+def run_queued_jobs():
+    """Run every queued batch job in the current process, oldest first"""
+    job_ids = list(
+        ReportBatchJob.objects.filter(status='queued')
+        .order_by('created_at')
+        .values_list('pk', flat=True)
+    )
+    for job_id in job_ids:
+        run_batch_job(job_id)
+    return len(job_ids)
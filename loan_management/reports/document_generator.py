@@ -1,7 +1,8 @@
-from docxtpl import DocxTemplate
 from django.conf import settings
 from datetime import date
 import os
+import threading
+from .template_cache import get_template
 
 class DocumentGenerator:
     """Generate Word documents from templates"""
@@ -10,6 +11,8 @@ class DocumentGenerator:
         self.template_path = os.path.join(
             settings.MEDIA_ROOT, 'templates', template_name
         )
+        # Resolved up front so a generator handed to a worker process needs no settings
+        self.output_dir = os.path.join(settings.MEDIA_ROOT, 'generated_reports')
     
     def generate(self, context, output_filename):
         """ Generate document with given context"""
@@ -18,18 +21,26 @@ class DocumentGenerator:
         if not os.path.exists(self.template_path):
             raise Exception(
                 f"Template file not found: {self.template_path}\n"
-                f"Please place '.docx' template files in {os.path.join(settings.MEDIA_ROOT, 'templates')}"
+                f"Please place '.docx' template files in {os.path.dirname(self.template_path)}"
             )
         try:
-            doc = DocxTemplate(self.template_path)
+            # Parsed and compiled once per template file, see reports.template_cache
+            doc = get_template(self.template_path).new_document()
             doc.render(context)
 
             # Create output directory if it doesn't exist
-            output_dir = os.path.join(settings.MEDIA_ROOT, 'generated_reports')
-            os.makedirs(output_dir, exist_ok=True)
+            os.makedirs(self.output_dir, exist_ok=True)
 
-            output_path = os.path.join(output_dir, output_filename)
-            doc.save(output_path)
+            output_path = os.path.join(self.output_dir, output_filename)
+            # Write next to the target and rename, so a reused output (reports.output_cache)
+            # is never seen half written
+            partial_path = f"{output_path}.{os.getpid()}.{threading.get_ident()}.part"
+            try:
+                doc.save(partial_path)
+                os.replace(partial_path, output_path)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
 
             return output_path
         except Exception as e:
@@ -0,0 +1,32 @@
+from django import forms
+from loans.models import LoanInfo
+from .render_pool import REPORT_TEMPLATES
+
+
+class ReportTypesField(forms.MultipleChoiceField):
+    """Selected report types; unknown ones are dropped, as before, rather than rejected"""
+
+    def to_python(self, value):
+        return [report_type for report_type in super().to_python(value) if self.valid_value(report_type)]
+
+
+class ReportBatchForm(forms.Form):
+    """Filter and signatories of a report batch, from the report center"""
+    loan_status = forms.ChoiceField(choices=LoanInfo.STATUS_CHOICES, required=False)
+    loan_type = forms.CharField(max_length=100, required=False)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    report_types = ReportTypesField(
+        choices=[(report_type, report_type) for report_type in REPORT_TEMPLATES],
+        error_messages={'required': 'कृपया कम्तिमा एक रिपोर्ट छान्नुहोस्।'},
+    )
+    approved_by = forms.CharField(max_length=255, required=False)
+    approver_post = forms.CharField(max_length=255, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from = cleaned_data.get('date_from')
+        date_to = cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            self.add_error('date_to', 'मिति सम्म मिति देखि भन्दा पछि हुनुपर्छ (End date is before start date)')
+        return cleaned_data
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from reports.batch_jobs import expire_stale_jobs, run_queued_jobs
+
+
+class Command(BaseCommand):
+    help = "Run queued report batch jobs (e.g. ones left behind by a restarted server)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--expire', action='store_true',
+            help="Mark jobs queued longer than REPORT_BATCH_QUEUE_TIMEOUT as failed instead of running them",
+        )
+
+    def handle(self, *args, **options):
+        if options['expire']:
+            count = expire_stale_jobs()
+            self.stdout.write(self.style.SUCCESS(f"Marked {count} stale report batch job(s) failed"))
+            return
+        count = run_queued_jobs()
+        self.stdout.write(self.style.SUCCESS(f"Processed {count} report batch job(s)"))
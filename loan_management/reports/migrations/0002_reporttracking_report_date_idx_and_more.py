@@ -0,0 +1,24 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('members', '0006_member_search_index'),
+        ('reports', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reporttracking',
+            index=models.Index(fields=['-generated_date'], name='report_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='reporttracking',
+            index=models.Index(fields=['member', '-generated_date'], name='report_member_date_idx'),
+        ),
+    ]
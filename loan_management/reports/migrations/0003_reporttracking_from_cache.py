@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0002_reporttracking_report_date_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reporttracking',
+            name='from_cache',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 15:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reports', '0004_report_batch_jobs'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportbatchjob',
+            name='member_errors',
+            field=models.JSONField(default=dict),
+        ),
+    ]
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from members.models import Member
 from accounts.models import User
 from pathlib import Path
@@ -10,10 +11,16 @@ class ReportTracking(models.Model):
     file_path = models.CharField(max_length=500)
     generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True)
     generated_date = models.DateField()
+    # Served from an already generated identical document (reports.output_cache)
+    from_cache = models.BooleanField(default=False)
 
     class Meta:
         db_table = 'report_tracking'
         ordering = ['-generated_date']
+        indexes = [
+            models.Index(fields=['-generated_date'], name='report_date_idx'),
+            models.Index(fields=['member', '-generated_date'], name='report_member_date_idx'),
+        ]
 
     @property
     def filename(self):
@@ -22,3 +29,73 @@ class ReportTracking(models.Model):
     def __str__(self):
         return f"{self.report_type} - {self.member.member_number}, - {self.generated_date}"
     
+
+
+class ReportBatchJob(models.Model):
+    """Report packs for every loan matching a filter, rendered in the background into one ZIP"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+
+    # Filter
+    loan_status = models.CharField(max_length=20, default='approved')
+    loan_type = models.CharField(max_length=100, blank=True, default='')
+    date_from = models.DateField(blank=True, null=True)
+    date_to = models.DateField(blank=True, null=True)
+    report_types = models.JSONField(default=list)
+
+    # Signatories printed on every document
+    entered_by = models.CharField(max_length=255, blank=True, default='')
+    entered_post = models.CharField(max_length=255, blank=True, default='')
+    approved_by = models.CharField(max_length=255, blank=True, default='')
+    approver_post = models.CharField(max_length=255, blank=True, default='')
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    total_members = models.PositiveIntegerField(default=0)
+    processed_members = models.PositiveIntegerField(default=0)
+    rendered_count = models.PositiveIntegerField(default=0)
+    reused_count = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # member_number -> why that member's documents could not be made
+    member_errors = models.JSONField(default=dict)
+    message = models.TextField(blank=True, default='')
+    zip_path = models.CharField(max_length=500, blank=True, default='')
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'report_batch_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Report batch {self.pk} - {self.status}"
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    @property
+    def percent(self):
+        if self.is_finished:
+            return 100
+        if not self.total_members:
+            return 0
+        return min(int(self.processed_members * 100 / self.total_members), 99)
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds left, from the average speed so far"""
+        if self.status != 'running' or not self.started_at or not self.processed_members:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = max(self.total_members - self.processed_members, 0)
+        return int(elapsed / self.processed_members * remaining)
+
+    @property
+    def zip_filename(self):
+        return f"report_batch_{self.pk}.zip"
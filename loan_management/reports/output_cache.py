@@ -0,0 +1,96 @@
+"""
+Content-addressed reuse of generated report documents.
+
+A generated document is a pure function of its template file and the
+context it was filled with. Both are hashed into a key and the key goes
+into the output filename (``<type>_<member>_<key>.docx``), so asking for
+the same report again finds the finished file on disk and skips the
+render. A changed template or any changed context value gives a new key
+and a fresh render; earlier files are never overwritten.
+
+Whether a request was served from an existing file is kept on its
+ReportTracking row (from_cache), which is where the hit and miss counts
+come from.
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from functools import lru_cache
+from django.conf import settings
+from django.db.models import Count, Q
+
+# Hex digits of the key kept in filenames (80 bits)
+KEY_LENGTH = 20
+
+ReportOutput = namedtuple('ReportOutput', 'report_type template_name filename path cached')
+
+
+@lru_cache(maxsize=64)
+def _file_digest(path, mtime_ns, size):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as template_file:
+        for chunk in iter(lambda: template_file.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def template_version(template_path):
+    """Digest of the template file's bytes, hashed again only when the file changes"""
+    stat = os.stat(template_path)
+    return _file_digest(template_path, stat.st_mtime_ns, stat.st_size)
+
+
+def _normalize(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value.normalize())
+    return str(value)
+
+
+def context_digest(context):
+    """Digest of a report context; key order and value types don't matter beyond their text"""
+    normalized = json.dumps(context, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=_normalize)
+    return hashlib.sha256(normalized.encode('utf-8')).hexdigest()
+
+
+def report_key(template_path, context_key):
+    return hashlib.sha256(f'{template_version(template_path)}:{context_key}'.encode()).hexdigest()[:KEY_LENGTH]
+
+
+def plan_reports(report_types, templates, member_number, context):
+    """
+    One ReportOutput per report type: where its document is, and whether
+    it already exists (cached) or still has to be rendered.
+
+    Raises Exception, like DocumentGenerator, when a template file is
+    missing.
+    """
+    template_dir = os.path.join(settings.MEDIA_ROOT, 'templates')
+    output_dir = os.path.join(settings.MEDIA_ROOT, 'generated_reports')
+    context_key = context_digest(context)
+
+    outputs = []
+    for report_type in report_types:
+        template_name = templates[report_type]
+        template_path = os.path.join(template_dir, template_name)
+        if not os.path.exists(template_path):
+            raise Exception(
+                f"Template file not found: {template_path}\n"
+                f"Please place '.docx' template files in {template_dir}"
+            )
+        filename = f"{report_type}_{member_number}_{report_key(template_path, context_key)}.docx"
+        path = os.path.join(output_dir, filename)
+        outputs.append(ReportOutput(report_type, template_name, filename, path, os.path.exists(path)))
+    return outputs
+
+
+def report_cache_stats(reports):
+    """{'hits': n, 'misses': n} over a ReportTracking queryset"""
+    return reports.order_by().aggregate(
+        hits=Count('id', filter=Q(from_cache=True)),
+        misses=Count('id', filter=Q(from_cache=False)),
+    )
@@ -0,0 +1,151 @@
+"""
+Rendering several report documents of one request side by side.
+
+Filling a docx template is CPU bound (Jinja, lxml and zipping), so the
+documents go to a small process pool, created on first use and kept for
+the life of the worker process. A pack then takes about as long as its
+slowest document instead of the sum of all of them. Where the process
+pool cannot take them (a context that cannot be pickled, a worker that
+died) the same documents are rendered by a thread pool instead; set
+REPORT_RENDER_PROCESSES to False where multiprocessing does not work.
+
+Only the rendering leaves the request: context building and the
+ReportTracking rows stay in the caller, so worker processes never touch
+the database.
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+import django
+from django.conf import settings
+from .document_generator import DocumentGenerator
+
+logger = logging.getLogger(__name__)
+
+REPORT_TEMPLATES = {
+    'loan_application': 'loan_application.docx',
+    'tamasuk':          'tamasuk.docx',
+    'loan_approval':    'loan_approval.docx',
+    'debit_authority':  'debit_authority.docx',
+    'manjurinama':      'manjurinama.docx',
+    'guarantor':        'guarantor.docx',
+}
+
+# Failures of the pool itself rather than of a document: anything else a
+# render raises is that document's error
+_POOL_ERRORS = (BrokenProcessPool, pickle.PicklingError)
+
+_process_pool = None
+_thread_pool = None
+
+
+def _max_workers():
+    # More workers than CPUs only adds pickling and cold template caches
+    return min(getattr(settings, 'REPORT_RENDER_WORKERS', len(REPORT_TEMPLATES)), os.cpu_count() or 1)
+
+
+def _init_worker():
+    # Spawned workers start from a bare interpreter; settings come from DJANGO_SETTINGS_MODULE
+    django.setup()
+
+
+def _get_process_pool():
+    """Process-local pool of render processes, created on first use"""
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(
+            max_workers=_max_workers(),
+            # Not fork: the web process has threads (and their locks) a fork would copy
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _process_pool
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=_max_workers(), thread_name_prefix='report-render')
+    return _thread_pool
+
+
+def _drop_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def _outcome(render):
+    """(path, None) for a rendered document, (None, error) for one that failed"""
+    try:
+        return render(), None
+    except _POOL_ERRORS:
+        raise
+    except Exception as e:
+        return None, e
+
+
+def _check_picklable(tasks):
+    """
+    Raise PicklingError for a context the process pool could not send.
+
+    Depending on what is in it, pickle reports such a context as
+    PicklingError, AttributeError or TypeError; only this check turns the
+    latter two into PicklingError, so the same errors from a render stay
+    render errors.
+    """
+    for context in {id(context): context for _generator, _filename, context in tasks}.values():
+        try:
+            pickle.dumps(context)
+        except (AttributeError, TypeError) as e:
+            raise pickle.PicklingError(f"Report context cannot be pickled: {e}") from e
+
+
+def _run(pool, tasks):
+    futures = [pool.submit(generator.generate, context, filename) for generator, filename, context in tasks]
+    wait(futures)
+    return [_outcome(future.result) for future in futures]
+
+
+def render_each(documents):
+    """
+    Render (template_name, output_filename, context) triples side by side.
+
+    Returns a (path, error) pair per document, in order, one of the two
+    being None: a failing document does not stop the others. A single
+    document, or a limit of one worker (REPORT_RENDER_WORKERS or the CPU
+    count), is rendered in the calling thread.
+    """
+    tasks = [(DocumentGenerator(template_name), filename, context) for template_name, filename, context in documents]
+    if len(tasks) < 2 or _max_workers() < 2:
+        return [
+            _outcome(lambda: generator.generate(context, filename)) for generator, filename, context in tasks
+        ]
+
+    if getattr(settings, 'REPORT_RENDER_PROCESSES', True):
+        try:
+            _check_picklable(tasks)
+            return _run(_get_process_pool(), tasks)
+        except _POOL_ERRORS as e:
+            logger.warning("Report process pool unavailable (%s), rendering in threads", e)
+            if isinstance(e, BrokenProcessPool):
+                _drop_process_pool()
+    return _run(_get_thread_pool(), tasks)
+
+
+def render_documents(documents, context):
+    """
+    Render (template_name, output_filename) pairs with one shared context.
+
+    Returns the output paths in the order of ``documents``. A document that
+    fails raises its error here, after the others have finished.
+    """
+    results = render_each([(template_name, filename, context) for template_name, filename in documents])
+    for _path, error in results:
+        if error is not None:
+            raise error
+    return [path for path, _error in results]
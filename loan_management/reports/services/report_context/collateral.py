@@ -1,11 +1,11 @@
 from .utils import np
 
-def get_collateral_context(member):
+def get_collateral_context(dossier):
 
-    collateral_basic = getattr(member, 'collateral_basic', None)
+    collateral_basic = dossier.collateral_basic
 
-    properties = member.collateralproperty_set.all() or []
-    family_details = member.collateralfamilydetail_set.all() or []
+    properties = dossier.properties
+    family_details = dossier.family
 
     return {
         'monthly_saving': np(collateral_basic.monthly_saving if collateral_basic else ''),
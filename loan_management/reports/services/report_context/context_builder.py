@@ -1,10 +1,6 @@
 from members.models import Member
-from loans.models import LoanInfo, ApprovalInfo
-from collateral.models import (
-    CollateralBasic, CollateralProperty, CollateralFamilyDetail,
-    CollateralAffiliation, CollateralIncomeExpense
-)
-from projects.models import ProjectDetail
+from members.dossier import load_member_dossier, load_member_dossiers
+from loans.models import LoanInfo
 
 from reports.services.report_context.member_context import get_member_context
 from reports.services.report_context.loan import get_loan_context
@@ -15,12 +11,6 @@ from reports.services.report_context.organization_context import get_organizatio
 
 from reports.services.report_context.utils import np
 
-try:
-    from loans.models import WitnessInfo, GuarantorDetails
-except ImportError:
-    WitnessInfo = None
-    GuarantorDetails = None
-
 # Organization profile
 try:
     from dashboard.models import OrganizationProfile  # Fix: typo thiyo OrganatizationProfile
@@ -97,23 +87,10 @@ class ReportContextBuilder:
     def build(member_number, entered_by, entered_post, approved_by, approver_post):
         """Build complete context for all report types"""
         try:
-            member = Member.objects.get(member_number=member_number)
+            dossier = load_member_dossier(member_number)
+            member = dossier.member
             loan = LoanInfo.objects.filter(member=member).latest('id')
 
-            # Related data
-            approval          = ApprovalInfo.objects.filter(member=member).first()
-            collateral_basic  = CollateralBasic.objects.filter(member=member).first()
-            properties        = CollateralProperty.objects.filter(member=member)
-            family_details    = CollateralFamilyDetail.objects.filter(member=member)
-            income_expenses   = CollateralIncomeExpense.objects.filter(member=member)
-            affiliations      = CollateralAffiliation.objects.filter(member=member)
-            projects          = ProjectDetail.objects.filter(member=member)
-
-            witnesses  = WitnessInfo.objects.filter(member=member) if WitnessInfo else []
-            guarantors = GuarantorDetails.objects.filter(member=member) if GuarantorDetails else []
-
-           
-
             # Organization profile
             org = None
             if OrganizationProfile:
@@ -134,32 +111,58 @@ class ReportContextBuilder:
                 bs_day   = str(today.day).zfill(2)
                 date_nepali = today.strftime('%Y/%m/%d')
 
-            member_ctx = get_member_context(member)
-            loan_ctx = get_loan_context(loan)
-            org_ctx = get_organization_context(org)
-            collateral_ctx = get_collateral_context(member)
-            financial_ctx = get_financial_context(member)
-            parties_ctx = get_parties_context(member)    
-
-            context = {
-                **member_ctx,
-                **loan_ctx,
-                **org_ctx,
-                **collateral_ctx,
-                **financial_ctx,
-                **parties_ctx,
-
-                # Approval + date
-                'approval_date': np(approval.approval_date if approval else ''),
-                'entered_by': entered_by,
-                'entered_post': entered_post,
-                'approved_by': approved_by,
-                'approver_post': approver_post,
-            }
-            return context
+            return ReportContextBuilder.assemble(
+                dossier, loan, org, entered_by, entered_post, approved_by, approver_post
+            )
         except Member.DoesNotExist:
             raise Exception(f"Member {member_number} not found!")
         except LoanInfo.DoesNotExist:
             raise Exception(f"No loan found for member {member_number}!")
 
-         
\ No newline at end of file
+    @staticmethod
+    def assemble(dossier, loan, org, entered_by, entered_post, approved_by, approver_post):
+        """Context of one member from already loaded rows"""
+        approval = dossier.approval
+        return {
+            **get_member_context(dossier.member),
+            **get_loan_context(loan),
+            **get_organization_context(org),
+            **get_collateral_context(dossier),
+            **get_financial_context(dossier),
+            **get_parties_context(dossier),
+
+            # Approval + date
+            'approval_date': np(approval.approval_date if approval else ''),
+            'entered_by': entered_by,
+            'entered_post': entered_post,
+            'approved_by': approved_by,
+            'approver_post': approver_post,
+        }
+
+    @staticmethod
+    def build_many(loans, entered_by, entered_post, approved_by, approver_post, errors=None):
+        """
+        Contexts for many members at once, as {member_number: context}.
+
+        ``loans`` gives the loan to report on per member (at most one each).
+        Dossiers are loaded with one query per table for all members
+        together instead of once per member. When an ``errors`` dict is
+        given, a member whose context cannot be built is left out and its
+        error message stored there under its member number instead of raising.
+        """
+        loans = list(loans)
+        dossiers = load_member_dossiers([loan.member_id for loan in loans])
+        org = OrganizationProfile.objects.first() if OrganizationProfile else None
+        contexts = {}
+        for loan in loans:
+            if loan.member_id not in dossiers:
+                continue
+            try:
+                contexts[loan.member_id] = ReportContextBuilder.assemble(
+                    dossiers[loan.member_id], loan, org, entered_by, entered_post, approved_by, approver_post
+                )
+            except Exception as e:
+                if errors is None:
+                    raise
+                errors[loan.member_id] = str(e)
+        return contexts
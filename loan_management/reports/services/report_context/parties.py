@@ -1,8 +1,8 @@
 from .utils import np
 
-def get_parties_context(member):
-    witnesses = member.witnessinfo_set.all() or []
-    guarantors = member.guarantordetails_set.all() or []
+def get_parties_context(dossier):
+    witnesses = dossier.witnesses
+    guarantors = dossier.guarantors
 
 
     return {
@@ -0,0 +1,123 @@
+"""
+Process-local cache of parsed report templates.
+
+DocxTemplate unzips and parses the .docx on every render, then cleans the
+body, header and footer XML with a long series of regexes (patch_xml) and
+compiles the result with Jinja. None of that depends on the context, so it
+is done once per template file and kept here: a render deep-copies the
+parsed document and fills the already compiled Jinja templates.
+
+Entries are keyed by path and mtime, so replacing a file under
+MEDIA_ROOT/templates is picked up on the next render. At most
+``REPORT_TEMPLATE_CACHE_SIZE`` templates are kept, least recently used
+first out.
+"""
+import copy
+import os
+import re
+import threading
+from collections import OrderedDict
+from docx import Document
+from docxtpl import DocxTemplate
+from jinja2 import Environment
+from django.conf import settings
+
+_lock = threading.Lock()
+_templates = OrderedDict()
+_stats = {'hits': 0, 'misses': 0}
+
+
+class CompiledTemplate:
+    """A parsed .docx with the Jinja templates of its body, headers and footers"""
+
+    def __init__(self, path):
+        self.path = path
+        self.jinja_env = Environment()
+        self.document = Document(path)
+
+        parser = DocxTemplate(path)
+        parser.docx = self.document
+        self.body = self._compile(parser.patch_xml(parser.get_xml()))
+        self.parts = {}
+        for uri in (DocxTemplate.HEADER_URI, DocxTemplate.FOOTER_URI):
+            for rel_key, part in parser.get_headers_footers(uri):
+                xml = parser.get_part_xml(part)
+                encoding = parser.get_headers_footers_encoding(xml)
+                self.parts[rel_key] = (self._compile(parser.patch_xml(xml)), encoding)
+
+    def _compile(self, xml):
+        # Same line splitting as DocxTemplate.render_xml_part does before compiling
+        return self.jinja_env.from_string(re.sub(r"<w:p([ >])", r"\n<w:p\1", xml))
+
+    def new_document(self):
+        """A DocxTemplate on a private copy of the parsed document, ready to render"""
+        return CachedDocxTemplate(self)
+
+
+class CachedDocxTemplate(DocxTemplate):
+    """DocxTemplate rendering from a CompiledTemplate instead of re-parsing the file"""
+
+    def __init__(self, compiled):
+        super().__init__(compiled.path)
+        self.compiled = compiled
+        self.docx = copy.deepcopy(compiled.document)
+
+    def init_docx(self, reload=True):
+        # The copy is rendered once; a second render would need a fresh copy
+        if self.is_rendered and reload:
+            raise ValueError("A cached template renders once, take a new one from the cache")
+
+    def _render_compiled(self, template, part, context):
+        self.current_rendering_part = part
+        xml = re.sub(r"\n<w:p([ >])", r"<w:p\1", template.render(context))
+        xml = xml.replace("{_{", "{{").replace("}_}", "}}").replace("{_%", "{%").replace("%_}", "%}")
+        return self.resolve_listing(xml)
+
+    def build_xml(self, context, jinja_env=None):
+        return self._render_compiled(self.compiled.body, self.docx._part, context)
+
+    def build_headers_footers_xml(self, context, uri, jinja_env=None):
+        for rel_key, part in self.get_headers_footers(uri):
+            template, encoding = self.compiled.parts[rel_key]
+            yield rel_key, self._render_compiled(template, part, context).encode(encoding)
+
+    def render(self, context, jinja_env=None):
+        # Properties and footnotes are still compiled per render, they are rare and short
+        super().render(context, jinja_env or self.compiled.jinja_env)
+
+
+def _max_size():
+    return getattr(settings, 'REPORT_TEMPLATE_CACHE_SIZE', 16)
+
+
+def get_template(path):
+    """The CompiledTemplate of ``path``, parsed on first use or after the file changed"""
+    key = (path, os.stat(path).st_mtime_ns)
+    with _lock:
+        compiled = _templates.get(key)
+        if compiled is not None:
+            _templates.move_to_end(key)
+            _stats['hits'] += 1
+            return compiled
+
+    # Parse outside the lock; two threads may both parse a new template, the last one is kept
+    compiled = CompiledTemplate(path)
+    with _lock:
+        _stats['misses'] += 1
+        for stale in [cached for cached in _templates if cached[0] == path]:
+            del _templates[stale]
+        _templates[key] = compiled
+        while len(_templates) > _max_size():
+            _templates.popitem(last=False)
+    return compiled
+
+
+def template_cache_stats():
+    with _lock:
+        return dict(_stats, size=len(_templates))
+
+
+def clear_template_cache():
+    with _lock:
+        _templates.clear()
+        _stats.update(hits=0, misses=0)
@@ -1,3 +1,335 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from datetime import date, timedelta
+from docx import Document
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from loans.models import LoanInfo
+from members.models import Member
+from utils.zip_stream import stream_zip
+from .batch_jobs import run_batch_job
+from .services.report_context.context_builder import ReportContextBuilder
+from .document_generator import DocumentGenerator
+from .models import ReportBatchJob, ReportTracking
+from .output_cache import report_cache_stats
+from .render_pool import REPORT_TEMPLATES, render_documents
+from .template_cache import clear_template_cache, template_cache_stats
 
-# Create your tests here.
+
+def _write_template(media_root, name, body):
+    os.makedirs(os.path.join(media_root, 'templates'), exist_ok=True)
+    document = Document()
+    document.sections[0].header.paragraphs[0].text = 'सदस्य {{ member_number }}'
+    document.add_paragraph(body)
+    path = os.path.join(media_root, 'templates', name)
+    document.save(path)
+    return path
+
+
+def _use_media_root(test, **overrides):
+    """Point MEDIA_ROOT at a fresh directory for the duration of ``test``"""
+    media_root = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media_root)
+    settings_override = override_settings(MEDIA_ROOT=media_root, **overrides)
+    settings_override.enable()
+    test.addCleanup(settings_override.disable)
+    clear_template_cache()
+    test.addCleanup(clear_template_cache)
+    return media_root
+
+
+def _make_member_with_loan(member_number, status='approved', loan_type='Business'):
+    member = Member.objects.create(date=date(2024, 1, 1), member_number=member_number, member_name='Hari')
+    LoanInfo.objects.create(
+        member=member, loan_type=loan_type, interest_rate=12, loan_duration='वार्षिक',
+        repayment_duration='मासिक', loan_amount='10000', loan_amount_in_words='',
+        loan_completion_year='', loan_completion_month='', loan_completion_day='', status=status,
+    )
+    return member
+
+
+class TemplateCacheTests(TestCase):
+
+    def setUp(self):
+        self.media_root = _use_media_root(self, REPORT_TEMPLATE_CACHE_SIZE=2)
+
+    def _generate(self, template_name, context):
+        path = DocumentGenerator(template_name).generate(context, f'out_{template_name}')
+        document = Document(path)
+        return document.paragraphs[-1].text, document.sections[0].header.paragraphs[0].text
+
+    def test_renders_are_independent_and_parsed_once(self):
+        _write_template(self.media_root, 'tamasuk.docx', '{{ name }} {% if amount %}रु. {{ amount }}{% endif %}')
+
+        self.assertEqual(self._generate('tamasuk.docx', {'name': 'Ram', 'amount': 500, 'member_number': '1'}),
+                         ('Ram रु. 500', 'सदस्य 1'))
+        self.assertEqual(self._generate('tamasuk.docx', {'name': 'Sita', 'amount': 0, 'member_number': '2'}),
+                         ('Sita ', 'सदस्य 2'))
+        self.assertEqual(template_cache_stats(), {'hits': 1, 'misses': 1, 'size': 1})
+
+    def test_changed_file_is_reparsed(self):
+        path = _write_template(self.media_root, 'tamasuk.docx', 'old {{ name }}')
+        self._generate('tamasuk.docx', {'name': 'Ram'})
+
+        _write_template(self.media_root, 'tamasuk.docx', 'new {{ name }}')
+        os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1_000_000))
+
+        self.assertEqual(self._generate('tamasuk.docx', {'name': 'Ram'})[0], 'new Ram')
+        self.assertEqual(template_cache_stats(), {'hits': 0, 'misses': 2, 'size': 1})
+
+    def test_least_recently_used_template_is_dropped(self):
+        for name in ('a.docx', 'b.docx', 'c.docx'):
+            _write_template(self.media_root, name, '{{ name }}')
+        for name in ('a.docx', 'b.docx', 'a.docx', 'c.docx', 'a.docx', 'b.docx'):
+            self._generate(name, {'name': 'Ram'})
+        # a stays hot; b was dropped when c came in and has to be parsed again
+        self.assertEqual(template_cache_stats(), {'hits': 2, 'misses': 4, 'size': 2})
+
+
+class ReportRenderTests(TestCase):
+
+    def setUp(self):
+        self.media_root = _use_media_root(self)
+        # Render side by side even on a single-CPU test machine
+        cpu_count = mock.patch('reports.render_pool.os.cpu_count', return_value=4)
+        cpu_count.start()
+        self.addCleanup(cpu_count.stop)
+        for report_type, template_name in REPORT_TEMPLATES.items():
+            _write_template(self.media_root, template_name, f'{report_type} {{{{ member_name }}}}')
+
+    def _documents(self, *report_types):
+        return [(REPORT_TEMPLATES[report_type], f'{report_type}.docx') for report_type in report_types]
+
+    def _texts(self, paths):
+        return [Document(path).paragraphs[-1].text for path in paths]
+
+    def test_process_pool_renders_in_order(self):
+        paths = render_documents(self._documents('tamasuk', 'guarantor', 'manjurinama'), {'member_name': 'Hari'})
+        self.assertEqual(self._texts(paths), ['tamasuk Hari', 'guarantor Hari', 'manjurinama Hari'])
+
+    def test_unpicklable_context_falls_back_to_threads(self):
+        context = {'member_name': 'Hari', 'callback': lambda: None}
+        with self.assertLogs('reports.render_pool', 'WARNING'):
+            paths = render_documents(self._documents('tamasuk', 'guarantor'), context)
+        self.assertEqual(self._texts(paths), ['tamasuk Hari', 'guarantor Hari'])
+
+    def test_context_with_a_lock_falls_back_to_threads(self):
+        context = {'member_name': 'Hari', 'lock': threading.Lock()}
+        with self.assertLogs('reports.render_pool', 'WARNING'):
+            paths = render_documents(self._documents('tamasuk', 'guarantor'), context)
+        self.assertEqual(self._texts(paths), ['tamasuk Hari', 'guarantor Hari'])
+
+    def test_render_bug_is_a_render_error_not_a_pool_failure(self):
+        # A thread pool stands in for the worker processes, which mocks do not reach
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown)
+        with mock.patch('reports.render_pool._get_process_pool', return_value=pool), \
+                mock.patch('reports.render_pool._get_thread_pool') as thread_pool, \
+                mock.patch.object(DocumentGenerator, 'generate', side_effect=TypeError('bad filter')), \
+                self.assertNoLogs('reports.render_pool', 'WARNING'):
+            with self.assertRaisesMessage(TypeError, 'bad filter'):
+                render_documents(self._documents('tamasuk', 'guarantor'), {'member_name': 'Hari'})
+        thread_pool.assert_not_called()
+
+    @override_settings(REPORT_RENDER_PROCESSES=False)
+    def test_generate_view_renders_and_tracks_selected_reports(self):
+        _make_member_with_loan('6001')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+        data = {'member_number': '6001', 'report_types': ['tamasuk', 'guarantor', 'unknown']}
+        response = self.client.post(reverse('reports:generate_report'), data)
+
+        self.assertRedirects(response, reverse('reports:report_success'))
+        self.assertEqual(
+            sorted(ReportTracking.objects.values_list('report_type', flat=True)), ['guarantor', 'tamasuk']
+        )
+        files = self.client.session['generated_files']
+        self.assertEqual([f['type'] for f in files], ['tamasuk', 'guarantor'])
+        self.assertEqual(
+            Document(os.path.join(self.media_root, 'generated_reports', files[0]['filename'])).paragraphs[-1].text,
+            'tamasuk Hari',
+        )
+
+
+@override_settings(REPORT_RENDER_PROCESSES=False)
+class OutputCacheTests(TestCase):
+
+    def setUp(self):
+        self.media_root = _use_media_root(self)
+        self.template_path = _write_template(self.media_root, 'tamasuk.docx', '{{ approved_by }}')
+        _make_member_with_loan('6002')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+    def _generate(self, approved_by='Committee'):
+        data = {'member_number': '6002', 'report_types': ['tamasuk'], 'approved_by': approved_by}
+        self.client.post(reverse('reports:generate_report'), data)
+        return self.client.session['generated_files'][0]['filename']
+
+    def test_identical_request_reuses_the_document(self):
+        filename = self._generate()
+        path = os.path.join(self.media_root, 'generated_reports', filename)
+        written = os.stat(path).st_mtime_ns
+
+        with mock.patch('reports.views.render_documents') as render:
+            self.assertEqual(self._generate(), filename)
+        render.assert_called_once_with([], mock.ANY)
+        self.assertEqual(os.stat(path).st_mtime_ns, written)
+        self.assertEqual(report_cache_stats(ReportTracking.objects.all()), {'hits': 1, 'misses': 1})
+
+    def test_changed_context_or_template_renders_again(self):
+        first = self._generate()
+        second = self._generate(approved_by='Board')
+        self.assertNotEqual(first, second)
+        self.assertEqual(Document(os.path.join(self.media_root, 'generated_reports', first)).paragraphs[-1].text,
+                         'Committee')
+
+        _write_template(self.media_root, 'tamasuk.docx', 'New {{ approved_by }}')
+        os.utime(self.template_path, ns=(0, os.stat(self.template_path).st_mtime_ns + 1_000_000))
+        self.assertNotEqual(self._generate(), first)
+        self.assertEqual(report_cache_stats(ReportTracking.objects.all()), {'hits': 0, 'misses': 3})
+        self.assertContains(self.client.get(reverse('reports:report_history')), 'नयाँ: 3')
+
+
+@override_settings(REPORT_RENDER_PROCESSES=False, REPORT_BATCH_CHUNK_SIZE=2)
+class ReportBatchJobTests(TestCase):
+
+    def setUp(self):
+        self.media_root = _use_media_root(self)
+        _write_template(self.media_root, 'tamasuk.docx', '{{ member_name }} {{ loan_type }}')
+        for member_number in ('7001', '7002', '7003'):
+            _make_member_with_loan(member_number)
+        _make_member_with_loan('7004', loan_type='Agriculture')
+        _make_member_with_loan('7005', status='pending')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+    def _run(self, **filters):
+        data = {'loan_status': 'approved', 'report_types': ['tamasuk', 'unknown'], **filters}
+        with self.captureOnCommitCallbacks():
+            response = self.client.post(reverse('reports:report_batch_create'), data)
+        job = ReportBatchJob.objects.latest('id')
+        self.assertRedirects(response, reverse('reports:report_batch_detail', args=[job.pk]))
+        run_batch_job(job.pk)
+        job.refresh_from_db()
+        return job
+
+    def test_pack_of_matching_loans_in_one_zip(self):
+        job = self._run(loan_type='Business', date_from=date.today().isoformat())
+
+        self.assertEqual((job.status, job.total_members, job.processed_members), ('completed', 3, 3))
+        self.assertEqual((job.rendered_count, job.reused_count, job.error_count), (3, 0, 0))
+        self.assertEqual(job.report_types, ['tamasuk'])
+        with zipfile.ZipFile(job.zip_path) as archive:
+            names = sorted(archive.namelist())
+            self.assertEqual([name.split('/')[0] for name in names], ['7001', '7002', '7003'])
+            with archive.open(names[0]) as document:
+                self.assertEqual(Document(document).paragraphs[-1].text, 'Hari Business')
+        self.assertEqual(ReportTracking.objects.count(), 3)
+
+        progress = self.client.get(reverse('reports:report_batch_progress', args=[job.pk])).json()
+        self.assertEqual((progress['percent'], progress['finished']), (100, True))
+        response = self.client.get(reverse('reports:report_batch_download', args=[job.pk]))
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        self.assertContains(self.client.get(reverse('reports:report_center')), f'#{job.pk}')
+
+        # The same pack again reuses every document
+        self.assertEqual(self._run(loan_type='Business').reused_count, 3)
+
+    def test_member_that_fails_is_recorded_and_skipped(self):
+        assemble = ReportContextBuilder.assemble
+
+        def fail_for_7002(dossier, *args):
+            if dossier.member.member_number == '7002':
+                raise ValueError('bad collateral data')
+            return assemble(dossier, *args)
+
+        with mock.patch.object(ReportContextBuilder, 'assemble', side_effect=fail_for_7002):
+            job = self._run(loan_type='Business')
+
+        self.assertEqual((job.status, job.processed_members, job.error_count), ('completed', 3, 1))
+        self.assertEqual(job.member_errors, {'7002': 'bad collateral data'})
+        self.assertIn('failed for members 7002', job.message)
+        with zipfile.ZipFile(job.zip_path) as archive:
+            self.assertEqual(sorted(name.split('/')[0] for name in archive.namelist()), ['7001', '7003'])
+        self.assertContains(
+            self.client.get(reverse('reports:report_batch_detail', args=[job.pk])), 'bad collateral data'
+        )
+
+    def test_impossible_date_is_a_field_error(self):
+        data = {'loan_status': 'approved', 'report_types': ['tamasuk'], 'date_from': '2024-02-30'}
+        response = self.client.post(reverse('reports:report_batch_create'), data)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('date_from', response.context['batch_form'].errors)
+        self.assertContains(response, 'value="2024-02-30"')
+        self.assertFalse(ReportBatchJob.objects.exists())
+
+        data.update(date_from='2024-03-01', date_to='2024-02-01')
+        response = self.client.post(reverse('reports:report_batch_create'), data)
+        self.assertIn('date_to', response.context['batch_form'].errors)
+        self.assertFalse(ReportBatchJob.objects.exists())
+
+    def test_jobs_lost_in_the_queue_are_marked_failed(self):
+        stale = ReportBatchJob.objects.create(report_types=['tamasuk'])
+        fresh = ReportBatchJob.objects.create(report_types=['tamasuk'])
+        ReportBatchJob.objects.filter(pk=stale.pk).update(created_at=timezone.now() - timedelta(hours=7))
+
+        # Queueing a new batch clears out the ones no worker will pick up
+        self._run()
+
+        stale.refresh_from_db()
+        fresh.refresh_from_db()
+        self.assertEqual(stale.status, 'failed')
+        self.assertIn('restarted', stale.message)
+        self.assertEqual(fresh.status, 'queued')
+
+    def test_filter_without_matches(self):
+        job = self._run(date_to='2000-01-01')
+        self.assertEqual((job.status, job.total_members, job.zip_path), ('completed', 0, ''))
+        self.assertEqual(job.message, 'No loans match this filter')
+
+
+@override_settings(REPORT_RENDER_PROCESSES=False)
+class ReportPackDownloadTests(TestCase):
+
+    def setUp(self):
+        self.media_root = _use_media_root(self)
+        for report_type, template_name in REPORT_TEMPLATES.items():
+            _write_template(self.media_root, template_name, f'{report_type} {{{{ member_name }}}}')
+        _make_member_with_loan('8001')
+        self.client.force_login(get_user_model().objects.create_user('officer', password='x'))
+
+    def test_pack_of_last_run_streams_as_zip(self):
+        self.assertEqual(self.client.get(reverse('reports:download_report_pack')).status_code, 404)
+
+        data = {'member_number': '8001', 'report_types': ['tamasuk', 'guarantor']}
+        self.client.post(reverse('reports:generate_report'), data)
+        response = self.client.get(reverse('reports:download_report_pack'))
+
+        self.assertTrue(response.streaming)
+        self.assertIn('reports_8001_', response['Content-Disposition'])
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as archive:
+            self.assertEqual(
+                [name.split('_')[0] for name in archive.namelist()], ['tamasuk', 'guarantor']
+            )
+            with archive.open(archive.namelist()[1]) as document:
+                self.assertEqual(Document(document).paragraphs[-1].text, 'guarantor Hari')
+
+    def test_zip_is_built_a_chunk_at_a_time(self):
+        path = os.path.join(self.media_root, 'big.bin')
+        with open(path, 'wb') as big:
+            big.write(os.urandom(300 * 1024))
+
+        parts = list(stream_zip([(path, 'big.bin'), (path, 'copy.bin')], chunk_size=16 * 1024))
+        self.assertGreater(len(parts), 30)
+        self.assertLess(max(len(part) for part in parts), 17 * 1024)
+        with zipfile.ZipFile(io.BytesIO(b''.join(parts))) as archive:
+            self.assertIsNone(archive.testzip())
+            self.assertEqual(archive.getinfo('copy.bin').file_size, 300 * 1024)
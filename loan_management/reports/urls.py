@@ -7,6 +7,11 @@ urlpatterns = [
     path('', views.report_center, name='report_center'),
     path('generate/', views.generate_report, name='generate_report'),
     path('success/', views.report_success, name='report_success'),
+    path('success/download/', views.download_report_pack, name='download_report_pack'),
     path('download/<str:filename>/', views.download_report, name='download_report'),
     path('history/', views.report_history, name='report_history'),
+    path('batch/', views.report_batch_create, name='report_batch_create'),
+    path('batch/<int:job_id>/', views.report_batch_detail, name='report_batch_detail'),
+    path('batch/<int:job_id>/progress/', views.report_batch_progress, name='report_batch_progress'),
+    path('batch/<int:job_id>/download/', views.report_batch_download, name='report_batch_download'),
 ]
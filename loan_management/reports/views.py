@@ -1,29 +1,42 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import FileResponse, Http404
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
 from django.conf import settings
-from .document_generator import DocumentGenerator
+from .output_cache import plan_reports, report_cache_stats
+from .render_pool import REPORT_TEMPLATES, render_documents
 from .services.report_context.context_builder import ReportContextBuilder
-from .models import ReportTracking
+from .batch_jobs import enqueue_batch_job
+from .forms import ReportBatchForm
+from .models import ReportBatchJob, ReportTracking
 from loans.models import LoanInfo
+from loans.scheme_catalog import get_scheme_catalog
+from utils.zip_stream import stream_zip, zip_entries
 from members.models import Member
 from datetime import date
 import os
 
 
-@login_required
-def report_center(request):
-    """Report generation center"""
+def _report_center(request, batch_form=None):
     approved_loans = LoanInfo.objects.filter(
         status='approved'
     ).select_related('member')
 
     return render(request, 'reports/report_center.html', {
         'approved_loans': approved_loans,
+        'loan_statuses': LoanInfo.STATUS_CHOICES,
+        'loan_types': [scheme.loan_type for scheme in get_scheme_catalog()],
+        'batch_jobs': ReportBatchJob.objects.all()[:5],
+        'batch_form': batch_form,
     })
 
 
+@login_required
+def report_center(request):
+    """Report generation center"""
+    return _report_center(request)
+
+
 @login_required
 def generate_report(request):
     """Generate selected reports"""
@@ -50,41 +63,35 @@ def generate_report(request):
             member_number, entered_by, entered_post, approved_by, approver_post
         )
 
-        today_str = date.today().strftime('%Y%m%d')
-        generated_files = []
-
-        template_map = {
-            'loan_application': 'loan_application.docx',
-            'tamasuk':          'tamasuk.docx',
-            'loan_approval':    'loan_approval.docx',
-            'debit_authority':  'debit_authority.docx',
-            'manjurinama':      'manjurinama.docx',
-            'guarantor':        'guarantor.docx',
-        }
-
-        for report_type in report_types:
-            if report_type not in template_map:
-                continue
+        selected = [report_type for report_type in report_types if report_type in REPORT_TEMPLATES]
 
-            template_name   = template_map[report_type]
-            output_filename = f"{report_type}_{member_number}_{today_str}.docx"
+        # Documents already generated from the same template and context are reused as they are
+        outputs = plan_reports(selected, REPORT_TEMPLATES, member_number, context)
+        to_render = [output for output in outputs if not output.cached]
 
-            generator   = DocumentGenerator(template_name)
-            output_path = generator.generate(context, output_filename)
+        # All missing documents at once, see reports.render_pool
+        render_documents([(output.template_name, output.filename) for output in to_render], context)
 
-            ReportTracking.objects.create(
+        ReportTracking.objects.bulk_create([
+            ReportTracking(
                 member         = member,
-                report_type    = report_type,
-                file_path      = output_filename,
+                report_type    = output.report_type,
+                file_path      = output.filename,
                 generated_by   = request.user,
                 generated_date = date.today(),
+                from_cache     = output.cached,
             )
-
-            generated_files.append({
-                'type':     report_type,
-                'path':     output_path,
-                'filename': output_filename,
-            })
+            for output in outputs
+        ])
+
+        generated_files = [
+            {
+                'type':     output.report_type,
+                'path':     output.path,
+                'filename': output.filename,
+            }
+            for output in outputs
+        ]
 
         messages.success(request, f"{len(generated_files)} वटा रिपोर्ट सफलतापूर्वक बनाइयो!")
 
@@ -92,6 +99,7 @@ def generate_report(request):
             {'type': f['type'], 'filename': f['filename']}
             for f in generated_files
         ]
+        request.session['generated_member_number'] = member_number
 
         return redirect('reports:report_success')   # Fix: space thiyo
 
@@ -126,6 +134,23 @@ def download_report(request, filename):
     )
 
 
+@login_required
+def download_report_pack(request):
+    """Download every file of the last generation run as one ZIP, built while it is sent"""
+    generated_files = request.session.get('generated_files', [])
+    entries = zip_entries(
+        os.path.join(settings.MEDIA_ROOT, 'generated_reports'),
+        [f['filename'] for f in generated_files],
+    )
+    if not entries:
+        raise Http404("No generated reports to download")
+
+    member_number = request.session.get('generated_member_number', '')
+    response = StreamingHttpResponse(stream_zip(entries), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="reports_{member_number}_{date.today():%Y%m%d}.zip"'
+    return response
+
+
 @login_required
 def report_history(request):
     """View report generation history"""
@@ -136,5 +161,74 @@ def report_history(request):
         reports = reports.filter(member__member_number=member_number)
 
     return render(request, 'reports/report_history.html', {
-        'reports': reports
-    })
\ No newline at end of file
+        'reports': reports,
+        'cache_stats': report_cache_stats(reports),
+    })
+
+@login_required
+def report_batch_create(request):
+    """Queue report packs for every loan matching the batch filter"""
+    if request.method != 'POST':
+        return redirect('reports:report_center')
+
+    form = ReportBatchForm(request.POST)
+    if not form.is_valid():
+        messages.error(request, '❌ कृपया फाराम सही तरिकाले भर्नुहोस् (Please correct the batch form)')
+        return _report_center(request, batch_form=form)
+
+    data = form.cleaned_data
+    job = enqueue_batch_job(
+        data['report_types'],
+        user=request.user,
+        loan_status=data['loan_status'] or 'approved',
+        loan_type=data['loan_type'],
+        date_from=data['date_from'],
+        date_to=data['date_to'],
+        entered_by=request.user.full_name_nepali or request.user.username,
+        entered_post=request.user.post or 'Officer',
+        approved_by=data['approved_by'],
+        approver_post=data['approver_post'],
+    )
+    messages.info(request, '⏳ Batch रिपोर्ट सुरु भयो।')
+    return redirect('reports:report_batch_detail', job_id=job.pk)
+
+
+@login_required
+def report_batch_detail(request, job_id):
+    """Progress page of a report batch job"""
+    job = get_object_or_404(ReportBatchJob, pk=job_id)
+    return render(request, 'reports/report_batch.html', {'job': job})
+
+
+@login_required
+def report_batch_progress(request, job_id):
+    """JSON progress of a report batch job, polled by the progress page"""
+    job = get_object_or_404(ReportBatchJob, pk=job_id)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'total_members': job.total_members,
+        'processed_members': job.processed_members,
+        'percent': job.percent,
+        'rendered': job.rendered_count,
+        'reused': job.reused_count,
+        'errors': job.error_count,
+        'eta_seconds': job.eta_seconds,
+        'message': job.message,
+        'finished': job.is_finished,
+    })
+
+
+@login_required
+def report_batch_download(request, job_id):
+    """Download the ZIP of a finished report batch job"""
+    job = get_object_or_404(ReportBatchJob, pk=job_id)
+    if not job.zip_path or not os.path.exists(job.zip_path):
+        raise Http404("Batch ZIP not found")
+
+    return FileResponse(
+        open(job.zip_path, 'rb'),
+        as_attachment=True,
+        filename=job.zip_filename,
+        content_type='application/zip',
+    )
@@ -0,0 +1,165 @@
+from decimal import Decimal, InvalidOperation
+from functools import reduce
+from operator import or_
+from django.db import models, transaction
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from .nepali_number import to_english_digits
+
+AMOUNT_MAX_DIGITS = 14
+AMOUNT_DECIMAL_PLACES = 2
+
+_CENTS = Decimal('0.01')
+_LIMIT = Decimal(10) ** (AMOUNT_MAX_DIGITS - AMOUNT_DECIMAL_PLACES)
+
+# Currency marks and separators people type into the amount fields
+_NOISE = ('रु.', 'रु', 'Rs.', 'Rs', 'NPR', ',', ' ', '/-')
+
+
+def parse_amount(value):
+    """
+    Parse a typed amount ('1,50,000', '१५०००', 'Rs. 500') into a Decimal.
+
+    Returns None for blank or unparseable values, or ones too large for
+    the shadow columns.
+    """
+    if value is None:
+        return None
+    text = to_english_digits(value).strip()
+    for noise in _NOISE:
+        text = text.replace(noise, '')
+    if not text:
+        return None
+    try:
+        amount = Decimal(text).quantize(_CENTS)
+    except (InvalidOperation, ValueError):
+        return None
+    if not amount.is_finite() or abs(amount) >= _LIMIT:
+        return None
+    return amount
+
+
+def shadow_amount(shadow, text):
+    """
+    The shadow column's value, or the typed text parsed when the shadow is
+    empty (rows the desktop app wrote straight into the table).
+    """
+    return shadow if shadow is not None else parse_amount(text)
+
+
+def sum_shadow(shadow, **extra):
+    """
+    SUM of a shadow column as a Decimal expression, 0 when there are no rows.
+
+    SUM skips rows whose shadow is still empty, so add ``unsynced_total``
+    of the same rows to the result.
+    """
+    return Coalesce(
+        Sum(shadow, **extra),
+        Value(Decimal('0')),
+        output_field=DecimalField(max_digits=AMOUNT_MAX_DIGITS, decimal_places=AMOUNT_DECIMAL_PLACES),
+    )
+
+
+def unsynced_total(rows, source, shadow):
+    """
+    Total of the typed ``source`` amounts of the rows whose ``shadow``
+    column is still empty: what a SUM over the shadow left out.
+    """
+    return sum(
+        (parse_amount(getattr(row, source)) or Decimal('0') for row in rows if getattr(row, shadow) is None),
+        Decimal('0'),
+    )
+
+
+def format_amount(value):
+    """Decimal -> plain string without trailing '.00', '' for None"""
+    if value is None:
+        return ''
+    value = Decimal(value).quantize(_CENTS)
+    if value == value.to_integral_value():
+        return str(value.to_integral_value())
+    return str(value)
+
+
+def amount_field(shadow=True, **kwargs):
+    """
+    Decimal money column. By default the shadow column of a CharField
+    amount (nullable, not editable); ``shadow=False`` gives a plain one,
+    e.g. the ledger's, with the same precision.
+    """
+    if shadow:
+        kwargs = {'null': True, 'blank': True, 'editable': False, **kwargs}
+    return models.DecimalField(
+        max_digits=AMOUNT_MAX_DIGITS,
+        decimal_places=AMOUNT_DECIMAL_PLACES,
+        **kwargs,
+    )
+
+
+class MoneyShadowMixin:
+    """
+    Keep Decimal shadow columns of CharField amounts in step on save.
+
+    The amount fields stay CharFields because the desktop app and the
+    report templates read them as typed. ``money_fields`` maps each of them
+    to its shadow column, which is what SUM aggregates run on. Rows written
+    before the shadows existed are filled by the apps' backfill migrations
+    (and ``manage.py backfill_money_columns``, for rows the desktop app
+    writes later); readers fall back to parsing the text through
+    ``shadow_amount`` until then, and totals are ``sum_shadow`` plus
+    ``unsynced_total`` of the same rows.
+    """
+    money_fields = {}
+
+    def sync_money_fields(self):
+        for source, shadow in self.money_fields.items():
+            setattr(self, shadow, parse_amount(getattr(self, source)))
+
+    def save(self, *args, **kwargs):
+        self.sync_money_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            kwargs['update_fields'] = update_fields | {
+                shadow for source, shadow in self.money_fields.items() if source in update_fields
+            }
+        super().save(*args, **kwargs)
+
+
+def backfill_money_columns(model, money_fields, chunk_size=1000, progress=None):
+    """
+    Fill empty shadow columns of ``model`` from their CharFields.
+
+    Works on plain (and migration-time historical) models, walking rows with
+    an empty shadow in primary key order and committing one chunk at a
+    time, so it can be stopped and run again. Returns (rows processed,
+    values that could not be parsed). ``progress`` is called with the last
+    primary key of each chunk.
+    """
+    sources = list(money_fields)
+    shadows = list(money_fields.values())
+    pending = reduce(or_, (Q(**{f'{shadow}__isnull': True}) for shadow in shadows))
+    queryset = model._default_manager.filter(pending).order_by('pk').only('pk', *sources, *shadows)
+
+    processed = unparsed = 0
+    last_pk = 0
+    while True:
+        chunk = list(queryset.filter(pk__gt=last_pk)[:chunk_size])
+        if not chunk:
+            break
+        last_pk = chunk[-1].pk
+
+        for obj in chunk:
+            for source, shadow in money_fields.items():
+                value = parse_amount(getattr(obj, source))
+                setattr(obj, shadow, value)
+                if value is None and getattr(obj, source):
+                    unparsed += 1
+        with transaction.atomic():
+            model._default_manager.bulk_update(chunk, shadows)
+        processed += len(chunk)
+        if progress is not None:
+            progress(last_pk)
+
+    return processed, unparsed
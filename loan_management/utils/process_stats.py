@@ -0,0 +1,12 @@
+import os
+
+
+def current_rss_mb():
+    """Resident memory of this process right now in MB, or None where unsupported"""
+    try:
+        # Linux only: the second field is the resident set size in pages
+        with open('/proc/self/statm') as f:
+            resident_pages = int(f.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return resident_pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
@@ -0,0 +1,48 @@
+from django.http import QueryDict
+
+
+class WizardDraft:
+    """
+    Submitted data of a multi-step form, kept in the session until the last step.
+
+    Each step stores its POST data as-is; nothing is written to the app's
+    tables until the wizard is committed, so an abandoned flow leaves no
+    rows behind (the draft goes away with the session). One draft per
+    wizard and member, so two members can be filled in side by side.
+    """
+
+    def __init__(self, request, wizard, member_number):
+        self.session = request.session
+        self.key = f'draft:{wizard}:{member_number}'
+
+    @property
+    def steps(self):
+        return self.session.get(self.key, {})
+
+    def __contains__(self, step):
+        return step in self.steps
+
+    def __bool__(self):
+        return bool(self.steps)
+
+    def save_step(self, step, data):
+        """Store the submitted QueryDict of ``step``, replacing an earlier submit"""
+        steps = dict(self.steps)
+        steps[step] = {
+            key: values for key, values in data.lists() if key != 'csrfmiddlewaretoken'
+        }
+        self.session[self.key] = steps
+
+    def data(self, step):
+        """QueryDict of a stored step, ready to bind a form or formset; None when not filled"""
+        stored = self.steps.get(step)
+        if stored is None:
+            return None
+        data = QueryDict(mutable=True)
+        for key, values in stored.items():
+            data.setlist(key, values)
+        data._mutable = False
+        return data
+
+    def discard(self):
+        self.session.pop(self.key, None)
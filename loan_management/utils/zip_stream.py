@@ -0,0 +1,62 @@
+import os
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _ZipOutput:
+    """
+    Write-only target for ZipFile that hands out what was written so far.
+
+    It has no seek() or tell(), so zipfile writes in its streaming mode
+    (sizes and CRCs in data descriptors after each member) and never needs
+    to go back.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries, chunk_size=CHUNK_SIZE):
+    """
+    Yield the bytes of a ZIP archive of ``entries`` as it is built.
+
+    ``entries`` are (path, arcname) pairs. Files are stored without
+    compression and read ``chunk_size`` bytes at a time, so memory use stays
+    the same whatever the size or number of files, and nothing is written
+    to disk.
+    """
+    output = _ZipOutput()
+    with zipfile.ZipFile(output, mode='w', compression=zipfile.ZIP_STORED) as archive:
+        for path, arcname in entries:
+            info = zipfile.ZipInfo.from_file(path, arcname)
+            info.compress_type = zipfile.ZIP_STORED
+            with open(path, 'rb') as source, archive.open(info, mode='w') as target:
+                for chunk in iter(lambda: source.read(chunk_size), b''):
+                    target.write(chunk)
+                    yield output.take()
+    # Last data descriptor and the central directory, written as the archive closes
+    yield output.take()
+
+
+def zip_entries(directory, filenames):
+    """(path, filename) pairs of those ``filenames`` that exist in ``directory``"""
+    entries = []
+    for filename in filenames:
+        filename = os.path.basename(filename)
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            entries.append((path, filename))
+    return entries